@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark query throughput as the number of in-flight requests grows.
+
+Compares the old endpoint behaviour (calling the blocking ``PortfolioAgent.query``
+from a coroutine) with ``PortfolioAgent.aquery``, which runs pipeline stages on a
+bounded executor. The offline benchmark embedder is given an artificial per-query
+latency standing in for model inference or a remote embedding API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from portfolio_agent.evaluation import BenchmarkEmbedder, _build_agent, load_benchmark
+
+
+class LatencyEmbedder(BenchmarkEmbedder):
+    """Benchmark embedder whose query embeddings take ``latency`` seconds."""
+
+    latency = 0.0
+
+    def embed_single_sync(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_single_sync(text)
+
+
+async def run_level(agent, queries, concurrency: int, requests: int, mode: str):
+    run_id = f"{mode}-{concurrency}"
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        # A unique suffix keeps the retrieval and persona caches out of the measurement
+        query = f"{queries[i % len(queries)]} (request {run_id}-{i})"
+        async with slots:
+            started = time.perf_counter()
+            if mode == "async":
+                await agent.aquery(query, session_id=f"bench-{i}")
+            else:
+                agent.query(query, session_id=f"bench-{i}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent query throughput")
+    parser.add_argument(
+        "--benchmark",
+        default=str(REPO_ROOT / "benchmarks" / "canonical_portfolio" / "benchmark.json"),
+        help="Benchmark definition providing the corpus and queries.",
+    )
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated in-flight request counts.")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="Seconds per query embedding.")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    benchmark = load_benchmark(args.benchmark)
+    queries = [case.query for case in benchmark.cases]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = _build_agent("smoke", benchmark, Path(tmp) / "index")
+        embedder = LatencyEmbedder(agent.embedder.vocabulary)
+        agent.embedder = agent.retriever_agent.embedder = embedder
+        for document in benchmark.documents:
+            if document.ingest_via == "file":
+                agent.add_file(str(document.path), redact_pii=False)
+            else:
+                agent.add_text(document.content or "", source=document.source,
+                               document_type=document.document_type, redact_pii=False)
+        embedder.latency = args.embed_latency
+
+        print(f"{'in-flight':>9}  {'blocking q/s':>12}  {'aquery q/s':>10}  {'p50 blocking':>12}  {'p50 aquery':>10}")
+        for level in (int(value) for value in args.levels.split(",")):
+            blocking_qps, blocking_p50 = asyncio.run(run_level(agent, queries, level, args.requests, "blocking"))
+            async_qps, async_p50 = asyncio.run(run_level(agent, queries, level, args.requests, "async"))
+            print(
+                f"{level:>9}  {blocking_qps:>12.1f}  {async_qps:>10.1f}  "
+                f"{blocking_p50 * 1000:>10.1f}ms  {async_p50 * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark per-query executor overhead: fast path versus ``graph.invoke``.
+
+Runs the benchmark queries through the same ``RAGPipeline`` twice, once with
+the plain-Python fast path and once through the compiled LangGraph graph. After
+a warm-up pass the retrieval and persona caches are hot, so the difference in
+per-query time is mostly executor overhead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from portfolio_agent.evaluation import _build_agent, load_benchmark
+
+
+def per_query_times(agent, queries: list[str], iterations: int, fast_path: bool) -> list[float]:
+    agent.pipeline.fast_path = fast_path
+    times = []
+    for _ in range(iterations):
+        for i, query in enumerate(queries):
+            started = time.perf_counter()
+            agent.query(query, session_id=f"bench-{i}")
+            times.append(time.perf_counter() - started)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the fast-path executor against graph.invoke")
+    parser.add_argument(
+        "--benchmark",
+        default=str(REPO_ROOT / "benchmarks" / "canonical_portfolio" / "benchmark.json"),
+        help="Benchmark definition providing the corpus and queries.",
+    )
+    parser.add_argument("--iterations", type=int, default=50, help="Passes over the query set per executor.")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    benchmark = load_benchmark(args.benchmark)
+    queries = [case.query for case in benchmark.cases]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = _build_agent("smoke", benchmark, Path(tmp) / "index")
+        for document in benchmark.documents:
+            if document.ingest_via == "file":
+                agent.add_file(str(document.path), redact_pii=False)
+            else:
+                agent.add_text(document.content or "", source=document.source,
+                               document_type=document.document_type, redact_pii=False)
+
+        # Warm caches so both executors see the same per-stage work
+        per_query_times(agent, queries, 1, fast_path=True)
+        graph = per_query_times(agent, queries, args.iterations, fast_path=False)
+        fast = per_query_times(agent, queries, args.iterations, fast_path=True)
+
+    graph_mean, fast_mean = statistics.mean(graph), statistics.mean(fast)
+    print(f"Queries: {len(graph)} per executor")
+    print(f"graph.invoke: mean {graph_mean * 1e6:8.1f}us  p50 {statistics.median(graph) * 1e6:8.1f}us")
+    print(f"fast path:    mean {fast_mean * 1e6:8.1f}us  p50 {statistics.median(fast) * 1e6:8.1f}us")
+    print(f"Overhead saved per query: {(graph_mean - fast_mean) * 1e6:.1f}us ({graph_mean / fast_mean:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
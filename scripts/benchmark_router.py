@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Micro-benchmark routing throughput of the compiled RouterAgent matcher."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from portfolio_agent.agents.router import RouterAgent
+
+EXTRA_QUERIES = [
+    "How do I implement machine learning algorithms in Python?",
+    "Tell me about yourself and your interests",
+    "How can I get in touch with you?",
+    "What is your email and are you available for contract work?",
+    "Which projects did you deploy to production with React and Node?",
+    "What degree did you study for and which university did you attend?",
+    "Describe your work history and the industry roles you have held",
+    "asdfghjkl",
+]
+
+
+def load_queries(benchmark_path: Path) -> list[str]:
+    cases = json.loads(benchmark_path.read_text(encoding="utf-8"))["cases"]
+    return [case["query"] for case in cases] + EXTRA_QUERIES
+
+
+def substring_scores(router: RouterAgent, query: str) -> dict:
+    """Per-keyword substring scan used before the matcher was compiled."""
+    query_lower = query.lower().strip()
+    scores = {}
+    for query_type, pattern_info in router.routing_patterns.items():
+        keywords = pattern_info["keywords"]
+        found = [keyword for keyword in keywords if keyword in query_lower]
+        phrase_boost = 0.1 * sum(1 for keyword in found if len(keyword.split()) > 1)
+        scores[query_type] = min(1.0, len(found) / len(keywords) + phrase_boost)
+    return scores
+
+
+def compiled_scores(router: RouterAgent, query: str) -> dict:
+    matches = router.matcher.match(query.lower().strip())
+    return {
+        query_type: router._calculate_type_score(matches.get(query_type, set()), len(info["keywords"]))
+        for query_type, info in router.routing_patterns.items()
+    }
+
+
+def throughput(fn, router: RouterAgent, queries: list[str], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            fn(router, query)
+    elapsed = time.perf_counter() - start
+    return iterations * len(queries) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RouterAgent scoring throughput")
+    parser.add_argument(
+        "--benchmark",
+        default=str(REPO_ROOT / "benchmarks" / "canonical_portfolio" / "benchmark.json"),
+        help="Benchmark definition whose case queries are routed.",
+    )
+    parser.add_argument("--iterations", type=int, default=2000, help="Passes over the query set.")
+    args = parser.parse_args()
+
+    router = RouterAgent()
+    queries = load_queries(Path(args.benchmark))
+
+    baseline = throughput(substring_scores, router, queries, args.iterations)
+    compiled = throughput(compiled_scores, router, queries, args.iterations)
+
+    print(f"Queries per pass: {len(queries)}  Iterations: {args.iterations}")
+    print(f"Substring scan:   {baseline:,.0f} queries/s")
+    print(f"Compiled matcher: {compiled:,.0f} queries/s ({compiled / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
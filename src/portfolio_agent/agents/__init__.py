@@ -8,6 +8,10 @@ including router, retriever, reranker, persona, and memory management.
 from .router import RouterAgent, QueryType, RoutingDecision, create_router_agent
 from .retriever import RetrieverAgent, RetrievalRequest, RetrievalResult, create_retriever_agent
 from .reranker import RerankerAgent, RerankingRequest, RerankingResult, RerankingStrategy, create_reranker_agent
+from .cross_encoder import CrossEncoderScorer
+from .generation import (
+    GenerationBackend, GenerationError, GenerationResult, OpenAICompatibleBackend, create_generation_backend
+)
 from .persona import PersonaAgent, PersonaRequest, PersonaResponse, PersonaType, create_persona_agent
 from .memory_manager import MemoryManager, ConversationContext, ConversationTurn, create_memory_manager
 
@@ -25,6 +29,12 @@ __all__ = [
     'RerankingResult',
     'RerankingStrategy',
     'create_reranker_agent',
+    'CrossEncoderScorer',
+    'GenerationBackend',
+    'GenerationError',
+    'GenerationResult',
+    'OpenAICompatibleBackend',
+    'create_generation_backend',
     'PersonaAgent',
     'PersonaRequest',
     'PersonaResponse',
@@ -0,0 +1,161 @@
+"""
+Cross-Encoder Scorer for portfolio-agent.
+
+This module scores (query, chunk) pairs with a small local cross-encoder for
+the reranker. Pairs are truncated to a token budget, scored in batches on a
+thread pool, and cached per (query, chunk id) so repeated questions skip
+inference.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import CrossEncoder
+    CROSS_ENCODER_AVAILABLE = True
+except ImportError:
+    CrossEncoder = None
+    CROSS_ENCODER_AVAILABLE = False
+
+from ..result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# [CLS] query [SEP] chunk [SEP]
+SPECIAL_TOKENS = 3
+
+
+class CrossEncoderScorer:
+    """Batched, cached cross-encoder scoring of (query, chunk) pairs."""
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        model: Any = None,
+        max_tokens: int = 256,
+        batch_size: int = 16,
+        max_workers: int = 2,
+        cache_size: int = 4096,
+        device: str = "cpu"
+    ):
+        """Initialize cross-encoder scorer.
+
+        Args:
+            model_name: Hugging Face cross-encoder to load on first use
+            model: Preloaded model exposing ``predict(pairs, batch_size=...)``
+            max_tokens: Token budget for a query + chunk pair
+            batch_size: Number of pairs per inference batch
+            max_workers: Number of batches scored concurrently
+            cache_size: Maximum cached (query, chunk id) scores
+            device: Device passed to the cross-encoder
+        """
+        self.model_name = model_name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.device = device
+        self.cache = ResultCache(max_entries=cache_size, ttl=None)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cross-encoder")
+
+    def _load_model(self):
+        if self.model is not None:
+            return self.model
+
+        if not CROSS_ENCODER_AVAILABLE:
+            raise ImportError(
+                "Cross-encoder reranking requires `sentence-transformers`. "
+                "Install the project dependencies or use another reranking strategy."
+            )
+
+        self.model = CrossEncoder(self.model_name, max_length=self.max_tokens, device=self.device)
+        logger.info(f"Loaded cross-encoder {self.model_name} on {self.device}")
+        return self.model
+
+    def score(
+        self,
+        query: str,
+        candidates: List[Tuple[str, str]],
+        deadline: Optional[float] = None
+    ) -> Dict[int, float]:
+        """Score candidates against the query, best-ranked candidates first.
+
+        Args:
+            query: Query text
+            candidates: (chunk id, content) pairs in their current rank order
+            deadline: ``time.time()`` value after which unfinished batches are dropped
+
+        Returns:
+            Mapping of candidate position to score for every candidate scored in time
+        """
+        model = self._load_model()
+        query_key = " ".join(query.lower().split())
+
+        scores: Dict[int, float] = {}
+        pending: List[int] = []
+        for position, (chunk_id, _) in enumerate(candidates):
+            cached = self.cache.get((query_key, chunk_id))
+            if cached is not None:
+                scores[position] = cached
+            else:
+                pending.append(position)
+
+        if not pending:
+            return scores
+
+        query_text, chunk_budget = self._truncate(model, query, self.max_tokens // 2)
+        chunk_budget = max(self.max_tokens - chunk_budget - SPECIAL_TOKENS, 1)
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+        def run(batch: List[int]) -> np.ndarray:
+            pairs = [[query_text, self._truncate(model, candidates[p][1], chunk_budget)[0]] for p in batch]
+            return np.asarray(model.predict(pairs, batch_size=len(pairs), show_progress_bar=False), dtype=np.float64)
+
+        # Batches are queued in rank order, so the top candidates are scored first
+        futures = [(batch, self._executor.submit(run, batch)) for batch in batches]
+        timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+        wait([future for _, future in futures], timeout=timeout)
+
+        dropped = 0
+        for batch, future in futures:
+            if not future.done():
+                future.cancel()
+                dropped += len(batch)
+                continue
+            for position, value in zip(batch, future.result().reshape(-1).tolist()):
+                scores[position] = value
+                self.cache.put((query_key, candidates[position][0]), value)
+
+        if dropped:
+            logger.warning(f"Cross-encoder budget exhausted, {dropped} candidates keep their prior order")
+        return scores
+
+    @staticmethod
+    def _truncate(model: Any, text: str, budget: int) -> Tuple[str, int]:
+        """Cut ``text`` to ``budget`` tokens, returning the text and its token count."""
+        tokenizer = getattr(model, "tokenizer", None)
+        if tokenizer is not None and hasattr(tokenizer, "tokenize"):
+            tokens = tokenizer.tokenize(text)
+            if len(tokens) <= budget:
+                return text, len(tokens)
+            return tokenizer.convert_tokens_to_string(tokens[:budget]), budget
+
+        words = text.split()
+        if len(words) <= budget:
+            return text, len(words)
+        return " ".join(words[:budget]), budget
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scorer configuration and cache statistics."""
+        return {
+            "model_name": self.model_name,
+            "model_loaded": self.model is not None,
+            "max_tokens": self.max_tokens,
+            "batch_size": self.batch_size,
+            "max_workers": self.max_workers,
+            "cache": self.cache.get_stats(),
+        }
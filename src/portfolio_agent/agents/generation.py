@@ -0,0 +1,382 @@
+"""
+Generation Backends for portfolio-agent.
+
+This module provides the LLM generation backend used by the persona agent to
+turn retrieved evidence into an answer. The OpenAI-compatible backend talks to
+OpenAI or a vLLM server over pooled keep-alive HTTP connections (sync and
+async), streams tokens as they arrive, bounds each request with a timeout and
+caps concurrent requests. Every call reports its latency and throughput.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class GenerationError(RuntimeError):
+    """Raised when a generation request fails, times out or cannot be admitted."""
+
+
+@dataclass
+class GenerationResult:
+    """Result of a generation request."""
+    text: str
+    model: str
+    latency: float
+    time_to_first_token: Optional[float]
+    completion_tokens: int
+    tokens_per_second: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class GenerationBackend(ABC):
+    """Interface for chat-style text generation used by the persona agent."""
+
+    model: str = ""
+
+    @abstractmethod
+    def generate(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: int = 256,
+        on_text: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> GenerationResult:
+        """Generate a reply, passing text pieces to ``on_text`` as they arrive.
+
+        Args:
+            messages: Chat messages (``role``/``content`` dicts)
+            max_tokens: Maximum completion tokens
+            on_text: Optional callback receiving the reply incrementally
+            timeout: Seconds allowed for the whole request
+
+        Returns:
+            GenerationResult with the full reply and its metrics
+        """
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: int = 256,
+        on_text: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> GenerationResult:
+        """Async variant of ``generate``; by default runs it on a worker thread."""
+        return await asyncio.to_thread(
+            self.generate, messages, max_tokens=max_tokens, on_text=on_text, timeout=timeout
+        )
+
+    def close(self) -> None:
+        """Release pooled connections."""
+
+    async def aclose(self) -> None:
+        """Release pooled async connections."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend configuration and request metrics."""
+        return {"model": self.model}
+
+
+class OpenAICompatibleBackend(GenerationBackend):
+    """Streaming chat completions against an OpenAI-compatible HTTP API."""
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        model: str = "gpt-4o-mini",
+        api_key: Optional[str] = None,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 10,
+        max_concurrency: int = 4,
+        temperature: float = 0.2
+    ):
+        """Initialize the backend.
+
+        Args:
+            base_url: API root, e.g. ``https://api.openai.com/v1`` or a vLLM ``/v1`` URL
+            model: Model name sent with each request
+            api_key: Bearer token (optional for local servers)
+            timeout: Default seconds allowed for a whole request
+            connect_timeout: Seconds allowed to open a connection
+            max_connections: Size of each connection pool
+            max_concurrency: Maximum requests in flight; further callers wait
+                for a slot until their timeout
+            temperature: Sampling temperature
+        """
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is required for LLM generation. Install with: pip install httpx")
+
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.temperature = temperature
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client_options = dict(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._client: Optional["httpx.Client"] = None
+        self._async_client: Optional["httpx.AsyncClient"] = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.completion_tokens = 0
+        self.total_latency = 0.0
+        self.last_tokens_per_second = 0.0
+
+    @property
+    def client(self) -> "httpx.Client":
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_options)
+            return self._client
+
+    @property
+    def async_client(self) -> "httpx.AsyncClient":
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options)
+        return self._async_client
+
+    def generate(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: int = 256,
+        on_text: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> GenerationResult:
+        timeout = self.timeout if timeout is None else max(timeout, 0.0)
+        start_time = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            self._record_failure()
+            raise GenerationError(f"No generation slot free within {timeout:.2f}s ({self.max_concurrency} in flight)")
+
+        try:
+            remaining = max(timeout - (time.monotonic() - start_time), 0.0)
+            request_timeout = httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+            with self.client.stream(
+                "POST", "/chat/completions", json=self._payload(messages, max_tokens), timeout=request_timeout
+            ) as response:
+                response.raise_for_status()
+                stream = _ChatStream(start_time, timeout, on_text)
+                # Read to the end of the body so the connection goes back to the pool
+                for line in response.iter_lines():
+                    stream.feed(line)
+                return self._result(stream)
+        except (httpx.HTTPError, ValueError) as e:
+            self._record_failure()
+            raise GenerationError(f"Generation request failed: {e}") from e
+        except GenerationError:
+            self._record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: int = 256,
+        on_text: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None
+    ) -> GenerationResult:
+        timeout = self.timeout if timeout is None else max(timeout, 0.0)
+        start_time = time.monotonic()
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), timeout=timeout)
+        except asyncio.TimeoutError as e:
+            self._record_failure()
+            raise GenerationError(
+                f"No generation slot free within {timeout:.2f}s ({self.max_concurrency} in flight)"
+            ) from e
+
+        try:
+            remaining = max(timeout - (time.monotonic() - start_time), 0.0)
+            request_timeout = httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+            async with self.async_client.stream(
+                "POST", "/chat/completions", json=self._payload(messages, max_tokens), timeout=request_timeout
+            ) as response:
+                response.raise_for_status()
+                stream = _ChatStream(start_time, timeout, on_text)
+                async for line in response.aiter_lines():
+                    stream.feed(line)
+                return self._result(stream)
+        except (httpx.HTTPError, ValueError) as e:
+            self._record_failure()
+            raise GenerationError(f"Generation request failed: {e}") from e
+        except GenerationError:
+            self._record_failure()
+            raise
+        finally:
+            self._async_slots.release()
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+    def _result(self, stream: "_ChatStream") -> GenerationResult:
+        latency = time.monotonic() - stream.start_time
+        # Servers that omit usage send one token per chunk in practice
+        tokens = stream.usage_tokens if stream.usage_tokens is not None else stream.content_chunks
+        ttft = None if stream.first_token_at is None else stream.first_token_at - stream.start_time
+        decode_time = latency - (ttft or 0.0)
+        tokens_per_second = tokens / decode_time if decode_time > 0 else 0.0
+
+        with self._stats_lock:
+            self.requests += 1
+            self.completion_tokens += tokens
+            self.total_latency += latency
+            self.last_tokens_per_second = tokens_per_second
+
+        return GenerationResult(
+            text="".join(stream.pieces),
+            model=self.model,
+            latency=latency,
+            time_to_first_token=ttft,
+            completion_tokens=tokens,
+            tokens_per_second=tokens_per_second,
+            metadata={"finish_reason": stream.finish_reason, "usage_reported": stream.usage_tokens is not None},
+        )
+
+    def _record_failure(self) -> None:
+        with self._stats_lock:
+            self.failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "model": self.model,
+                "base_url": self.base_url,
+                "max_concurrency": self.max_concurrency,
+                "max_connections": self.max_connections,
+                "timeout": self.timeout,
+                "requests": self.requests,
+                "failures": self.failures,
+                "completion_tokens": self.completion_tokens,
+                "average_latency": self.total_latency / self.requests if self.requests else 0.0,
+                "last_tokens_per_second": self.last_tokens_per_second,
+            }
+
+
+class _ChatStream:
+    """Accumulates one chat completion event stream, forwarding text as it arrives."""
+
+    def __init__(self, start_time: float, timeout: float, on_text: Optional[Callable[[str], None]]):
+        self.start_time = start_time
+        self.timeout = timeout
+        self.on_text = on_text
+        self.pieces: List[str] = []
+        self.first_token_at: Optional[float] = None
+        self.content_chunks = 0
+        self.usage_tokens: Optional[int] = None
+        self.finish_reason: Optional[str] = None
+        self.done = False
+
+    def feed(self, line: str) -> None:
+        """Consume one line of the event stream; anything after ``[DONE]`` is ignored."""
+        if time.monotonic() - self.start_time > self.timeout:
+            raise GenerationError(f"Generation exceeded {self.timeout:.2f}s")
+        if self.done or not line.startswith("data:"):
+            return
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            self.done = True
+            return
+
+        event = json.loads(data)
+        usage = event.get("usage")
+        if usage:
+            self.usage_tokens = usage.get("completion_tokens")
+        for choice in event.get("choices") or []:
+            self.finish_reason = choice.get("finish_reason") or self.finish_reason
+            text = (choice.get("delta") or {}).get("content")
+            if not text:
+                continue
+            if self.first_token_at is None:
+                self.first_token_at = time.monotonic()
+            self.content_chunks += 1
+            self.pieces.append(text)
+            if self.on_text is not None:
+                self.on_text(text)
+
+
+def create_generation_backend(**kwargs) -> Optional[GenerationBackend]:
+    """Create the generation backend selected by ``PERSONA_GENERATION``.
+
+    Returns None for template-only responses. ``llm`` uses ``LLM_PROVIDER``:
+    ``vllm`` talks to ``VLLM_BASE_URL``, anything else to the OpenAI API.
+
+    Args:
+        **kwargs: Overrides passed to OpenAICompatibleBackend
+
+    Returns:
+        Configured backend or None
+    """
+    if settings.PERSONA_GENERATION != "llm":
+        return None
+
+    if settings.LLM_PROVIDER == "vllm":
+        if not settings.VLLM_BASE_URL:
+            raise RuntimeError("VLLM_BASE_URL is required when LLM_PROVIDER=vllm")
+        defaults = {"base_url": settings.VLLM_BASE_URL}
+    else:
+        defaults = {"base_url": OPENAI_BASE_URL, "api_key": settings.OPENAI_API_KEY}
+
+    defaults.update(
+        model=settings.DEFAULT_MODEL,
+        timeout=settings.LLM_TIMEOUT,
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    )
+    defaults.update(kwargs)
+    return OpenAICompatibleBackend(**defaults)
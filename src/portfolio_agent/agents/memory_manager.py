@@ -6,6 +6,7 @@ for maintaining coherent multi-turn conversations.
 """
 
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
@@ -53,6 +54,8 @@ class MemoryManager:
         
         # In-memory storage for conversations
         self.conversations: Dict[str, ConversationContext] = {}
+        # Async queries record turns from pipeline worker threads
+        self._lock = threading.RLock()
         
         logger.info("Memory manager initialized")
     
@@ -80,7 +83,8 @@ class MemoryManager:
             metadata=initial_context or {}
         )
         
-        self.conversations[session_id] = context
+        with self._lock:
+            self.conversations[session_id] = context
         
         logger.info(f"Started new conversation: {session_id}")
         return context
@@ -103,28 +107,29 @@ class MemoryManager:
         Returns:
             ConversationTurn that was added
         """
-        if session_id not in self.conversations:
-            logger.warning(f"Session {session_id} not found, creating new conversation")
-            self.start_conversation(session_id)
-        
-        # Create turn
-        turn_id = f"{session_id}_turn_{len(self.conversations[session_id].turns) + 1}"
-        now = datetime.now().isoformat()
-        
-        turn = ConversationTurn(
-            turn_id=turn_id,
-            user_query=user_query,
-            agent_response=agent_response,
-            timestamp=now,
-            metadata=metadata or {}
-        )
-        
-        # Add to conversation
-        self.conversations[session_id].turns.append(turn)
-        self.conversations[session_id].updated_at = now
-        
-        # Trim old turns if necessary
-        self._trim_conversation(session_id)
+        with self._lock:
+            if session_id not in self.conversations:
+                logger.warning(f"Session {session_id} not found, creating new conversation")
+                self.start_conversation(session_id)
+            
+            # Create turn
+            turn_id = f"{session_id}_turn_{len(self.conversations[session_id].turns) + 1}"
+            now = datetime.now().isoformat()
+            
+            turn = ConversationTurn(
+                turn_id=turn_id,
+                user_query=user_query,
+                agent_response=agent_response,
+                timestamp=now,
+                metadata=metadata or {}
+            )
+            
+            # Add to conversation
+            self.conversations[session_id].turns.append(turn)
+            self.conversations[session_id].updated_at = now
+            
+            # Trim old turns if necessary
+            self._trim_conversation(session_id)
         
         logger.info(f"Added turn to conversation {session_id}")
         return turn
@@ -279,7 +284,8 @@ class MemoryManager:
         Returns:
             Dictionary with memory statistics
         """
-        total_turns = sum(len(context.turns) for context in self.conversations.values())
+        with self._lock:
+            total_turns = sum(len(context.turns) for context in self.conversations.values())
         
         return {
             "active_sessions": len(self.conversations),
@@ -6,11 +6,14 @@ This module provides response generation with personality and context awareness.
 
 import logging
 import re
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+import time
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+from dataclasses import dataclass, replace
 from enum import Enum
 
-from ..text_matching import extract_terms, keyword_overlap, non_discriminative_terms
+from .generation import GenerationBackend
+from ..result_cache import ResultCache
+from ..text_matching import SentenceIndex, extract_terms, non_discriminative_terms, query_variants, sentence_index
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,10 @@ class PersonaRequest:
     max_response_length: int = 500
     include_sources: bool = True
     context: Optional[Dict[str, Any]] = None
+    time_budget: Optional[float] = None
+    on_text: Optional[Callable[[str], None]] = None  # receives the response incrementally
+    on_reset: Optional[Callable[[str], None]] = None  # told why text already passed to on_text is void
+    index_generation: Optional[int] = None  # vector store generation the documents came from
 
 @dataclass
 class PersonaResponse:
@@ -47,11 +54,26 @@ class PersonaAgent:
     def __init__(
         self,
         default_persona: PersonaType = PersonaType.PROFESSIONAL,
-        max_response_time: float = 10.0
+        max_response_time: float = 10.0,
+        generation_backend: Optional[GenerationBackend] = None,
+        cache_size: int = 256,
+        cache_ttl: Optional[float] = 300.0,
+        vector_store: Optional[Any] = None
     ):
-        """Initialize persona agent."""
+        """Initialize persona agent.
+
+        With a ``generation_backend`` the answer is written by the LLM from the
+        extracted evidence; otherwise (or if generation fails) it is assembled
+        from the persona templates. Answers for requests that carry an
+        ``index_generation`` are cached (``cache_size`` 0 disables this).
+        Evidence snippets use the ingest-time ``sentence_index`` of
+        ``vector_store`` when given.
+        """
         self.default_persona = default_persona
         self.max_response_time = max_response_time
+        self.generation_backend = generation_backend
+        self.vector_store = vector_store
+        self.cache = ResultCache(max_entries=cache_size, ttl=cache_ttl)
         
         # Define persona templates
         self.persona_templates = {
@@ -83,12 +105,44 @@ class PersonaAgent:
         context: Optional[Dict[str, Any]] = None
     ) -> PersonaResponse:
         """Generate a response with the specified persona."""
-        import time
         start_time = time.time()
+        time_budget = self.max_response_time
+        if request.time_budget is not None:
+            time_budget = min(time_budget, request.time_budget)
         
         logger.info(f"Generating response with {request.persona_type.value} persona")
         
+        # Track the text that went out, so a response replacing it is announced first
+        streamed: List[str] = []
+        if request.on_text is not None:
+            on_text = request.on_text
+            
+            def track(text: str) -> None:
+                streamed.append(text)
+                on_text(text)
+            
+            request = replace(request, on_text=track)
+        
         try:
+            cache_key = self._cache_key(request)
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                self._emit(request, cached.response)
+                response_time = time.time() - start_time
+                logger.info(f"Served cached response in {response_time:.3f}s")
+                return PersonaResponse(
+                    response=cached.response,
+                    sources=[dict(source) for source in cached.sources],
+                    persona_used=request.persona_type,
+                    response_time=response_time,
+                    metadata={
+                        **cached.metadata,
+                        "context_provided": context is not None,
+                        "time_budget": time_budget,
+                        "cache_hit": True
+                    }
+                )
+            
             # Get persona template
             persona_template = self.persona_templates.get(
                 request.persona_type, 
@@ -96,18 +150,45 @@ class PersonaAgent:
             )
             
             # Extract query-aligned evidence from documents.
-            evidence_items = self._extract_evidence(request.documents, request.query)
+            evidence_items, evidence_truncated = self._extract_evidence(
+                request.documents, request.query, deadline=start_time + time_budget
+            )
             evidence_strength = self._assess_evidence_strength(evidence_items)
             
-            # Generate response based on persona
-            response = self._generate_persona_response(
-                query=request.query,
-                evidence_items=evidence_items,
-                evidence_strength=evidence_strength,
-                include_sources=request.include_sources,
-                persona_template=persona_template,
-                max_length=request.max_response_length
-            )
+            # Generate response with the LLM when configured, else from the persona template
+            generation, generation_error = None, None
+            remaining = start_time + time_budget - time.time()
+            if self.generation_backend is not None and evidence_items and remaining > 0:
+                try:
+                    generation = self.generation_backend.generate(
+                        self._generation_messages(request, evidence_items, persona_template),
+                        max_tokens=max(request.max_response_length // 4, 16),
+                        on_text=request.on_text,
+                        timeout=remaining,
+                    )
+                except Exception as e:
+                    logger.warning(f"LLM generation failed, using the persona template: {e}")
+                    generation_error = str(e)
+                    if streamed:
+                        self._reset(request, "generation_failed")
+            
+            if generation is not None:
+                response = self._truncate_response(generation.text.strip(), request.max_response_length)
+                # The stream carried the raw reply; make it end up as the final response
+                if "".join(streamed) != response:
+                    if streamed:
+                        self._reset(request, "truncated")
+                    self._emit(request, response)
+            else:
+                response = self._generate_persona_response(
+                    query=request.query,
+                    evidence_items=evidence_items,
+                    evidence_strength=evidence_strength,
+                    include_sources=request.include_sources,
+                    persona_template=persona_template,
+                    max_length=request.max_response_length
+                )
+                self._emit(request, response)
             
             # Prepare sources from the evidence we actually used when possible.
             sources = []
@@ -135,43 +216,85 @@ class PersonaAgent:
                     "evidence_strength": evidence_strength,
                     "max_length": request.max_response_length,
                     "include_sources": request.include_sources,
-                    "context_provided": context is not None
+                    "context_provided": context is not None,
+                    "time_budget": time_budget,
+                    "evidence_truncated": evidence_truncated,
+                    "generation": self._generation_metrics(generation),
+                    "generation_error": generation_error,
+                    "cache_hit": False
                 }
             )
             
+            # Answers cut short by the deadline or a failed backend are not reused
+            if cache_key is not None and not evidence_truncated and generation_error is None:
+                self.cache.put(cache_key, result)
+            
             logger.info(f"Generated response in {response_time:.3f}s")
             return result
             
         except Exception as e:
             logger.error(f"Error during response generation: {e}")
             # Return fallback response
+            fallback = "I apologize, but I'm having trouble generating a response right now. Please try again."
+            if streamed:
+                self._reset(request, "error")
+            self._emit(request, fallback)
             return PersonaResponse(
-                response="I apologize, but I'm having trouble generating a response right now. Please try again.",
+                response=fallback,
                 sources=[],
                 persona_used=request.persona_type,
                 response_time=time.time() - start_time,
                 metadata={"error": str(e)}
             )
     
+    def _cache_key(self, request: PersonaRequest) -> Optional[Tuple[Any, ...]]:
+        """Build the response cache key, or None when the response cannot be cached.
+        
+        The documents are identified by id only, so requests are cacheable
+        only when they carry the index generation those ids were read at.
+        """
+        if not self.cache.enabled or not isinstance(request.index_generation, int):
+            return None
+        
+        return (
+            " ".join(request.query.lower().split()),
+            request.persona_type.value,
+            tuple(doc.get("id", "") for doc in request.documents),
+            request.max_response_length,
+            request.include_sources,
+            request.index_generation,
+        )
+    
     def _extract_evidence(
         self,
         documents: List[Dict[str, Any]],
-        query: str
-    ) -> List[Dict[str, Any]]:
-        """Extract source-backed evidence snippets from retrieved documents."""
+        query: str,
+        deadline: Optional[float] = None
+    ) -> tuple[List[Dict[str, Any]], bool]:
+        """Extract source-backed evidence snippets from retrieved documents.
+
+        Scanning stops once ``deadline`` (a ``time.time()`` value) has passed; the
+        top-ranked document is always considered. Returns the evidence items and
+        whether the scan was cut short.
+        """
         if not documents:
-            return []
+            return [], False
 
         ignored_terms = non_discriminative_terms(query, [doc.get("content", "") for doc in documents[:5]])
         query_terms = self._query_terms(query, ignored_terms=ignored_terms)
+        variants = query_variants(" ".join(query_terms)) if query_terms else None
         evidence_items: List[Dict[str, Any]] = []
+        truncated = False
 
-        for doc in documents[:5]:
+        for position, doc in enumerate(documents[:5]):
+            if deadline is not None and position > 0 and time.time() >= deadline:
+                truncated = True
+                break
             content = doc.get("content", "")
             if not content:
                 continue
 
-            snippet, overlap = self._best_snippet(content, query_terms)
+            snippet, overlap = self._best_snippet(content, variants, self._stored_sentences(doc, content))
             if not snippet:
                 continue
 
@@ -187,7 +310,43 @@ class PersonaAgent:
             )
 
         evidence_items.sort(key=lambda item: (item["overlap"], item["score"]), reverse=True)
-        return evidence_items[:3]
+        return evidence_items[:3], truncated
+
+    def _generation_messages(
+        self,
+        request: PersonaRequest,
+        evidence_items: List[Dict[str, Any]],
+        persona_template: Dict[str, str]
+    ) -> List[Dict[str, str]]:
+        """Chat prompt asking the LLM to answer from the numbered evidence only."""
+        citation = " Cite sources as (source: name)." if request.include_sources else ""
+        evidence = "\n".join(
+            f"[{number}] (source: {item['source']}) {item['snippet']}"
+            for number, item in enumerate(evidence_items, start=1)
+        )
+        return [
+            {
+                "role": "system",
+                "content": (
+                    f"You answer questions about a person's background in a {persona_template['tone']} tone. "
+                    "Use only the evidence provided; if it does not answer the question, say so."
+                    f"{citation} Keep the answer under {request.max_response_length} characters."
+                ),
+            },
+            {"role": "user", "content": f"Question: {request.query}\n\nEvidence:\n{evidence}"},
+        ]
+
+    @staticmethod
+    def _generation_metrics(generation) -> Optional[Dict[str, Any]]:
+        if generation is None:
+            return None
+        return {
+            "model": generation.model,
+            "latency": generation.latency,
+            "time_to_first_token": generation.time_to_first_token,
+            "completion_tokens": generation.completion_tokens,
+            "tokens_per_second": generation.tokens_per_second,
+        }
 
     def _assess_evidence_strength(self, evidence_items: List[Dict[str, Any]]) -> str:
         """Classify how strong the currently available evidence is."""
@@ -248,27 +407,46 @@ class PersonaAgent:
     def _query_terms(self, query: str, *, ignored_terms=None) -> List[str]:
         return extract_terms(query, ignored_terms=ignored_terms)
 
-    def _best_snippet(self, content: str, query_terms: List[str]) -> tuple[str, int]:
-        segments = [segment.strip() for segment in re.split(r"(?<=[.!?])\s+|\n+", content) if segment.strip()]
-        if not segments:
-            return "", 0
+    def _best_snippet(
+        self, content: str, variants: Optional[List[Set[str]]], sentences: Optional[SentenceIndex] = None
+    ) -> tuple[str, int]:
+        """Pick the sentence covering the most query terms (the first sentence when ``variants`` is None).
 
-        if not query_terms:
-            best = segments[0]
-            return self._truncate(best), 0
+        Uses the sentence index built at ingest when one is given.
+        """
+        if not isinstance(sentences, SentenceIndex):
+            sentences = sentence_index(content)
+        if not len(sentences):
+            return "", 0
 
-        best_segment = ""
-        best_overlap = -1
-        for segment in segments:
-            overlap = keyword_overlap(" ".join(query_terms), segment)
-            if overlap > best_overlap:
-                best_segment = segment
-                best_overlap = overlap
+        if variants is None:
+            return self._truncate(sentences.sentence(content, 0)), 0
 
+        overlaps = sentences.overlaps(variants)
+        best_overlap = max(overlaps)
         if best_overlap <= 0:
             return "", 0
 
-        return self._truncate(best_segment), best_overlap
+        return self._truncate(sentences.sentence(content, overlaps.index(best_overlap))), best_overlap
+
+    def _emit(self, request: PersonaRequest, text: str) -> None:
+        """Hand the response to ``request.on_text`` a sentence at a time."""
+        if request.on_text is None:
+            return
+        for piece in re.findall(r"[^.!?]*[.!?]+\s*|[^.!?]+$", text):
+            request.on_text(piece)
+
+    def _stored_sentences(self, doc: Dict[str, Any], content: str) -> Optional[SentenceIndex]:
+        """The document's sentence index from the vector store, if it kept one at ingest."""
+        lookup = getattr(self.vector_store, "sentence_index", None)
+        if lookup is None or not doc.get("id"):
+            return None
+        return lookup(doc["id"], content)
+
+    def _reset(self, request: PersonaRequest, reason: str) -> None:
+        """Tell ``request.on_reset`` to discard the text streamed so far."""
+        if request.on_reset is not None:
+            request.on_reset(reason)
 
     def _truncate(self, text: str, max_chars: int = 220) -> str:
         if len(text) <= max_chars:
@@ -314,6 +492,8 @@ class PersonaAgent:
             "default_persona": self.default_persona.value,
             "available_personas": [persona.value for persona in self.persona_templates.keys()],
             "max_response_time": self.max_response_time,
+            "generation": self.generation_backend.get_stats() if self.generation_backend else None,
+            "cache": self.cache.get_stats(),
             "total_templates": len(self.persona_templates)
         }
 
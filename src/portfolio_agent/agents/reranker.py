@@ -6,14 +6,34 @@ of retrieved documents based on various ranking criteria.
 """
 
 import logging
+import time
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass
 from enum import Enum
 
-from ..text_matching import extract_terms, keyword_overlap
+import numpy as np
+
+from ..text_matching import TermPositions, extract_terms, overlap_count, query_variants, term_positions, term_set, word_tokens
+from ..config import settings
+from ..timestamps import SOURCE_FIELDS, TIMESTAMP_FIELD, document_timestamp
+from ..vector_stores.mmr import mmr_select
+from .cross_encoder import CrossEncoderScorer
 
 logger = logging.getLogger(__name__)
 
+# Feature matrix columns
+FEATURES = ("score", "keyword", "phrase", "order", "title", "has_query_terms")
+SCORE, KEYWORD, PHRASE, ORDER, TITLE, HAS_QUERY_TERMS = range(len(FEATURES))
+
+# Strategy weights, in the column order passed to RerankerAgent._combine
+KEYWORD_WEIGHTS = np.array([0.7, 0.3])  # score, keyword
+RELEVANCE_WEIGHTS = np.array([0.5, 0.3, 0.1, 0.1])  # score, phrase, order, title
+HYBRID_WEIGHTS = np.array([0.4, 0.3, 0.3])  # score, keyword strategy, relevance strategy
+RECENCY_WEIGHTS = np.array([0.8, 0.2])  # score, recency
+
+# Documents older than this get no recency boost
+RECENCY_WINDOW_SECONDS = 30 * 24 * 3600
+
 class RerankingStrategy(Enum):
     """Available reranking strategies."""
     SCORE_ONLY = "score_only"
@@ -21,6 +41,7 @@ class RerankingStrategy(Enum):
     RECENCY = "recency"
     RELEVANCE = "relevance"
     HYBRID = "hybrid"
+    CROSS_ENCODER = "cross_encoder"
 
 @dataclass
 class RerankingRequest:
@@ -31,6 +52,8 @@ class RerankingRequest:
     max_results: int = 5
     min_score: float = 0.0
     context: Optional[Dict[str, Any]] = None
+    time_budget: Optional[float] = None
+    diversity: Optional[float] = None  # MMR lambda; None keeps the strategy order
 
 @dataclass
 class RerankingResult:
@@ -42,22 +65,37 @@ class RerankingResult:
     strategy_used: RerankingStrategy
     metadata: Dict[str, Any]
 
+class _BudgetExceeded(Exception):
+    """Raised inside a strategy once its deadline has passed."""
+
 class RerankerAgent:
     """Reranker agent for improving document ranking quality."""
     
+    # Share of the time budget a budget-aware strategy may use before returning
+    STRATEGY_BUDGET_SHARE = 0.9
+    
     def __init__(
         self,
         default_strategy: RerankingStrategy = RerankingStrategy.HYBRID,
-        max_reranking_time: float = 5.0
+        max_reranking_time: float = 5.0,
+        cross_encoder: Optional[CrossEncoderScorer] = None,
+        vector_store: Optional[Any] = None
     ):
         """Initialize reranker agent.
         
         Args:
             default_strategy: Default reranking strategy to use
             max_reranking_time: Maximum time allowed for reranking
+            cross_encoder: Scorer for the cross-encoder strategy (a default
+                local model is loaded on first use when omitted)
+            vector_store: Store providing ``document_vectors`` for diversity
+                (MMR) reranking and the ingest-time ``term_positions`` of
+                each document
         """
         self.default_strategy = default_strategy
         self.max_reranking_time = max_reranking_time
+        self.cross_encoder = cross_encoder
+        self.vector_store = vector_store
         
         # Define reranking strategies
         self.strategies = {
@@ -65,7 +103,17 @@ class RerankerAgent:
             RerankingStrategy.KEYWORD_MATCH: self._keyword_match_rerank,
             RerankingStrategy.RECENCY: self._recency_rerank,
             RerankingStrategy.RELEVANCE: self._relevance_rerank,
-            RerankingStrategy.HYBRID: self._hybrid_rerank
+            RerankingStrategy.HYBRID: self._hybrid_rerank,
+            RerankingStrategy.CROSS_ENCODER: self._cross_encoder_rerank
+        }
+        
+        # Strategies that stop on their own at a deadline and return partial work
+        self.budget_aware_strategies = {RerankingStrategy.CROSS_ENCODER}
+        # Strategies that check the deadline between documents and give up once it passes
+        self.interruptible_strategies = {
+            RerankingStrategy.KEYWORD_MATCH,
+            RerankingStrategy.RELEVANCE,
+            RerankingStrategy.HYBRID,
         }
         
         logger.info("Reranker agent initialized")
@@ -84,7 +132,6 @@ class RerankerAgent:
         Returns:
             RerankingResult with reranked documents
         """
-        import time
         start_time = time.time()
         
         logger.info(f"Reranking {len(request.documents)} documents using {request.strategy.value} strategy")
@@ -92,15 +139,43 @@ class RerankerAgent:
         try:
             # Get the reranking function
             rerank_func = self.strategies.get(request.strategy, self.strategies[self.default_strategy])
-            
-            # Perform reranking
-            reranked_docs = rerank_func(
+            diversify = request.diversity is not None and self.vector_store is not None
+            strategy_kwargs = dict(
                 documents=request.documents,
                 query=request.query,
-                max_results=request.max_results,
+                # MMR needs the strategy's full ordering to choose from
+                max_results=len(request.documents) if diversify else request.max_results,
                 min_score=request.min_score,
                 context=context or request.context
             )
+            if diversify and rerank_func == self._hybrid_rerank:
+                # Widening the candidates must not change the hybrid scores themselves
+                strategy_kwargs["lookup_k"] = request.max_results
+            
+            # Rerank inline within the time budget; on timeout keep the score order.
+            # Running on the caller's thread keeps queueing out of the budget and
+            # the strategy inside the caller's trace.
+            time_budget = self.max_reranking_time
+            if request.time_budget is not None:
+                time_budget = min(time_budget, request.time_budget)
+            timed_out = False
+            if request.strategy in self.budget_aware_strategies:
+                strategy_kwargs["deadline"] = start_time + time_budget * self.STRATEGY_BUDGET_SHARE
+            elif request.strategy in self.interruptible_strategies:
+                strategy_kwargs["deadline"] = start_time + time_budget
+            try:
+                if time_budget <= 0 and request.strategy != RerankingStrategy.SCORE_ONLY:
+                    raise _BudgetExceeded()
+                reranked_docs = rerank_func(**strategy_kwargs)
+            except _BudgetExceeded:
+                timed_out = True
+                logger.warning(f"Reranking exceeded {time_budget:.3f}s budget, falling back to score order")
+                strategy_kwargs.pop("deadline", None)
+                strategy_kwargs.pop("lookup_k", None)
+                reranked_docs = self._score_only_rerank(**strategy_kwargs)
+            
+            if diversify:
+                reranked_docs = self._diversify(reranked_docs, request.max_results, request.diversity)
             
             reranking_time = time.time() - start_time
             
@@ -114,7 +189,10 @@ class RerankerAgent:
                 metadata={
                     "max_results": request.max_results,
                     "min_score": request.min_score,
-                    "context_provided": context is not None
+                    "context_provided": context is not None,
+                    "time_budget": time_budget,
+                    "timed_out": timed_out,
+                    "diversity": request.diversity if diversify else None
                 }
             )
             
@@ -165,7 +243,8 @@ class RerankerAgent:
         query: str,
         max_results: int,
         min_score: float,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """Rerank documents based on keyword matching.
         
@@ -175,34 +254,15 @@ class RerankerAgent:
             max_results: Maximum number of results
             min_score: Minimum score threshold
             context: Optional context
+            deadline: ``time.time()`` value after which ``_BudgetExceeded`` is raised
             
         Returns:
             Reranked documents
         """
-        query_words = set(extract_terms(query))
-        
-        def calculate_keyword_score(doc):
-            content = doc.get("content", "")
-            overlap = keyword_overlap(query, content)
-            total_query_words = len(query_words)
-            
-            if total_query_words == 0:
-                return 0.0
-            
-            keyword_score = overlap / total_query_words
-            
-            # Combine with original score
-            original_score = doc.get("score", 0)
-            return (original_score * 0.7) + (keyword_score * 0.3)
-        
-        # Calculate new scores and sort
-        for doc in documents:
-            doc["keyword_score"] = calculate_keyword_score(doc)
-        
-        filtered_docs = [doc for doc in documents if doc.get("score", 0) >= min_score]
-        sorted_docs = sorted(filtered_docs, key=lambda x: x["keyword_score"], reverse=True)
-        
-        return sorted_docs[:max_results]
+        features = self._feature_matrix(documents, query, deadline)
+        keyword_scores = self._keyword_scores(features)
+        rows = self._top_rows(keyword_scores, features[:, SCORE] >= min_score, max_results)
+        return [{**documents[row], "keyword_score": float(keyword_scores[row])} for row in rows.tolist()]
     
     def _recency_rerank(
         self,
@@ -224,44 +284,26 @@ class RerankerAgent:
         Returns:
             Reranked documents
         """
-        from datetime import datetime
+        scores = np.fromiter((doc.get("score", 0) for doc in documents), dtype=np.float64, count=len(documents))
+        timestamps = np.fromiter(
+            (self._timestamp(doc) for doc in documents), dtype=np.float64, count=len(documents)
+        )
+        undated = np.fromiter(
+            (not self._has_timestamp_field(doc) for doc in documents), dtype=bool, count=len(documents)
+        )
         
-        def calculate_recency_score(doc):
-            metadata = doc.get("metadata", {})
-            created_at = metadata.get("created_at") or metadata.get("fetched_at")
-            
-            if not created_at:
-                return 0.5  # Default score for documents without timestamps
-            
-            try:
-                # Parse timestamp
-                if isinstance(created_at, str):
-                    doc_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                else:
-                    doc_time = created_at
-                
-                # Calculate recency score (newer = higher score)
-                now = datetime.now()
-                time_diff = (now - doc_time).total_seconds()
-                
-                # Normalize to 0-1 scale (documents from last 30 days get higher scores)
-                recency_score = max(0, 1 - (time_diff / (30 * 24 * 3600)))
-                
-                # Combine with original score
-                original_score = doc.get("score", 0)
-                return (original_score * 0.8) + (recency_score * 0.2)
-                
-            except Exception:
-                return doc.get("score", 0)
-        
-        # Calculate new scores and sort
-        for doc in documents:
-            doc["recency_score"] = calculate_recency_score(doc)
+        # Newer = higher, fading to 0 over the recency window. Undated documents get
+        # a flat 0.5; a timestamp that is present but unparseable keeps the score.
+        age = time.time() - timestamps
+        recency = np.maximum(0.0, 1.0 - age / RECENCY_WINDOW_SECONDS)
+        recency_scores = np.where(
+            np.isnan(timestamps),
+            np.where(undated, 0.5, scores),
+            self._combine((scores, recency), RECENCY_WEIGHTS)
+        )
         
-        filtered_docs = [doc for doc in documents if doc.get("score", 0) >= min_score]
-        sorted_docs = sorted(filtered_docs, key=lambda x: x["recency_score"], reverse=True)
-        
-        return sorted_docs[:max_results]
+        rows = self._top_rows(recency_scores, scores >= min_score, max_results)
+        return [{**documents[row], "recency_score": float(recency_scores[row])} for row in rows.tolist()]
     
     def _relevance_rerank(
         self,
@@ -269,7 +311,8 @@ class RerankerAgent:
         query: str,
         max_results: int,
         min_score: float,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """Rerank documents based on relevance heuristics.
         
@@ -279,77 +322,99 @@ class RerankerAgent:
             max_results: Maximum number of results
             min_score: Minimum score threshold
             context: Optional context
+            deadline: ``time.time()`` value after which ``_BudgetExceeded`` is raised
             
         Returns:
             Reranked documents
         """
-        def calculate_relevance_score(doc):
-            content = doc.get("content", "").lower()
-            query_lower = query.lower()
-            
-            # Check for exact phrase matches
-            phrase_score = 1.0 if query_lower in content else 0.0
-            
-            # Check for word order preservation
-            query_words = query_lower.split()
-            content_words = content.split()
-            
-            order_score = 0.0
-            if len(query_words) > 1:
-                # Find positions of query words in content
-                positions = []
-                for word in query_words:
-                    try:
-                        pos = content_words.index(word)
-                        positions.append(pos)
-                    except ValueError:
-                        positions.append(-1)
-                
-                # Calculate order preservation score
-                if all(pos >= 0 for pos in positions):
-                    # Check if positions are in ascending order
-                    if positions == sorted(positions):
-                        order_score = 1.0
-                    else:
-                        # Partial order preservation
-                        order_score = 0.5
-            
-            # Check for title/heading relevance
-            title_score = 0.0
-            metadata = doc.get("metadata", {})
-            title = metadata.get("title", "").lower()
-            if title and any(word in title for word in query_words):
-                title_score = 0.8
-            
-            # Combine scores
-            original_score = doc.get("score", 0)
-            relevance_score = (
-                original_score * 0.5 +
-                phrase_score * 0.3 +
-                order_score * 0.1 +
-                title_score * 0.1
-            )
+        features = self._feature_matrix(documents, query, deadline)
+        relevance_scores = self._relevance_scores(features)
+        rows = self._top_rows(relevance_scores, features[:, SCORE] >= min_score, max_results)
+        return [{**documents[row], "relevance_score": float(relevance_scores[row])} for row in rows.tolist()]
+    
+    def _hybrid_rerank(
+        self,
+        documents: List[Dict[str, Any]],
+        query: str,
+        max_results: int,
+        min_score: float,
+        context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        lookup_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Rerank documents using a hybrid approach.
+        
+        The keyword and relevance scores only contribute for documents that
+        make the top ``lookup_k`` of their own strategy, matched by id.
+        
+        Args:
+            documents: List of documents to rerank
+            query: Original query
+            max_results: Maximum number of results
+            min_score: Minimum score threshold
+            context: Optional context
+            deadline: ``time.time()`` value after which ``_BudgetExceeded`` is raised
+            lookup_k: Size of the keyword/relevance top-k lookups; defaults to ``max_results``
             
-            return relevance_score
+        Returns:
+            Reranked documents
+        """
+        if not documents:
+            return []
         
-        # Calculate new scores and sort
-        for doc in documents:
-            doc["relevance_score"] = calculate_relevance_score(doc)
+        features = self._feature_matrix(documents, query, deadline)
+        eligible = features[:, SCORE] >= min_score
+        keyword_scores = self._keyword_scores(features)
+        relevance_scores = self._relevance_scores(features)
         
-        filtered_docs = [doc for doc in documents if doc.get("score", 0) >= min_score]
-        sorted_docs = sorted(filtered_docs, key=lambda x: x["relevance_score"], reverse=True)
+        # Map every document onto an interned id so per-id lookups are array indexing
+        id_codes: Dict[str, int] = {}
+        codes = np.fromiter(
+            (id_codes.setdefault(doc.get("id", ""), len(id_codes)) for doc in documents),
+            dtype=np.intp,
+            count=len(documents)
+        )
         
-        return sorted_docs[:max_results]
+        lookup_k = lookup_k or max_results
+        combined = self._combine(
+            (
+                features[:, SCORE],
+                self._lookup_by_id(keyword_scores, self._top_rows(keyword_scores, eligible, lookup_k), codes, len(id_codes)),
+                self._lookup_by_id(relevance_scores, self._top_rows(relevance_scores, eligible, lookup_k), codes, len(id_codes)),
+            ),
+            HYBRID_WEIGHTS
+        )
+        
+        # Documents sharing an id all take the score of the last one
+        last_row = np.full(len(id_codes), -1, dtype=np.intp)
+        np.maximum.at(last_row, codes, np.arange(len(documents)))
+        hybrid_scores = combined[last_row[codes]]
+        
+        rows = self._top_rows(hybrid_scores, eligible, max_results)
+        return [
+            {
+                **documents[row],
+                "keyword_score": float(keyword_scores[row]),
+                "relevance_score": float(relevance_scores[row]),
+                "hybrid_score": float(hybrid_scores[row]),
+            }
+            for row in rows.tolist()
+        ]
     
-    def _hybrid_rerank(
+    def _cross_encoder_rerank(
         self,
         documents: List[Dict[str, Any]],
         query: str,
         max_results: int,
         min_score: float,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Rerank documents using a hybrid approach.
+        """Rerank documents with a local cross-encoder.
+        
+        Candidates are scored in their incoming order until the deadline;
+        scored documents are ranked by cross-encoder score and the rest
+        follow in their prior order.
         
         Args:
             documents: List of documents to rerank
@@ -357,42 +422,145 @@ class RerankerAgent:
             max_results: Maximum number of results
             min_score: Minimum score threshold
             context: Optional context
+            deadline: ``time.time()`` value by which scoring must stop
             
         Returns:
             Reranked documents
         """
-        # Apply multiple strategies and combine results
-        keyword_results = self._keyword_match_rerank(documents, query, max_results, min_score, context)
-        relevance_results = self._relevance_rerank(documents, query, max_results, min_score, context)
+        if self.cross_encoder is None:
+            self.cross_encoder = CrossEncoderScorer(
+                model_name=settings.CROSS_ENCODER_MODEL,
+                max_tokens=settings.CROSS_ENCODER_MAX_TOKENS,
+                batch_size=settings.CROSS_ENCODER_BATCH_SIZE
+            )
         
-        # Create a combined scoring system
-        doc_scores = {}
+        candidates = [doc for doc in documents if doc.get("score", 0) >= min_score]
+        scores = self.cross_encoder.score(
+            query,
+            [(doc.get("id", ""), doc.get("content", "")) for doc in candidates],
+            deadline=deadline
+        )
         
-        for doc in documents:
-            doc_id = doc.get("id", "")
+        scored = sorted(sorted(scores), key=scores.__getitem__, reverse=True)
+        unscored = [position for position in range(len(candidates)) if position not in scores]
+        reranked = [{**candidates[position], "cross_encoder_score": scores[position]} for position in scored]
+        reranked.extend(dict(candidates[position]) for position in unscored)
+        
+        return reranked[:max_results]
+    
+    def _diversify(self, documents: List[Dict[str, Any]], max_results: int, diversity: float) -> List[Dict[str, Any]]:
+        """Pick ``max_results`` of the ranked documents with maximal marginal relevance.
+        
+        Relevance is the document's position in the strategy ranking, so MMR
+        works the same on top of every strategy regardless of its score scale.
+        """
+        if len(documents) <= 1:
+            return documents[:max_results]
+        
+        relevance = 1.0 - np.arange(len(documents), dtype=np.float64) / len(documents)
+        vectors = self.vector_store.document_vectors([doc.get("id") for doc in documents])
+        rows = mmr_select(relevance, vectors, max_results, diversity)
+        return [documents[row] for row in rows]
+    
+    @staticmethod
+    def _has_timestamp_field(doc: Dict[str, Any]) -> bool:
+        metadata = doc.get("metadata") or {}
+        return metadata.get(TIMESTAMP_FIELD) is not None or any(metadata.get(field) for field in SOURCE_FIELDS)
+    
+    @staticmethod
+    def _timestamp(doc: Dict[str, Any]) -> float:
+        timestamp = document_timestamp(doc.get("metadata"))
+        return np.nan if timestamp is None else timestamp
+    
+    def _feature_matrix(self, documents: List[Dict[str, Any]], query: str, deadline: Optional[float] = None) -> np.ndarray:
+        """Compute every ranking feature once per document.
+        
+        Raises:
+            _BudgetExceeded: If ``deadline`` passes before every document is scored
+        
+        Returns:
+            Array of shape (len(documents), len(FEATURES)); see the column constants
+        """
+        features = np.zeros((len(documents), len(FEATURES)), dtype=np.float64)
+        query_lower = query.lower()
+        query_words = query_lower.split()
+        phrase_words = word_tokens(query)
+        variants = query_variants(query)
+        total_query_terms = len(set(extract_terms(query)))
+        features[:, HAS_QUERY_TERMS] = 1.0 if total_query_terms else 0.0
+        
+        for row, doc in enumerate(documents):
+            if deadline is not None and time.time() > deadline:
+                raise _BudgetExceeded()
+            content = doc.get("content", "")
+            features[row, SCORE] = doc.get("score", 0)
             
-            # Get scores from different strategies
-            keyword_score = next((d.get("keyword_score", 0) for d in keyword_results if d.get("id") == doc_id), 0)
-            relevance_score = next((d.get("relevance_score", 0) for d in relevance_results if d.get("id") == doc_id), 0)
-            original_score = doc.get("score", 0)
+            if total_query_terms:
+                features[row, KEYWORD] = overlap_count(variants, term_set(content)) / total_query_terms
             
-            # Combine scores with weights
-            hybrid_score = (
-                original_score * 0.4 +
-                keyword_score * 0.3 +
-                relevance_score * 0.3
-            )
+            # Phrase and order scoring intersect the chunk's positional postings
+            positions = self._stored_term_positions(doc, content) or term_positions(content)
+            if positions.has_phrase(phrase_words):
+                features[row, PHRASE] = 1.0
+            if len(phrase_words) > 1:
+                features[row, ORDER] = positions.order_score(phrase_words)
             
-            doc_scores[doc_id] = hybrid_score
+            # Title/heading relevance
+            title = doc.get("metadata", {}).get("title", "").lower()
+            if title and any(word in title for word in query_words):
+                features[row, TITLE] = 0.8
         
-        # Sort by hybrid score
-        for doc in documents:
-            doc["hybrid_score"] = doc_scores.get(doc.get("id", ""), 0)
+        return features
+    
+    def _stored_term_positions(self, doc: Dict[str, Any], content: str) -> Optional[TermPositions]:
+        """The document's postings from the vector store, if it kept them at ingest."""
+        lookup = getattr(self.vector_store, "term_positions", None)
+        if lookup is None or not doc.get("id"):
+            return None
+        return lookup(doc["id"], content)
+    
+    def _keyword_scores(self, features: np.ndarray) -> np.ndarray:
+        keyword_scores = self._combine((features[:, SCORE], features[:, KEYWORD]), KEYWORD_WEIGHTS)
+        return np.where(features[:, HAS_QUERY_TERMS] > 0, keyword_scores, 0.0)
+    
+    def _relevance_scores(self, features: np.ndarray) -> np.ndarray:
+        return self._combine(
+            (features[:, SCORE], features[:, PHRASE], features[:, ORDER], features[:, TITLE]),
+            RELEVANCE_WEIGHTS
+        )
+    
+    @staticmethod
+    def _combine(columns, weights: np.ndarray) -> np.ndarray:
+        """Weighted sum accumulated left to right, matching scalar evaluation order."""
+        total = columns[0] * weights[0]
+        for column, weight in zip(columns[1:], weights[1:]):
+            total = total + column * weight
+        return total
+    
+    @staticmethod
+    def _lookup_by_id(scores: np.ndarray, ranked_rows: np.ndarray, codes: np.ndarray, id_count: int) -> np.ndarray:
+        """Score of the first ranked document with each document's id, 0 if none ranked."""
+        ranked_codes, first = np.unique(codes[ranked_rows], return_index=True)
+        by_id = np.zeros(id_count, dtype=np.float64)
+        by_id[ranked_codes] = scores[ranked_rows[first]]
+        return by_id[codes]
+    
+    @staticmethod
+    def _top_rows(scores: np.ndarray, eligible: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` best eligible rows, ties kept in input order (stable)."""
+        rows = np.flatnonzero(eligible)
+        if k <= 0 or rows.size == 0:
+            return rows[:0]
         
-        filtered_docs = [doc for doc in documents if doc.get("score", 0) >= min_score]
-        sorted_docs = sorted(filtered_docs, key=lambda x: x["hybrid_score"], reverse=True)
+        values = scores[rows]
+        if rows.size > k:
+            # Everything at or above the k-th best value, then a stable sort of that slice
+            kth_value = values[np.argpartition(-values, k - 1)[k - 1]]
+            keep = values >= kth_value
+            rows, values = rows[keep], values[keep]
         
-        return sorted_docs[:max_results]
+        order = np.lexsort((rows, -values))
+        return rows[order][:k]
     
     def get_reranking_stats(self) -> Dict[str, Any]:
         """Get reranking statistics.
@@ -403,7 +571,8 @@ class RerankerAgent:
         return {
             "default_strategy": self.default_strategy.value,
             "available_strategies": [strategy.value for strategy in RerankingStrategy],
-            "max_reranking_time": self.max_reranking_time
+            "max_reranking_time": self.max_reranking_time,
+            "cross_encoder": self.cross_encoder.get_stats() if self.cross_encoder else None
         }
 
 # Convenience function for easy access
@@ -5,11 +5,21 @@ This module provides document retrieval functionality from vector stores
 with configurable search parameters and result filtering.
 """
 
+import contextvars
+import json
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from dataclasses import dataclass, replace
 
-from ..text_matching import keyword_overlap, non_discriminative_terms
+import numpy as np
+
+from .. import tracing
+from ..metrics import EMBEDDING_BATCH_SIZE
+from ..result_cache import ResultCache
+from ..text_matching import non_discriminative_terms_from_sets, overlap_count, query_variants, term_set
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +31,10 @@ class RetrievalRequest:
     filter_metadata: Optional[Dict[str, Any]] = None
     min_score: float = 0.0
     include_metadata: bool = True
+    time_budget: Optional[float] = None
+    time_range: Optional[Tuple[Optional[float], Optional[float]]] = None  # epoch seconds, inclusive
+    query_vector: Optional[List[float]] = None  # precomputed embedding of ``query``, skips embedding
+    prefetched_results: Optional[List[Any]] = None  # dense search results from a batched search
 
 @dataclass
 class RetrievalResult:
@@ -31,6 +45,21 @@ class RetrievalResult:
     retrieval_time: float
     metadata: Dict[str, Any]
 
+@dataclass
+class CandidateTable:
+    """First-stage candidates for one query, scored once and shared by every filter."""
+    results: List[Any]
+    scores: np.ndarray  # similarity score per candidate
+    overlaps: np.ndarray  # query-term overlap per candidate (non-discriminative terms ignored)
+    protected: np.ndarray  # lexical hits kept regardless of similarity score
+    dedupe_keys: np.ndarray  # interned (id, source, content prefix) per candidate
+
+    def fallback_rows(self, k: int) -> np.ndarray:
+        """Rows with keyword overlap, best overlap then score first, ties in search order."""
+        rows = np.flatnonzero(self.overlaps > 0)
+        order = np.lexsort((-self.scores[rows], -self.overlaps[rows]))
+        return rows[order][:k]
+
 class RetrieverAgent:
     """Retriever agent for document retrieval from vector stores."""
     
@@ -40,7 +69,12 @@ class RetrieverAgent:
         embedder,
         default_k: int = 5,
         min_score_threshold: float = 0.0,
-        max_retrieval_time: float = 10.0
+        max_retrieval_time: float = 10.0,
+        retrieval_mode: str = "dense",
+        rrf_k: int = 60,
+        max_workers: int = 4,
+        cache_size: int = 256,
+        cache_ttl: Optional[float] = 300.0
     ):
         """Initialize retriever agent.
         
@@ -50,12 +84,32 @@ class RetrieverAgent:
             default_k: Default number of documents to retrieve
             min_score_threshold: Minimum similarity score threshold
             max_retrieval_time: Maximum time allowed for retrieval
+            retrieval_mode: 'dense' for vector search only, 'hybrid' to fuse
+                vector and BM25 rankings with reciprocal rank fusion
+            rrf_k: Rank offset used by reciprocal rank fusion
+            max_workers: Size of the thread pool running the extra first-stage
+                searches of hybrid retrieval
+            cache_size: Maximum number of cached retrieval results (0 disables)
+            cache_ttl: Seconds a cached retrieval result stays valid
         """
+        if retrieval_mode not in ("dense", "hybrid"):
+            raise ValueError(f"Unsupported retrieval mode: {retrieval_mode}")
+        
         self.vector_store = vector_store
         self.embedder = embedder
         self.default_k = default_k
         self.min_score_threshold = min_score_threshold
         self.max_retrieval_time = max_retrieval_time
+        self.retrieval_mode = retrieval_mode
+        self.rrf_k = rrf_k
+        self.max_workers = max_workers
+        
+        # Hybrid retrieval runs its second search on this pool while the caller
+        # runs the first; FAISS and NumPy release the GIL
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retriever")
+        
+        # Results are keyed on the store generation, which changes on every write
+        self.cache = ResultCache(max_entries=cache_size, ttl=cache_ttl)
         
         logger.info("Retriever agent initialized")
     
@@ -73,69 +127,89 @@ class RetrieverAgent:
         Returns:
             RetrievalResult with retrieved documents
         """
-        import time
         start_time = time.time()
         
         logger.info(f"Retrieving documents for query: {request.query[:100]}...")
         
         try:
-            # Perform vector search
-            search_results = self.vector_store.search_by_text(
-                text=request.query,
-                embedder=self.embedder,
-                k=request.k,
-                filter_metadata=request.filter_metadata
+            # Read before searching so results are never attributed to a newer index
+            index_generation = getattr(self.vector_store, "generation", None)
+            cache_key = self._cache_key(request)
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                retrieval_time = time.time() - start_time
+                logger.info(f"Retrieved {cached.total_found} documents from cache in {retrieval_time:.3f}s")
+                tracing.set_attributes(cache_hit=True, documents=cached.total_found)
+                return RetrievalResult(
+                    documents=[dict(doc) for doc in cached.documents],
+                    query=request.query,
+                    total_found=cached.total_found,
+                    retrieval_time=retrieval_time,
+                    metadata={**cached.metadata, "context_provided": context is not None, "cache_hit": True}
+                )
+            
+            # Run every first-stage search concurrently under the retrieval deadline
+            time_budget = self.max_retrieval_time
+            if request.time_budget is not None:
+                time_budget = min(time_budget, request.time_budget)
+            outcomes, source_timings, timed_out = self._fan_out(
+                self._first_stage_sources(request),
+                timeout=time_budget - (time.time() - start_time)
             )
+            
+            lexical_scores: Dict[str, float] = {}
+            fusion_scores: Dict[str, float] = {}
+            hybrid = self._use_hybrid()
+            if hybrid:
+                query_vector, dense_results = outcomes.get("dense", (None, []))
+                search_results, lexical_scores, fusion_scores = self._fuse_results(
+                    request, dense_results, outcomes.get("lexical", []), query_vector
+                )
+            else:
+                search_results = outcomes.get("dense", [])
 
-            ignored_terms = non_discriminative_terms(
-                request.query,
-                [result.document.content for result in search_results],
-            )
+            with tracing.span("filter", candidates=len(search_results)):
+                table = self._candidate_table(request.query, search_results, lexical_scores)
+                min_score = max(request.min_score, self.min_score_threshold)
             
-            # Filter results by score
-            filtered_results = [
-                result for result in search_results
-                if result.score >= max(request.min_score, self.min_score_threshold)
-            ]
+                # Filter results by score; lexical matches are kept as keyword evidence
+                passing = (table.scores >= min_score) | table.protected
+                selected = np.flatnonzero(passing)
 
-            if filtered_results and not any(
-                self._keyword_overlap(request.query, result.document.content, ignored_terms=ignored_terms) > 0
-                for result in filtered_results
-            ):
-                filtered_results = []
+                if selected.size and not (table.overlaps[selected] > 0).any():
+                    selected = selected[:0]
 
-            if not filtered_results and search_results:
-                filtered_results = self._fallback_results(search_results, request.query, request.k, ignored_terms)
+                if not selected.size and search_results:
+                    selected = table.fallback_rows(request.k)
             
-            # Convert to document format
-            documents = []
-            seen = set()
-            for result in filtered_results:
-                source = getattr(result.document, "metadata", {}).get("source", "")
-                dedupe_key = (result.document.id, source, result.document.content[:160])
-                if dedupe_key in seen:
-                    continue
-                seen.add(dedupe_key)
+                # Convert to document format
+                documents = []
+                seen = set()
+                for row in selected.tolist():
+                    dedupe_key = int(table.dedupe_keys[row])
+                    if dedupe_key in seen:
+                        continue
+                    seen.add(dedupe_key)
 
-                keyword_overlap = self._keyword_overlap(
-                    request.query,
-                    result.document.content,
-                    ignored_terms=ignored_terms,
-                )
-                doc = {
-                    "id": result.document.id,
-                    "content": result.document.content,
-                    "score": result.score,
-                    "rank": result.rank,
-                    "keyword_overlap": keyword_overlap,
-                }
+                    result = table.results[row]
+                    doc = {
+                        "id": result.document.id,
+                        "content": result.document.content,
+                        "score": result.score,
+                        "rank": result.rank,
+                        "keyword_overlap": int(table.overlaps[row]),
+                    }
+                    if result.document.id in fusion_scores:
+                        doc["lexical_score"] = lexical_scores.get(result.document.id, 0.0)
+                        doc["fusion_score"] = fusion_scores[result.document.id]
                 
-                if request.include_metadata:
-                    doc["metadata"] = result.document.metadata
+                    if request.include_metadata:
+                        doc["metadata"] = result.document.metadata
                 
-                documents.append(doc)
+                    documents.append(doc)
             
             retrieval_time = time.time() - start_time
+            tracing.set_attributes(cache_hit=False, documents=len(documents))
             
             # Create result
             result = RetrievalResult(
@@ -145,16 +219,30 @@ class RetrieverAgent:
                 retrieval_time=retrieval_time,
                 metadata={
                     "k_requested": request.k,
-                    "min_score_used": max(request.min_score, self.min_score_threshold),
-                    "filter_applied": request.filter_metadata is not None,
-                    "fallback_used": not bool([
-                        result for result in search_results
-                        if result.score >= max(request.min_score, self.min_score_threshold)
-                    ]),
-                    "context_provided": context is not None
+                    "retrieval_mode": "hybrid" if hybrid else "dense",
+                    "min_score_used": min_score,
+                    "filter_applied": request.filter_metadata is not None or request.time_range is not None,
+                    "fallback_used": not bool(passing.any()),
+                    "context_provided": context is not None,
+                    "time_budget": time_budget,
+                    "source_timings": source_timings,
+                    "sources_timed_out": timed_out,
+                    "partial": bool(timed_out),
+                    "cache_hit": False,
+                    "index_generation": index_generation if isinstance(index_generation, int) else None
                 }
             )
             
+            # Partial results are not cached so a later, unhurried query can do better
+            if cache_key is not None and not timed_out:
+                self.cache.put(cache_key, RetrievalResult(
+                    documents=[dict(doc) for doc in documents],
+                    query=request.query,
+                    total_found=len(documents),
+                    retrieval_time=retrieval_time,
+                    metadata=dict(result.metadata)
+                ))
+            
             logger.info(f"Retrieved {len(documents)} documents in {retrieval_time:.3f}s")
             return result
             
@@ -169,6 +257,80 @@ class RetrieverAgent:
                 metadata={"error": str(e)}
             )
     
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries with one embedder call.
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            One vector per query, in input order
+        """
+        if not queries:
+            return []
+        with tracing.span("embed", queries=len(queries)):
+            if hasattr(self.embedder, "embed_texts_sync"):
+                EMBEDDING_BATCH_SIZE.labels("query").observe(len(queries))
+                result = self.embedder.embed_texts_sync(queries)
+            elif hasattr(self.embedder, "embed_texts"):
+                EMBEDDING_BATCH_SIZE.labels("query").observe(len(queries))
+                result = self.embedder.embed_texts(queries)
+            else:
+                return [self.vector_store.embed_query(query, self.embedder) for query in queries]
+        vectors = result.embeddings if hasattr(result, "embeddings") else result
+        return [[float(value) for value in vector] for vector in vectors]
+    
+    def retrieve_batch(
+        self,
+        requests: List[RetrievalRequest],
+        context: Optional[Dict[str, Any]] = None
+    ) -> List[RetrievalResult]:
+        """Retrieve documents for several requests with vectorized first stages.
+        
+        Queries without a ``query_vector`` are embedded in one call, and the
+        dense search runs as one batched FAISS search per distinct filter.
+        Each request then goes through the usual per-query scoring, filtering
+        and caching in ``retrieve_documents``.
+        
+        Args:
+            requests: Retrieval requests
+            context: Optional context information
+            
+        Returns:
+            RetrievalResult per request, in input order
+        """
+        requests = list(requests)
+        missing = [i for i, request in enumerate(requests) if request.query_vector is None]
+        if missing:
+            vectors = self.embed_queries([requests[i].query for i in missing])
+            for i, vector in zip(missing, vectors):
+                requests[i] = replace(requests[i], query_vector=vector)
+        
+        if hasattr(self.vector_store, "search_batch"):
+            groups: Dict[Tuple[Any, ...], List[int]] = defaultdict(list)
+            for i, request in enumerate(requests):
+                filters = json.dumps(request.filter_metadata, sort_keys=True, default=str) if request.filter_metadata else None
+                groups[(filters, request.time_range)].append(i)
+            
+            for indices in groups.values():
+                first = requests[indices[0]]
+                # Top-k of a deeper search equals a top-k search, so one k serves the group
+                with tracing.span("dense_search", queries=len(indices)):
+                    batch_results = self.vector_store.search_batch(
+                        [requests[i].query_vector for i in indices],
+                        k=max(requests[i].k for i in indices),
+                        filter_metadata=first.filter_metadata,
+                        time_range=first.time_range
+                    )
+                for i, results in zip(indices, batch_results):
+                    requests[i] = replace(requests[i], prefetched_results=results[:requests[i].k])
+        
+        results = []
+        for request in requests:
+            with tracing.span("request"):
+                results.append(self.retrieve_documents(request, context))
+        return results
+    
     def retrieve_similar_documents(
         self,
         document_id: str,
@@ -293,31 +455,220 @@ class RetrieverAgent:
                 "default_k": self.default_k,
                 "min_score_threshold": self.min_score_threshold,
                 "max_retrieval_time": self.max_retrieval_time,
+                "retrieval_mode": self.retrieval_mode,
+                "max_workers": self.max_workers,
+                "cache": self.cache.get_stats(),
                 "embedder_info": getattr(self.embedder, 'get_model_info', lambda: {})()
             }
         except Exception as e:
             logger.error(f"Error getting retrieval stats: {e}")
             return {"error": str(e)}
 
-    def _keyword_overlap(self, query: str, content: str, *, ignored_terms=None) -> int:
-        return keyword_overlap(query, content, ignored_terms=ignored_terms)
+    def _cache_key(self, request: RetrievalRequest) -> Optional[Tuple[Any, ...]]:
+        """Build the result cache key, or None when results cannot be cached.
+        
+        Stores without an integer ``generation`` counter cannot signal writes,
+        so their results are never cached.
+        """
+        generation = getattr(self.vector_store, "generation", None)
+        if not self.cache.enabled or not isinstance(generation, int):
+            return None
+        
+        filters = json.dumps(request.filter_metadata, sort_keys=True, default=str) if request.filter_metadata else None
+        return (
+            " ".join(request.query.lower().split()),
+            request.k,
+            filters,
+            request.min_score,
+            request.include_metadata,
+            request.time_range,
+            self.retrieval_mode,
+            generation,
+        )
+
+    def _use_hybrid(self) -> bool:
+        return self.retrieval_mode == "hybrid" and hasattr(self.vector_store, "search_lexical")
 
-    def _fallback_results(self, search_results, query: str, k: int, ignored_terms=None):
-        """Use query-term overlap as a fallback when strict similarity filtering removes everything."""
-        ranked = sorted(
-            search_results,
-            key=lambda result: (
-                self._keyword_overlap(query, result.document.content, ignored_terms=ignored_terms),
-                result.score,
+    def _first_stage_sources(self, request: RetrievalRequest) -> Dict[str, Callable[[], Any]]:
+        """Build the first-stage searches to run for a request, keyed by source name."""
+        # Time ranges are filtered inside the store's indexes rather than after retrieval
+        extra = {"time_range": request.time_range} if request.time_range is not None else {}
+        
+        if not self._use_hybrid():
+            if request.prefetched_results is not None:
+                return {"dense": lambda: request.prefetched_results}
+            if request.query_vector is not None:
+                return {
+                    "dense": lambda: self.vector_store.search(
+                        request.query_vector, k=request.k, filter_metadata=request.filter_metadata, **extra
+                    )
+                }
+            return {
+                "dense": lambda: self.vector_store.search_by_text(
+                    text=request.query,
+                    embedder=self.embedder,
+                    k=request.k,
+                    filter_metadata=request.filter_metadata,
+                    **extra
+                )
+            }
+        
+        def dense_search():
+            if request.prefetched_results is not None:
+                return request.query_vector, request.prefetched_results
+            query_vector = request.query_vector
+            if query_vector is None:
+                query_vector = self.vector_store.embed_query(request.query, self.embedder)
+            return query_vector, self.vector_store.search(
+                query_vector, k=request.k, filter_metadata=request.filter_metadata, **extra
+            )
+        
+        return {
+            "dense": dense_search,
+            "lexical": lambda: self.vector_store.search_lexical(
+                request.query, k=request.k, filter_metadata=request.filter_metadata, **extra
             ),
-            reverse=True,
-        )
-        fallback = [
-            result
-            for result in ranked
-            if self._keyword_overlap(query, result.document.content, ignored_terms=ignored_terms) > 0
+        }
+
+    def _fan_out(
+        self,
+        sources: Dict[str, Callable[[], Any]],
+        timeout: float
+    ) -> Tuple[Dict[str, Any], Dict[str, float], List[str]]:
+        """Run sources in parallel and collect whichever finish before the deadline.
+        
+        The first source runs on the calling thread and only the others go to
+        the pool. A pooled source that has not started by the time the first
+        one finishes is taken back and run on the calling thread too, so a
+        query never waits in the pool queue behind other queries. Pooled
+        sources that started but miss the deadline are abandoned (their
+        threads finish in the background) and reported as timed out; sources
+        run on the calling thread always complete. A source that raises is
+        logged and treated as having returned nothing.
+        
+        Returns:
+            Tuple of (results by source, elapsed seconds by source, timed-out source names)
+        """
+        deadline = time.monotonic() + max(timeout, 0.0)
+        outcomes: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        timed_out: List[str] = []
+        errors: List[Exception] = []
+        
+        def timed(name: str, source: Callable[[], Any]):
+            started = time.perf_counter()
+            with tracing.span(f"{name}_search"):
+                result = source()
+            return result, time.perf_counter() - started
+        
+        def run_inline(name: str, source: Callable[[], Any]) -> None:
+            try:
+                outcomes[name], timings[name] = timed(name, source)
+            except Exception as e:
+                logger.error(f"Retrieval source {name} failed: {e}")
+                errors.append(e)
+        
+        (first, first_source), *others = sources.items()
+        # Each pooled source runs in a copy of this context so its spans join the current trace
+        futures = {
+            name: self._executor.submit(contextvars.copy_context().run, timed, name, source)
+            for name, source in others
+        }
+        run_inline(first, first_source)
+        
+        pending = {}
+        for name, future in futures.items():
+            if future.cancel():
+                run_inline(name, sources[name])
+            else:
+                pending[name] = future
+        wait(pending.values(), timeout=max(deadline - time.monotonic(), 0.0))
+        
+        for name, future in pending.items():
+            if not future.done():
+                timed_out.append(name)
+                continue
+            try:
+                outcomes[name], timings[name] = future.result()
+            except Exception as e:
+                logger.error(f"Retrieval source {name} failed: {e}")
+                errors.append(e)
+        
+        if timed_out:
+            logger.warning(f"Retrieval sources timed out after {timeout:.3f}s: {timed_out}")
+        if not outcomes and errors:
+            raise errors[0]
+        return outcomes, timings, timed_out
+
+    def _fuse_results(
+        self,
+        request: RetrievalRequest,
+        dense_results: List[Any],
+        lexical_results: List[Any],
+        query_vector: Optional[List[float]]
+    ):
+        """Fuse dense and BM25 rankings with reciprocal rank fusion.
+        
+        Returns:
+            Tuple of (fused search results, lexical scores by id, fusion scores by id).
+            Fused results carry the dense similarity score so score thresholds keep
+            their meaning; lexical-only hits are scored against their stored vectors
+            when the query vector is available.
+        """
+        from ..vector_stores import SearchResult
+        
+        fusion_scores: Dict[str, float] = {}
+        documents = {}
+        for ranking in (dense_results, lexical_results):
+            for position, result in enumerate(ranking):
+                doc_id = result.document.id
+                fusion_scores[doc_id] = fusion_scores.get(doc_id, 0.0) + 1.0 / (self.rrf_k + position + 1)
+                documents.setdefault(doc_id, result.document)
+        dense_scores = {result.document.id: result.score for result in dense_results}
+        lexical_scores = {result.document.id: result.score for result in lexical_results}
+        
+        lexical_only = [doc_id for doc_id in lexical_scores if doc_id not in dense_scores]
+        if lexical_only and query_vector is not None:
+            dense_scores.update(zip(
+                lexical_only,
+                self.vector_store.score_documents(query_vector, lexical_only)
+            ))
+        
+        ranked_ids = sorted(fusion_scores, key=lambda doc_id: fusion_scores[doc_id], reverse=True)[:request.k]
+        fused = [
+            SearchResult(document=documents[doc_id], score=dense_scores.get(doc_id, 0.0), rank=rank)
+            for rank, doc_id in enumerate(ranked_ids, start=1)
         ]
-        return fallback[:k]
+        return fused, lexical_scores, {doc_id: fusion_scores[doc_id] for doc_id in ranked_ids}
+
+    def _candidate_table(
+        self,
+        query: str,
+        search_results: List[Any],
+        lexical_scores: Dict[str, float]
+    ) -> CandidateTable:
+        """Tokenize each candidate once and derive scores, overlaps and dedupe keys."""
+        count = len(search_results)
+        content_terms = [term_set(result.document.content) for result in search_results]
+        ignored_terms = non_discriminative_terms_from_sets(query, content_terms)
+        variants = query_variants(query, ignored_terms=ignored_terms)
+        
+        scores = np.fromiter((result.score for result in search_results), dtype=np.float64, count=count)
+        overlaps = np.fromiter(
+            (overlap_count(variants, terms) for terms in content_terms), dtype=np.int32, count=count
+        )
+        protected = np.fromiter(
+            (result.document.id in lexical_scores for result in search_results), dtype=bool, count=count
+        )
+        
+        key_ids: Dict[Tuple[str, str, str], int] = {}
+        dedupe_keys = np.empty(count, dtype=np.int32)
+        for row, result in enumerate(search_results):
+            source = getattr(result.document, "metadata", {}).get("source", "")
+            key = (result.document.id, source, result.document.content[:160])
+            dedupe_keys[row] = key_ids.setdefault(key, len(key_ids))
+        
+        return CandidateTable(search_results, scores, overlaps, protected, dedupe_keys)
 
 # Convenience function for easy access
 def create_retriever_agent(vector_store, embedder, **kwargs) -> RetrieverAgent:
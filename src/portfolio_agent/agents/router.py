@@ -6,12 +6,22 @@ which agents should handle specific queries.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+import re
+import threading
+from typing import Dict, Any, Hashable, Iterable, List, Optional, Set
 from enum import Enum
 from dataclasses import dataclass
 
+import numpy as np
+
+from ..vector_stores.mmr import unit_rows
+
 logger = logging.getLogger(__name__)
 
+WORD_PATTERN = re.compile(r"\w+")
+PLURAL_SUFFIXES = ("", "s", "es")
+_OUTPUTS = ""  # trie key for keywords ending at a node; never a \w+ token
+
 class QueryType(Enum):
     """Types of queries that can be routed."""
     GENERAL = "general"
@@ -31,17 +41,162 @@ class RoutingDecision:
     reasoning: str
     suggested_agents: List[str]
     metadata: Dict[str, Any]
+    query_vector: Optional[List[float]] = None  # set by semantic routing for reuse downstream
+
+# Example utterances whose mean embedding is the centroid of each query type
+SEMANTIC_EXAMPLES = {
+    QueryType.GENERAL: [
+        "Give me an overview",
+        "What can you tell me?",
+        "Summarize this portfolio",
+    ],
+    QueryType.TECHNICAL: [
+        "Which programming languages and frameworks do you use?",
+        "How did you design the backend architecture?",
+        "What machine learning and data tooling do you work with?",
+        "How do you approach testing and deployment?",
+    ],
+    QueryType.PROJECT: [
+        "What projects have you built?",
+        "Show me a case study from your portfolio",
+        "What did you launch and which stack did it use?",
+        "Is there a demo or repository for your work?",
+    ],
+    QueryType.EXPERIENCE: [
+        "What is your professional experience?",
+        "Describe your work history and past roles",
+        "What were your responsibilities and achievements at previous jobs?",
+        "How many years have you worked in the industry?",
+    ],
+    QueryType.EDUCATION: [
+        "Where did you study?",
+        "What degree or certifications do you have?",
+        "Which university or college did you attend?",
+        "What courses have you taken?",
+    ],
+    QueryType.CONTACT: [
+        "How can I contact you?",
+        "What is your email address or LinkedIn?",
+        "Are you available for hire?",
+        "Which timezone are you based in?",
+    ],
+    QueryType.PERSONAL: [
+        "Tell me about yourself",
+        "What are your hobbies and interests?",
+        "What motivates you and what are your values?",
+        "What is your personal story?",
+    ],
+}
+
+class KeywordMatcher:
+    """Multi-pattern keyword matcher compiled once from routing patterns.
+
+    Keywords are stored in a trie keyed on whole words, so a single walk over
+    the query tokens reports every keyword of every label, including
+    overlapping ones such as "work" and "work history". Matches are
+    word-bounded ("ai" does not fire inside "email"), and the last word of a
+    keyword also accepts a plural "s"/"es" suffix so "projects" still counts
+    as "project".
+    """
+
+    __slots__ = ("_trie", "_max_words")
+
+    def __init__(self, patterns: Dict[Hashable, Iterable[str]]):
+        """Compile the matcher.
+
+        Args:
+            patterns: Mapping of label to keywords or phrases
+        """
+        self._trie: Dict[str, Any] = {}
+        self._max_words = 0
+        for label, keywords in patterns.items():
+            for keyword in keywords:
+                self._add(label, keyword)
+
+    def _add(self, label: Hashable, keyword: str) -> None:
+        words = WORD_PATTERN.findall(keyword.lower())
+        if not words:
+            return
+        normalized = " ".join(words)
+        self._max_words = max(self._max_words, len(words))
+        for suffix in PLURAL_SUFFIXES:
+            node = self._trie
+            for word in words[:-1]:
+                node = node.setdefault(word, {})
+            node = node.setdefault(words[-1] + suffix, {})
+            node.setdefault(_OUTPUTS, set()).add((label, normalized))
+
+    def match(self, text: str) -> Dict[Hashable, Set[str]]:
+        """Find the keywords present in ``text``.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Mapping of label to the set of matched (normalized) keywords
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        trie = self._trie
+        max_words = self._max_words
+        matches: Dict[Hashable, Set[str]] = {}
+        for start in range(len(words)):
+            node = trie.get(words[start])
+            position = start
+            while node is not None:
+                outputs = node.get(_OUTPUTS)
+                if outputs:
+                    for label, keyword in outputs:
+                        matches.setdefault(label, set()).add(keyword)
+                position += 1
+                if position >= len(words) or position - start >= max_words:
+                    break
+                node = node.get(words[position])
+        return matches
+
 
 class RouterAgent:
     """Router agent for query classification and routing."""
     
-    def __init__(self, confidence_threshold: float = 0.7):
+    def __init__(
+        self,
+        confidence_threshold: float = 0.7,
+        extra_patterns: Optional[Dict[str, List[str]]] = None,
+        routing_mode: str = "keyword",
+        embedder=None,
+        semantic_examples: Optional[Dict[str, List[str]]] = None,
+    ):
         """Initialize router agent.
         
         Args:
             confidence_threshold: Minimum confidence for routing decisions
+            extra_patterns: Additional keywords per query type value
+                (e.g. ``{"technical": ["kubernetes"]}``)
+            routing_mode: 'keyword' to score keyword matches, 'semantic' to
+                compare the query embedding against per-type centroids
+            embedder: Embedding model, required for semantic routing
+            semantic_examples: Example utterances per query type value,
+                replacing the built-in examples for the types given
+
+        Raises:
+            ValueError: If ``extra_patterns`` or ``semantic_examples`` names an
+                unknown query type, or semantic routing has no embedder
         """
+        if routing_mode not in ("keyword", "semantic"):
+            raise ValueError(f"Unsupported routing mode: {routing_mode}")
+        if routing_mode == "semantic" and embedder is None:
+            raise ValueError("Semantic routing requires an embedder")
+        
         self.confidence_threshold = confidence_threshold
+        self.routing_mode = routing_mode
+        self.embedder = embedder
+        
+        # Centroids are embedded on first use so construction never calls the model
+        self.semantic_examples = dict(SEMANTIC_EXAMPLES)
+        for type_value, examples in (semantic_examples or {}).items():
+            self.semantic_examples[self._query_type(type_value)] = list(examples)
+        self._centroid_types: List[QueryType] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_lock = threading.Lock()
         
         # Define routing patterns and keywords
         self.routing_patterns = {
@@ -98,37 +253,138 @@ class RouterAgent:
         
         # Default routing for unknown queries
         self.default_agents = ["retriever", "persona"]
+
+        for type_value, keywords in (extra_patterns or {}).items():
+            self._merge_keywords(type_value, keywords)
+        self.compile_patterns()
         
         logger.info("Router agent initialized")
+
+    def _query_type(self, type_value: str) -> QueryType:
+        try:
+            query_type = QueryType(type_value.lower())
+        except ValueError:
+            query_type = None
+        if query_type is None or query_type == QueryType.UNKNOWN:
+            raise ValueError(f"Unknown routing query type: {type_value}")
+        return query_type
+
+    def _merge_keywords(self, type_value: str, keywords: List[str]) -> None:
+        query_type = self._query_type(type_value)
+        pattern_info = self.routing_patterns.setdefault(
+            query_type, {"keywords": [], "agents": list(self.default_agents)}
+        )
+        existing = pattern_info["keywords"]
+        for keyword in keywords:
+            if keyword.lower() not in existing:
+                existing.append(keyword.lower())
+
+    def add_patterns(self, query_type: str, keywords: List[str]) -> None:
+        """Add routing keywords for a query type and recompile the matcher.
+
+        Args:
+            query_type: Query type value, e.g. ``"technical"``
+            keywords: Keywords or phrases to add
+        """
+        self._merge_keywords(query_type, keywords)
+        self.compile_patterns()
+
+    def compile_patterns(self) -> None:
+        """Compile ``routing_patterns`` into the keyword matcher.
+
+        Call this after editing ``routing_patterns`` directly.
+        """
+        self.matcher = KeywordMatcher({
+            query_type: pattern_info["keywords"]
+            for query_type, pattern_info in self.routing_patterns.items()
+        })
     
-    def route_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> RoutingDecision:
+    def route_query(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> RoutingDecision:
         """Route a query to appropriate agents.
         
         Args:
             query: The user query to route
             context: Optional context information
+            query_vector: Precomputed query embedding for semantic routing
             
         Returns:
-            RoutingDecision with routing information
+            RoutingDecision with routing information; in semantic mode its
+            ``query_vector`` holds the embedding so retrieval can reuse it
         """
         logger.info(f"Routing query: {query[:100]}...")
         
-        # Analyze the query
-        query_lower = query.lower().strip()
+        if self.routing_mode == "semantic":
+            if query_vector is None:
+                query_vector = self._embed_query(query)
+            query_vector = [float(value) for value in query_vector]
+            type_scores = self._semantic_scores([query_vector])[0]
+        else:
+            # Score every query type from a single pass over the query
+            matches = self.matcher.match(query.lower().strip())
+            type_scores = {}
+            for query_type, pattern_info in self.routing_patterns.items():
+                score = self._calculate_type_score(
+                    matches.get(query_type, set()), len(pattern_info["keywords"])
+                )
+                type_scores[query_type] = score
+        
+        return self._decision(query, context, type_scores, query_vector)
+    
+    def route_batch(
+        self,
+        queries: List[str],
+        contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+        query_vectors: Optional[List[List[float]]] = None
+    ) -> List[RoutingDecision]:
+        """Route several queries at once.
+        
+        Semantic routing embeds any missing vectors in one call and scores
+        every query against every centroid with a single matrix product;
+        keyword routing scores each query with the compiled matcher.
         
-        # Calculate scores for each query type
-        type_scores = {}
-        for query_type, pattern_info in self.routing_patterns.items():
-            score = self._calculate_type_score(query_lower, pattern_info["keywords"])
-            type_scores[query_type] = score
+        Args:
+            queries: The user queries to route
+            contexts: Optional context per query
+            query_vectors: Precomputed query embeddings, one per query
+            
+        Returns:
+            RoutingDecision per query, in input order
+        """
+        contexts = contexts if contexts is not None else [None] * len(queries)
+        if self.routing_mode != "semantic":
+            return [self.route_query(query, context) for query, context in zip(queries, contexts)]
+        if not queries:
+            return []
         
+        if query_vectors is None:
+            query_vectors = self._embed_texts(list(queries))
+        query_vectors = [[float(value) for value in vector] for vector in query_vectors]
+        return [
+            self._decision(query, context, type_scores, query_vector)
+            for query, context, type_scores, query_vector in zip(
+                queries, contexts, self._semantic_scores(query_vectors), query_vectors
+            )
+        ]
+    
+    def _decision(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        type_scores: Dict[QueryType, float],
+        query_vector: Optional[List[float]]
+    ) -> RoutingDecision:
         # Find the best match
         best_type = max(type_scores.items(), key=lambda x: x[1])
         query_type, confidence = best_type
         
         # Determine suggested agents
         if confidence >= self.confidence_threshold:
-            suggested_agents = self.routing_patterns[query_type]["agents"]
+            suggested_agents = self.routing_patterns.get(query_type, {}).get("agents", self.default_agents)
             reasoning = f"Query classified as {query_type.value} with {confidence:.2f} confidence"
         else:
             query_type = QueryType.UNKNOWN
@@ -144,49 +400,78 @@ class RouterAgent:
             metadata={
                 "all_scores": {k.value: v for k, v in type_scores.items()},
                 "query_length": len(query),
-                "context_provided": context is not None
-            }
+                "context_provided": context is not None,
+                "routing_mode": self.routing_mode
+            },
+            query_vector=query_vector if self.routing_mode == "semantic" else None
         )
         
         logger.info(f"Routing decision: {query_type.value} -> {suggested_agents}")
         return decision
     
-    def _calculate_type_score(self, query: str, keywords: List[str]) -> float:
-        """Calculate score for a query type based on keyword matching.
+    def _embed_query(self, query: str) -> List[float]:
+        if hasattr(self.embedder, "embed_single_sync"):
+            return self.embedder.embed_single_sync(query)
+        return self._embed_texts([query])[0]
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if hasattr(self.embedder, "embed_texts_sync"):
+            result = self.embedder.embed_texts_sync(texts)
+        else:
+            result = self.embedder.embed_texts(texts)
+        return result.embeddings if hasattr(result, "embeddings") else result
+
+    def _semantic_centroids(self) -> np.ndarray:
+        """Unit-length centroid per query type, embedded once on first use."""
+        if self._centroids is None:
+            with self._centroid_lock:
+                if self._centroids is None:
+                    types = [query_type for query_type, examples in self.semantic_examples.items() if examples]
+                    texts = [example for query_type in types for example in self.semantic_examples[query_type]]
+                    vectors = unit_rows(np.asarray(self._embed_texts(texts), dtype=np.float32))
+                    
+                    centroids, offset = [], 0
+                    for query_type in types:
+                        count = len(self.semantic_examples[query_type])
+                        centroids.append(vectors[offset:offset + count].mean(axis=0))
+                        offset += count
+                    
+                    self._centroid_types = types
+                    self._centroids = unit_rows(np.vstack(centroids))
+                    logger.info(f"Built {len(types)} semantic routing centroids from {len(texts)} examples")
+        return self._centroids
+
+    def _semantic_scores(self, query_vectors: List[List[float]]) -> List[Dict[QueryType, float]]:
+        """Cosine similarity of each query to every centroid, clipped to [0, 1]."""
+        centroids = self._semantic_centroids()
+        similarities = np.clip(unit_rows(np.asarray(query_vectors, dtype=np.float32)) @ centroids.T, 0.0, 1.0)
+        scores = []
+        for row in similarities:
+            type_scores = {query_type: 0.0 for query_type in self.routing_patterns}
+            for query_type, similarity in zip(self._centroid_types, row):
+                type_scores[query_type] = float(similarity)
+            scores.append(type_scores)
+        return scores
+
+    def _calculate_type_score(self, matched: Set[str], total_keywords: int) -> float:
+        """Calculate score for a query type from its matched keywords.
         
         Args:
-            query: The query text
-            keywords: List of keywords for the type
+            matched: Keywords of the type found in the query
+            total_keywords: Number of keywords defined for the type
             
         Returns:
             Score between 0 and 1
         """
-        if not query or not keywords:
+        if not matched or total_keywords <= 0:
             return 0.0
         
-        # Count keyword matches
-        matches = 0
-        total_keywords = len(keywords)
-        
-        for keyword in keywords:
-            if keyword in query:
-                matches += 1
-        
-        # Calculate base score
-        base_score = matches / total_keywords if total_keywords > 0 else 0.0
-        
-        # Boost score for exact phrase matches
-        phrase_boost = 0.0
-        for keyword in keywords:
-            if keyword in query:
-                # Check if it's a phrase (multiple words)
-                if len(keyword.split()) > 1:
-                    phrase_boost += 0.1
-        
-        # Combine scores
-        final_score = min(1.0, base_score + phrase_boost)
+        # Base score is the fraction of keywords matched; multi-word phrases
+        # are stronger evidence and get an extra boost each
+        base_score = len(matched) / total_keywords
+        phrase_boost = 0.1 * sum(1 for keyword in matched if " " in keyword)
         
-        return final_score
+        return min(1.0, base_score + phrase_boost)
     
     def get_available_agents(self) -> List[str]:
         """Get list of available agents.
@@ -228,7 +513,10 @@ class RouterAgent:
         """
         return {
             "total_patterns": len(self.routing_patterns),
+            "total_keywords": sum(len(info["keywords"]) for info in self.routing_patterns.values()),
             "confidence_threshold": self.confidence_threshold,
+            "routing_mode": self.routing_mode,
+            "semantic_centroids": len(self._centroid_types),
             "available_agents": self.get_available_agents(),
             "query_types": [qt.value for qt in QueryType]
         }
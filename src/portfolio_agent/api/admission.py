@@ -0,0 +1,265 @@
+"""
+Admission control for the supported API.
+
+Each endpoint group (queries, document ingestion) gets a bounded number of
+in-flight requests plus a short FIFO wait queue. Requests that find the queue
+full are shed immediately with 429, and requests that wait longer than the
+group's maximum queue time get 503; both carry ``Retry-After``. Keeping excess
+work out of the embedder and FAISS holds tail latency for admitted requests.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the service-time moving average
+SERVICE_TIME_ALPHA = 0.2
+
+
+@dataclass
+class AdmissionLimits:
+    """Limits for one endpoint group."""
+    max_concurrency: int
+    max_queue: int
+    max_wait: float
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """In-flight limit with a bounded FIFO wait queue for one endpoint group.
+
+    Released slots are handed directly to the oldest waiter, so a queued
+    request never loses its place to a newly arriving one. All methods must be
+    called from the event loop serving the app.
+    """
+
+    def __init__(self, name: str, limits: AdmissionLimits):
+        """Initialize the limiter.
+
+        Args:
+            name: Endpoint group name, used in metrics and errors
+            limits: Concurrency, queue size and maximum queue time
+        """
+        self.name = name
+        self.limits = limits
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time: Optional[float] = None
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "admitted_from_queue": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "max_queue_depth": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Wait for an in-flight slot.
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: If the queue is full (429) or the wait exceeds
+                ``max_wait`` (503)
+        """
+        if self.in_flight < self.limits.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self._stats["admitted"] += 1
+            return 0.0
+
+        if len(self._waiters) >= self.limits.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise AdmissionRejected(429, f"Too many {self.name} requests in flight", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.limits.max_wait)
+        except asyncio.TimeoutError:
+            # A slot handed over just as the wait expired is kept rather than leaked
+            if not self._handed_over(waiter):
+                self._stats["rejected_timeout"] += 1
+                raise AdmissionRejected(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if self._handed_over(waiter):
+                self.release()
+            raise
+
+        # The releasing request passed its slot on without decrementing in_flight
+        waited = time.monotonic() - started
+        self._stats["admitted"] += 1
+        self._stats["admitted_from_queue"] += 1
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return waited
+
+    def _handed_over(self, waiter: asyncio.Future) -> bool:
+        """Whether ``waiter`` received a slot; if not, drop it from the queue."""
+        if waiter.done() and not waiter.cancelled():
+            return True
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        return False
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot, handing it to the oldest live waiter if there is one.
+
+        Args:
+            service_time: Seconds the finished request held its slot
+        """
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += SERVICE_TIME_ALPHA * (service_time - self._service_time)
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Whole seconds until a slot is likely free, from the service-time average."""
+        service_time = self._service_time if self._service_time is not None else self.limits.max_wait
+        backlog = (len(self._waiters) + 1) / max(self.limits.max_concurrency, 1)
+        return max(1, math.ceil(service_time * backlog))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current load and cumulative admission counters."""
+        waited = self._stats["admitted_from_queue"]
+        return {
+            **asdict(self.limits),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            **self._stats,
+            "wait_time_avg": self._stats["wait_time_total"] / waited if waited else 0.0,
+            "service_time_avg": self._service_time or 0.0,
+        }
+
+
+class AdmissionController:
+    """Routes requests to the limiter of their endpoint group."""
+
+    def __init__(self, limits: Dict[str, AdmissionLimits], prefixes: Dict[str, str]):
+        """Initialize the controller.
+
+        Args:
+            limits: Limits per endpoint group; groups with ``max_concurrency``
+                of 0 or less are not limited
+            prefixes: Path prefix per endpoint group, e.g. ``{"/api/v1/query": "query"}``
+        """
+        self.limiters = {
+            name: AdmissionLimiter(name, group_limits)
+            for name, group_limits in limits.items()
+            if group_limits.max_concurrency > 0
+        }
+        # Longest prefix first so nested paths resolve to the most specific group
+        self.prefixes: Tuple[Tuple[str, str], ...] = tuple(
+            sorted(prefixes.items(), key=lambda item: len(item[0]), reverse=True)
+        )
+
+    @classmethod
+    def from_settings(cls, prefix: str = "/api/v1") -> "AdmissionController":
+        """Build the controller from ``ADMISSION_*`` settings."""
+        if not settings.ADMISSION_ENABLED:
+            return cls({}, {})
+        return cls(
+            limits={
+                "query": AdmissionLimits(
+                    max_concurrency=settings.ADMISSION_QUERY_MAX_CONCURRENCY,
+                    max_queue=settings.ADMISSION_QUERY_MAX_QUEUE,
+                    max_wait=settings.ADMISSION_QUERY_MAX_WAIT,
+                ),
+                "documents": AdmissionLimits(
+                    max_concurrency=settings.ADMISSION_DOCUMENTS_MAX_CONCURRENCY,
+                    max_queue=settings.ADMISSION_DOCUMENTS_MAX_QUEUE,
+                    max_wait=settings.ADMISSION_DOCUMENTS_MAX_WAIT,
+                ),
+            },
+            prefixes={f"{prefix}/query": "query", f"{prefix}/documents": "documents"},
+        )
+
+    def limiter_for(self, path: str) -> Optional[AdmissionLimiter]:
+        for prefix, name in self.prefixes:
+            if path.startswith(prefix):
+                return self.limiters.get(name)
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests.
+
+    The slot is held until the response body has been sent, so streamed
+    responses count as in flight for their whole duration.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self.controller.limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as rejection:
+            logger.warning(f"Rejected {scope['path']}: {rejection.reason}")
+            response = JSONResponse(
+                status_code=rejection.status_code,
+                content={
+                    "error": "Too Many Requests" if rejection.status_code == 429 else "Service Unavailable",
+                    "message": rejection.reason,
+                    "retry_after": rejection.retry_after,
+                },
+                headers={"Retry-After": str(rejection.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
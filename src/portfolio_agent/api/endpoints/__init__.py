@@ -1,5 +1,5 @@
 """Supported API endpoints."""
 
-from . import documents, health, query
+from . import documents, health, metrics, query
 
-__all__ = ["health", "query", "documents"]
+__all__ = ["health", "query", "documents", "metrics"]
@@ -7,6 +7,7 @@ import os
 import tempfile
 
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 from ..models import DocumentRequest, DocumentResponse
 from ...sdk import PortfolioAgent
@@ -28,7 +29,9 @@ async def add_document(request: DocumentRequest, agent: PortfolioAgent = Depends
     """Index raw text into the local vector store."""
 
     try:
-        result = agent.add_text(
+        # Chunking and embedding are CPU-bound; keep them off the event loop
+        result = await run_in_threadpool(
+            agent.add_text,
             request.content,
             source=request.source or "api",
             metadata=request.metadata,
@@ -59,7 +62,7 @@ async def upload_document(file: UploadFile = File(...), agent: PortfolioAgent =
         temp_path = temp_file.name
 
     try:
-        result = agent.add_file(temp_path)
+        result = await run_in_threadpool(agent.add_file, temp_path)
         return DocumentResponse(
             document_id=result.document_id,
             chunks_created=result.chunks_created,
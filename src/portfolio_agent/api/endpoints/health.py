@@ -7,6 +7,7 @@ from datetime import datetime
 
 from fastapi import APIRouter, Request
 
+from ..metrics import latency_report
 from ..models import HealthResponse
 from ... import __version__
 
@@ -32,3 +33,20 @@ async def readiness_check(request: Request):
         "status": "ready" if ready else "starting",
         "timestamp": datetime.now().isoformat(),
     }
+
+
+@router.get("/admission")
+async def admission_stats(request: Request):
+    """In-flight requests, queue depth and wait times per endpoint group."""
+    admission = getattr(request.app.state, "admission", None)
+    return admission.get_stats() if admission is not None else {}
+
+
+@router.get("/latency")
+async def latency_quantiles(request: Request, reset: bool = False, sketches: bool = False):
+    """p50/p90/p99/p999 latency per endpoint and per pipeline stage.
+
+    ``reset=true`` starts a new reporting interval; ``sketches=true`` adds the
+    serialized sketches so reports from several workers can be merged.
+    """
+    return latency_report(request.app, reset=reset, include_sketches=sketches)
@@ -0,0 +1,16 @@
+"""
+Prometheus scrape endpoint.
+"""
+
+from fastapi import APIRouter, Request, Response
+
+from ..metrics import app_metrics
+from ...metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Runtime metrics in the Prometheus text exposition format."""
+    return Response(REGISTRY.render(app_metrics(request.app)), media_type=CONTENT_TYPE)
@@ -2,13 +2,18 @@
 Minimal query endpoint for the supported SDK path.
 """
 
+import json
 import logging
 import time
+from typing import Any, Dict, Iterator
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from ..models import QueryRequest, QueryResponse
+from ..models import BatchQueryItem, BatchQueryRequest, BatchQueryResponse, QueryRequest, QueryResponse
 from ...agents import PersonaType
+from ...rag_pipeline import RAGResponse
 from ...sdk import PortfolioAgent
 
 logger = logging.getLogger(__name__)
@@ -30,36 +35,118 @@ def get_agent(request: Request) -> PortfolioAgent:
     return agent
 
 
+def _query_kwargs(request: QueryRequest) -> Dict[str, Any]:
+    persona = PersonaType.PROFESSIONAL
+    if request.persona and request.persona.lower() in {item.value for item in PersonaType}:
+        persona = PersonaType(request.persona.lower())
+
+    return {
+        "session_id": request.session_id or request.user_id or "default",
+        "persona_type": persona,
+        "max_documents": request.max_results,
+        "include_sources": request.include_sources,
+        "context": request.metadata,
+    }
+
+
+def _query_response(request: QueryRequest, result: RAGResponse) -> QueryResponse:
+    response_metadata = result.metadata.get("response_metadata", {})
+    evidence_strength = response_metadata.get("evidence_strength", "none")
+    return QueryResponse(
+        response=result.response,
+        query_type=request.query_type,
+        sources=result.sources,
+        confidence=0.0 if result.metadata.get("error") else CONFIDENCE_BY_EVIDENCE.get(evidence_strength, 0.5),
+        processing_time=result.processing_time,
+        tokens_used=None,
+        session_id=result.session_id,
+        metadata=result.metadata,
+    )
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_rag(request: QueryRequest, agent: PortfolioAgent = Depends(get_agent)):
     """Query the indexed corpus through the canonical SDK runtime."""
 
-    start_time = time.time()
     try:
-        persona = PersonaType.PROFESSIONAL
-        if request.persona and request.persona.lower() in {item.value for item in PersonaType}:
-            persona = PersonaType(request.persona.lower())
-
-        result = agent.query(
-            request.query,
-            session_id=request.session_id or request.user_id or "default",
-            persona_type=persona,
-            max_documents=request.max_results,
-            include_sources=request.include_sources,
-            context=request.metadata,
-        )
-        response_metadata = result.metadata.get("response_metadata", {})
-        evidence_strength = response_metadata.get("evidence_strength", "none")
-        return QueryResponse(
-            response=result.response,
-            query_type=request.query_type,
-            sources=result.sources,
-            confidence=0.0 if result.metadata.get("error") else CONFIDENCE_BY_EVIDENCE.get(evidence_strength, 0.5),
-            processing_time=result.processing_time,
-            tokens_used=None,
-            session_id=result.session_id,
-            metadata=result.metadata,
-        )
+        result = await agent.aquery(request.query, trace=request.trace, **_query_kwargs(request))
+        return _query_response(request, result)
     except Exception as e:
         logger.error(f"Query processing failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Query processing failed: {e}") from e
+
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_rag_batch(
+    request: BatchQueryRequest,
+    http_request: Request,
+    agent: PortfolioAgent = Depends(get_agent),
+):
+    """Answer several queries with one embedding call and one vector search.
+
+    Results keep the request order; a query that fails reports its error in
+    place without failing the batch. A batch holds a single admission slot,
+    so it may not carry more queries than its endpoint group admits at once.
+    """
+
+    admission = getattr(http_request.app.state, "admission", None)
+    limiter = admission.limiter_for(http_request.url.path) if admission is not None else None
+    if limiter is not None and len(request.queries) > limiter.limits.max_concurrency:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Batch of {len(request.queries)} queries exceeds the {limiter.name} "
+                f"concurrency limit of {limiter.limits.max_concurrency}"
+            ),
+        )
+
+    started = time.time()
+    items = [{"query": query.query, "trace": query.trace, **_query_kwargs(query)} for query in request.queries]
+
+    try:
+        results = await run_in_threadpool(agent.query_batch, items)
+    except Exception as e:
+        logger.error(f"Batch query processing failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch query processing failed: {e}") from e
+
+    return BatchQueryResponse(
+        results=[
+            BatchQueryItem(
+                index=index,
+                response=_query_response(query, result),
+                error=str(result.metadata["error"]) if result.metadata.get("error") else None,
+            )
+            for index, (query, result) in enumerate(zip(request.queries, results))
+        ],
+        processing_time=time.time() - started,
+    )
+
+
+@router.post("/query/stream")
+async def stream_query_rag(request: QueryRequest, agent: PortfolioAgent = Depends(get_agent)):
+    """Stream query progress as Server-Sent Events.
+
+    Emits ``routing``, ``sources`` and ``token`` events as the pipeline runs,
+    then a ``done`` event carrying the same payload as ``/query``.
+    """
+
+    def events() -> Iterator[str]:
+        try:
+            for event in agent.stream_query(request.query, **_query_kwargs(request)):
+                if event["event"] == "done":
+                    yield _sse("done", _query_response(request, event["data"]).model_dump(mode="json"))
+                else:
+                    yield _sse(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}", exc_info=True)
+            yield _sse("error", {"error": f"Query processing failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
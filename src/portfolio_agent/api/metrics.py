@@ -0,0 +1,183 @@
+"""
+Prometheus metrics for the supported API.
+
+``HTTPMetricsMiddleware`` counts requests and records their latency per route
+template, so path parameters do not explode label cardinality, and feeds a
+quantile sketch per endpoint for tail-latency reports. Everything the
+runtime already tracks (index size, cache counters, sessions, admission load,
+coalescing) is exposed through scrape-time callbacks by ``app_metrics``.
+"""
+
+import time
+from typing import Any, Callable, Dict, List
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..metrics import REGISTRY, CallbackMetric, QuantileSketch, Summary
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "portfolio_agent_http_requests_total",
+    "HTTP requests by method, route and status",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "portfolio_agent_http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ("method", "route"),
+)
+# Reported through /api/v1/latency rather than scraped, like the stage sketches
+HTTP_LATENCY_QUANTILES = Summary(
+    "portfolio_agent_http_latency_seconds",
+    "HTTP request latency quantiles by method and route",
+    ("method", "route"),
+)
+
+
+def _route_label(scope: Scope, status: int) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    # Unmatched paths are arbitrary client input; keep them out of the labels
+    return "unmatched" if status == 404 else scope["path"]
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = _route_label(scope, status)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            elapsed = time.perf_counter() - started
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(elapsed)
+            HTTP_LATENCY_QUANTILES.labels(method, route).observe(elapsed)
+
+
+def _per_cache(app, key: str) -> Callable[[], Dict[Any, Any]]:
+    def read() -> Dict[Any, Any]:
+        pipeline = app.state.agent.pipeline
+        caches = {
+            "retrieval": pipeline.retriever_agent.cache,
+            "persona": pipeline.persona_agent.cache,
+        }
+        return {name: cache.get_stats()[key] for name, cache in caches.items()}
+    return read
+
+
+def _per_endpoint_group(app, key: str) -> Callable[[], Dict[Any, Any]]:
+    def read() -> Dict[Any, Any]:
+        admission = getattr(app.state, "admission", None)
+        if admission is None:
+            return {}
+        return {name: stats[key] for name, stats in admission.get_stats().items()}
+    return read
+
+
+def app_metrics(app) -> List[Any]:
+    """Metric families read from the app's agent and admission controller.
+
+    Returns an empty list until the agent has been created.
+    """
+    agent = getattr(app.state, "agent", None)
+    if agent is None:
+        return []
+
+    def index(key: str) -> Callable[[], Any]:
+        return lambda: agent.vector_store.get_stats()[key]
+
+    def memory(key: str) -> Callable[[], Any]:
+        return lambda: agent.pipeline.memory_manager.get_memory_stats()[key]
+
+    def coalescing(key: str) -> Callable[[], Any]:
+        return lambda: agent._flights.get_stats()[key]
+
+    rejected = _per_endpoint_group(app, "rejected_queue_full")
+    timed_out = _per_endpoint_group(app, "rejected_timeout")
+    return [
+        CallbackMetric("portfolio_agent_index_documents", "Live documents in the vector store",
+                       index("total_documents")),
+        CallbackMetric("portfolio_agent_index_rows", "Rows in the FAISS index, including deleted ones",
+                       index("index_size")),
+        CallbackMetric("portfolio_agent_index_deleted_rows", "Deleted rows awaiting compaction",
+                       index("deleted_rows")),
+        CallbackMetric("portfolio_agent_index_generation", "Index generation, bumped on every write",
+                       index("generation")),
+        CallbackMetric("portfolio_agent_cache_hits_total", "Result cache hits", _per_cache(app, "hits"),
+                       ("cache",), kind="counter"),
+        CallbackMetric("portfolio_agent_cache_misses_total", "Result cache misses", _per_cache(app, "misses"),
+                       ("cache",), kind="counter"),
+        CallbackMetric("portfolio_agent_cache_entries", "Result cache entries", _per_cache(app, "entries"),
+                       ("cache",)),
+        CallbackMetric("portfolio_agent_active_sessions", "Conversation sessions held in memory",
+                       memory("active_sessions")),
+        CallbackMetric("portfolio_agent_session_turns", "Conversation turns held in memory",
+                       memory("total_turns")),
+        CallbackMetric("portfolio_agent_admission_in_flight", "Admitted requests in flight",
+                       _per_endpoint_group(app, "in_flight"), ("group",)),
+        CallbackMetric("portfolio_agent_admission_queue_depth", "Requests waiting for admission",
+                       _per_endpoint_group(app, "queue_depth"), ("group",)),
+        CallbackMetric("portfolio_agent_admission_admitted_total", "Admitted requests",
+                       _per_endpoint_group(app, "admitted"), ("group",), kind="counter"),
+        CallbackMetric(
+            "portfolio_agent_admission_rejected_total",
+            "Rejected requests by reason",
+            lambda: {
+                **{(group, "queue_full"): value for group, value in rejected().items()},
+                **{(group, "timeout"): value for group, value in timed_out().items()},
+            },
+            ("group", "reason"),
+            kind="counter",
+        ),
+        CallbackMetric("portfolio_agent_coalesced_queries_total", "Queries answered by another in-flight run",
+                       coalescing("coalesced"), kind="counter"),
+        CallbackMetric("portfolio_agent_query_executions_total", "Pipeline runs started for queries",
+                       coalescing("executions"), kind="counter"),
+        agent.tracer.stage_latency,
+        agent.tracer.stage_errors,
+    ]
+
+
+def latency_report(app, reset: bool = False, include_sketches: bool = False) -> Dict[str, Any]:
+    """Latency quantiles per endpoint and per pipeline stage.
+
+    Args:
+        app: The FastAPI app whose agent's stages are reported
+        reset: Clear the sketches after reading, so each report covers the
+            interval since the previous one
+        include_sketches: Add the serialized sketches, which a collector can
+            combine across workers with ``merge_sketches``
+    """
+    agent = getattr(app.state, "agent", None)
+    summaries = {"endpoints": HTTP_LATENCY_QUANTILES}
+    if agent is not None:
+        summaries["stages"] = agent.tracer.stage_quantiles
+    if not include_sketches:
+        return {name: summary.snapshot(reset) for name, summary in summaries.items()}
+
+    # Derive the quantiles from the exported sketches so both cover the same values
+    sketches = {name: summary.to_dict(reset) for name, summary in summaries.items()}
+    report: Dict[str, Any] = {
+        name: {key: QuantileSketch.from_dict(data).snapshot() for key, data in serialized.items()}
+        for name, serialized in sketches.items()
+    }
+    report["sketches"] = sketches
+    return report
@@ -31,6 +31,7 @@ class QueryRequest(BaseModel):
     include_sources: bool = Field(True, description="Whether to include source documents")
     persona: Optional[str] = Field(None, description="Persona to use for response generation")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata")
+    trace: bool = Field(False, description="Return per-stage timing spans in the response metadata")
 
     @field_validator('query')
     @classmethod
@@ -50,6 +51,21 @@ class QueryResponse(BaseModel):
     session_id: Optional[str] = Field(None, description="Session ID for conversation tracking")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata")
 
+class BatchQueryRequest(BaseModel):
+    """Request model for batched query operations."""
+    queries: List[QueryRequest] = Field(..., description="Queries to answer together", min_length=1, max_length=32)
+
+class BatchQueryItem(BaseModel):
+    """Outcome of one query in a batch."""
+    index: int = Field(..., description="Position of the query in the request")
+    response: QueryResponse = Field(..., description="The query response (a fallback message if it failed)")
+    error: Optional[str] = Field(None, description="Why the query failed, if it did")
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batched query operations."""
+    results: List[BatchQueryItem] = Field(..., description="One result per query, in request order")
+    processing_time: float = Field(..., description="Time taken to process the batch in seconds")
+
 class DocumentRequest(BaseModel):
     """Request model for document operations."""
     content: str = Field(..., description="Document content", min_length=1)
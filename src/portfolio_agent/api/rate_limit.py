@@ -0,0 +1,289 @@
+"""
+Per-client rate limiting for the supported API.
+
+Limits use GCRA (the generic cell rate algorithm), a token bucket expressed as
+a single "theoretical arrival time" per key: a request is allowed while that
+time is no more than the burst tolerance ahead of now, and each allowed request
+pushes it forward by one emission interval. State is one number per key, and a
+key whose arrival time has passed is indistinguishable from a new one, so idle
+keys can be dropped at any time.
+
+The in-memory store is per process. ``RedisRateLimitStore`` keeps the state in
+Redis and checks it with one Lua script, so limits hold across workers and
+nodes.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimit:
+    """``requests`` per ``window`` seconds, allowing bursts of up to ``burst`` requests."""
+    requests: int
+    window: float
+    burst: Optional[int] = None
+
+    @property
+    def interval(self) -> float:
+        """Seconds between requests at the sustained rate."""
+        return self.window / self.requests
+
+    @property
+    def tolerance(self) -> float:
+        """How far the arrival time may run ahead of now before requests are refused."""
+        return self.interval * ((self.burst or self.requests) - 1)
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of one rate limit check."""
+    allowed: bool
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+
+def gcra(tat: Optional[float], now: float, interval: float, tolerance: float) -> Tuple[Optional[float], RateLimitDecision]:
+    """Apply one request to a GCRA key.
+
+    Args:
+        tat: The key's stored theoretical arrival time, or None for a new key
+        now: Current time on the same clock as ``tat``
+        interval: Emission interval in seconds
+        tolerance: Burst tolerance in seconds
+
+    Returns:
+        Tuple of (new arrival time to store, or None when refused; decision)
+    """
+    tat = now if tat is None or tat < now else tat
+    ahead = tat - now
+    if ahead > tolerance:
+        return None, RateLimitDecision(False, 0, ahead - tolerance, ahead)
+    remaining = int((tolerance - ahead) // interval) if interval else 0
+    return tat + interval, RateLimitDecision(True, remaining, 0.0, ahead + interval)
+
+
+class InMemoryRateLimitStore:
+    """GCRA state for one process, bounded to ``max_keys`` keys.
+
+    Keys are kept in least-recently-admitted order. Expired keys are dropped
+    from the front as new requests arrive, and once ``max_keys`` is reached the
+    least recently admitted key is dropped even if it has not expired, which
+    at worst gives that client a fresh burst.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str, limit: RateLimit) -> RateLimitDecision:
+        now = self._clock()
+        with self._lock:
+            tat, decision = gcra(self._tats.get(key), now, limit.interval, limit.tolerance)
+            if tat is not None:
+                self._tats[key] = tat
+                self._tats.move_to_end(key)
+                self._evict(now)
+        return decision
+
+    def _evict(self, now: float) -> None:
+        while self._tats:
+            oldest_tat = next(iter(self._tats.values()))
+            if oldest_tat > now and len(self._tats) <= self.max_keys:
+                break
+            self._tats.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# KEYS[1]: bucket key; ARGV: interval and tolerance in microseconds.
+# Returns {allowed, remaining, retry_after_us, reset_after_us}. Uses the Redis
+# clock so every worker agrees on "now".
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local ahead = tat - now
+if ahead > tolerance then
+    return {0, 0, ahead - tolerance, ahead}
+end
+local remaining = 0
+if interval > 0 then
+    remaining = math.floor((tolerance - ahead) / interval)
+end
+redis.call('SET', KEYS[1], tat + interval, 'PX', math.ceil((ahead + interval) / 1000))
+return {1, remaining, 0, ahead + interval}
+"""
+
+
+class RedisRateLimitStore:
+    """GCRA state shared through Redis; each check is one atomic script call.
+
+    Keys expire on their own once their arrival time passes. When Redis cannot
+    be reached requests are allowed, so an outage degrades to no rate limiting
+    rather than failing every request.
+    """
+
+    # Checks do network I/O, so the middleware runs them off the event loop
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "portfolio_agent:ratelimit:"):
+        """Initialize the store.
+
+        Args:
+            client: A redis-py client (or compatible object with ``register_script``)
+            prefix: Prefix for the Redis keys
+        """
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisRateLimitStore":
+        if not REDIS_AVAILABLE:
+            raise ImportError("The redis rate limit backend requires redis. Install with: pip install redis")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def check(self, key: str, limit: RateLimit) -> RateLimitDecision:
+        try:
+            allowed, remaining, retry_after, reset_after = self._script(
+                keys=[self.prefix + key],
+                args=[round(limit.interval * 1e6), round(limit.tolerance * 1e6)],
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return RateLimitDecision(True, (limit.burst or limit.requests) - 1, 0.0, 0.0)
+        return RateLimitDecision(bool(allowed), int(remaining), retry_after / 1e6, reset_after / 1e6)
+
+
+class RateLimiter:
+    """Applies a rate limit per client to each endpoint group."""
+
+    def __init__(self, limits: Dict[str, RateLimit], prefixes: Dict[str, str], store: Any):
+        """Initialize the limiter.
+
+        Args:
+            limits: Limit per endpoint group; a ``default`` group, if present,
+                applies to paths matching no prefix, and groups without a
+                limit are not limited
+            prefixes: Path prefix per endpoint group, e.g. ``{"/api/v1/query": "query"}``
+            store: ``InMemoryRateLimitStore`` or ``RedisRateLimitStore``
+        """
+        self.limits = limits
+        self.store = store
+        # Longest prefix first so nested paths resolve to the most specific group
+        self.prefixes: Tuple[Tuple[str, str], ...] = tuple(
+            sorted(prefixes.items(), key=lambda item: len(item[0]), reverse=True)
+        )
+        self._stats = {"allowed": 0, "rejected": 0}
+
+    @classmethod
+    def from_settings(cls, prefix: str = "/api/v1") -> Optional["RateLimiter"]:
+        """Build the limiter from ``RATE_LIMIT_*`` settings, or None when disabled."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            store = RedisRateLimitStore.from_url(settings.REDIS_URL)
+        elif settings.RATE_LIMIT_BACKEND == "memory":
+            store = InMemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+        requests = {
+            "default": settings.RATE_LIMIT_DEFAULT_REQUESTS,
+            "query": settings.RATE_LIMIT_QUERY_REQUESTS,
+            "documents": settings.RATE_LIMIT_DOCUMENTS_REQUESTS,
+        }
+        return cls(
+            limits={
+                name: RateLimit(group_requests, settings.RATE_LIMIT_WINDOW)
+                for name, group_requests in requests.items()
+                if group_requests > 0
+            },
+            prefixes={f"{prefix}/query": "query", f"{prefix}/documents": "documents"},
+            store=store,
+        )
+
+    def group_for(self, path: str) -> str:
+        for prefix, name in self.prefixes:
+            if path.startswith(prefix):
+                return name
+        return "default"
+
+    def check(self, client: str, path: str) -> Optional[RateLimitDecision]:
+        """Check and count one request; None when its group has no limit."""
+        group = self.group_for(path)
+        limit = self.limits.get(group)
+        if limit is None:
+            return None
+        decision = self.store.check(f"{group}:{client}", limit)
+        self._stats["allowed" if decision.allowed else "rejected"] += 1
+        return decision
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "backend": type(self.store).__name__}
+
+
+class RateLimitMiddleware:
+    """ASGI middleware rejecting clients over their rate limit with 429."""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        if getattr(self.limiter.store, "blocking", False):
+            decision = await run_in_threadpool(self.limiter.check, client, scope["path"])
+        else:
+            decision = self.limiter.check(client, scope["path"])
+        if decision is None or decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = max(1, math.ceil(decision.retry_after))
+        logger.warning(f"Rate limited {client} on {scope['path']}")
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "error": "Rate Limit Exceeded",
+                "message": f"Too many requests to {self.limiter.group_for(scope['path'])} endpoints",
+                "retry_after": retry_after,
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
@@ -10,7 +10,10 @@ from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .endpoints import documents, health, query
+from .admission import AdmissionController, AdmissionMiddleware
+from .endpoints import documents, health, metrics, query
+from .metrics import HTTPMetricsMiddleware
+from .rate_limit import RateLimiter, RateLimitMiddleware
 from .. import __version__
 from ..config import settings
 from ..sdk import PortfolioAgent
@@ -32,8 +35,19 @@ async def lifespan(app: FastAPI):
     logger.info("Portfolio Agent API stopped")
 
 
-def create_app(agent: Optional[PortfolioAgent] = None) -> FastAPI:
-    """Create the supported FastAPI application."""
+def create_app(
+    agent: Optional[PortfolioAgent] = None,
+    admission: Optional[AdmissionController] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    metrics_enabled: Optional[bool] = None,
+) -> FastAPI:
+    """Create the supported FastAPI application.
+
+    ``admission`` overrides the per-endpoint admission limits built from the
+    ``ADMISSION_*`` settings, ``rate_limiter`` the per-client limits built
+    from the ``RATE_LIMIT_*`` settings, and ``metrics_enabled`` the
+    ``METRICS_ENABLED`` setting.
+    """
 
     app = FastAPI(
         title="Portfolio Agent API",
@@ -43,7 +57,16 @@ def create_app(agent: Optional[PortfolioAgent] = None) -> FastAPI:
     )
     app.state.agent = agent
     app.state.started_at = time.time()
-
+    app.state.admission = admission or AdmissionController.from_settings()
+    app.state.rate_limiter = rate_limiter or RateLimiter.from_settings()
+    if metrics_enabled is None:
+        metrics_enabled = settings.METRICS_ENABLED
+
+    # Added before CORS so rejections still carry CORS headers; rate limiting
+    # wraps admission so over-limit clients never take a queue slot
+    app.add_middleware(AdmissionMiddleware, controller=app.state.admission)
+    if app.state.rate_limiter is not None:
+        app.add_middleware(RateLimitMiddleware, limiter=app.state.rate_limiter)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.ALLOWED_ORIGINS,
@@ -51,10 +74,15 @@ def create_app(agent: Optional[PortfolioAgent] = None) -> FastAPI:
         allow_methods=["GET", "POST"],
         allow_headers=["*"],
     )
+    if metrics_enabled:
+        # Outermost, so shed and CORS preflight requests are counted too
+        app.add_middleware(HTTPMetricsMiddleware)
 
     app.include_router(health.router, prefix="/api/v1", tags=["health"])
     app.include_router(query.router, prefix="/api/v1", tags=["query"])
     app.include_router(documents.router, prefix="/api/v1", tags=["documents"])
+    if metrics_enabled:
+        app.include_router(metrics.router, tags=["metrics"])
 
     @app.get("/")
     async def root():
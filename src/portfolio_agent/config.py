@@ -32,6 +32,10 @@ class Settings(BaseSettings):
     AWS_REGION: str = Field(default="us-east-1", description="AWS region")
     VLLM_BASE_URL: Optional[str] = Field(default=None, description="vLLM server URL")
     DEFAULT_MODEL: str = Field(default="gpt-4o-mini", description="Default LLM model")
+    PERSONA_GENERATION: str = Field(default="template", description="Persona response generation: template or llm")
+    LLM_TIMEOUT: float = Field(default=30.0, description="Seconds allowed for one LLM generation request")
+    LLM_MAX_CONNECTIONS: int = Field(default=10, description="Pooled keep-alive connections to the LLM server")
+    LLM_MAX_CONCURRENCY: int = Field(default=4, description="Maximum concurrent LLM generation requests")
     
     # ===== EMBEDDINGS =====
     EMBEDDING_PROVIDER: str = Field(default="hf", description="Embedding provider: openai or hf")
@@ -61,6 +65,20 @@ class Settings(BaseSettings):
     API_PORT: int = Field(default=8000, description="API server port")
     ALLOWED_ORIGINS: List[str] = Field(default=["*"], description="Allowed CORS origins")
     ALLOWED_HOSTS: List[str] = Field(default=["*"], description="Allowed hosts")
+    ADMISSION_ENABLED: bool = Field(default=True, description="Limit in-flight API requests per endpoint group")
+    ADMISSION_QUERY_MAX_CONCURRENCY: int = Field(default=8, description="Query requests processed at once (0 disables the limit)")
+    ADMISSION_QUERY_MAX_QUEUE: int = Field(default=32, description="Query requests allowed to wait for a slot")
+    ADMISSION_QUERY_MAX_WAIT: float = Field(default=2.0, description="Seconds a query may wait for a slot before a 503")
+    ADMISSION_DOCUMENTS_MAX_CONCURRENCY: int = Field(default=2, description="Ingestion requests processed at once (0 disables the limit)")
+    ADMISSION_DOCUMENTS_MAX_QUEUE: int = Field(default=8, description="Ingestion requests allowed to wait for a slot")
+    ADMISSION_DOCUMENTS_MAX_WAIT: float = Field(default=10.0, description="Seconds an ingestion request may wait for a slot before a 503")
+    RATE_LIMIT_ENABLED: bool = Field(default=False, description="Limit requests per client IP and endpoint group")
+    RATE_LIMIT_BACKEND: str = Field(default="memory", description="Rate limit state: memory (per process) or redis (shared via REDIS_URL)")
+    RATE_LIMIT_WINDOW: float = Field(default=3600.0, description="Window in seconds the RATE_LIMIT_*_REQUESTS counts apply to")
+    RATE_LIMIT_QUERY_REQUESTS: int = Field(default=50, description="Query requests per client per window (0 disables the limit)")
+    RATE_LIMIT_DOCUMENTS_REQUESTS: int = Field(default=20, description="Ingestion requests per client per window (0 disables the limit)")
+    RATE_LIMIT_DEFAULT_REQUESTS: int = Field(default=0, description="Requests per client per window to other endpoints (0 disables the limit)")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=10000, description="Client buckets kept by the memory backend before evicting the least recent")
     
     # ===== INGESTION =====
     CHUNK_SIZE: int = Field(default=1000, description="Text chunk size for processing")
@@ -87,7 +105,28 @@ class Settings(BaseSettings):
     # ===== RAG PIPELINE =====
     TOP_K_RETRIEVAL: int = Field(default=10, description="Number of documents to retrieve")
     TOP_K_RERANK: int = Field(default=3, description="Number of documents to rerank")
+    CROSS_ENCODER_MODEL: str = Field(default="cross-encoder/ms-marco-MiniLM-L-6-v2", description="Local cross-encoder for the cross_encoder reranking strategy")
+    CROSS_ENCODER_MAX_TOKENS: int = Field(default=256, description="Token budget per query + chunk pair for the cross-encoder")
+    CROSS_ENCODER_BATCH_SIZE: int = Field(default=16, description="Pairs per cross-encoder inference batch")
     SIMILARITY_THRESHOLD: float = Field(default=0.7, description="Minimum similarity threshold")
+    RETRIEVAL_MODE: str = Field(default="dense", description="Retrieval mode: dense or hybrid (dense + BM25)")
+    MMR_LAMBDA: Optional[float] = Field(default=None, description="Relevance/diversity trade-off for MMR reranking (1.0 = relevance only; unset disables MMR)")
+    RRF_K: int = Field(default=60, description="Rank offset for reciprocal rank fusion in hybrid retrieval")
+    RETRIEVAL_CACHE_SIZE: int = Field(default=256, description="Maximum cached retrieval results (0 disables the cache)")
+    RETRIEVAL_CACHE_TTL: float = Field(default=300.0, description="Seconds a cached retrieval result stays valid")
+    PERSONA_CACHE_SIZE: int = Field(default=256, description="Maximum cached persona responses (0 disables the cache)")
+    PERSONA_CACHE_TTL: float = Field(default=300.0, description="Seconds a cached persona response stays valid")
+    QUERY_TIME_BUDGET: float = Field(default=10.0, description="End-to-end deadline in seconds for a single query")
+    QUERY_COALESCING: bool = Field(default=True, description="Run identical concurrent queries through the pipeline once")
+    PIPELINE_MAX_WORKERS: int = Field(default=8, description="Worker threads running pipeline stages for async queries")
+    PIPELINE_FAST_PATH: bool = Field(default=True, description="Run queries with the plain-Python executor instead of LangGraph (off when checkpointing)")
+    TRACING_ENABLED: bool = Field(default=True, description="Record per-stage spans and latency histograms for every query")
+    TRACE_SINK: str = Field(default="memory", description="Where finished traces go: memory, jsonl, otlp or none")
+    TRACE_JSONL_PATH: str = Field(default="./data/traces.jsonl", description="File the jsonl trace sink appends spans to")
+    TRACE_OTLP_ENDPOINT: Optional[str] = Field(default=None, description="OTLP/HTTP traces URL for the otlp sink, e.g. http://localhost:4318/v1/traces")
+    TRACE_BUFFER_SIZE: int = Field(default=1024, description="Spans kept by the memory trace sink")
+    ROUTING_MODE: str = Field(default="keyword", description="Query routing: keyword or semantic (embedding centroids)")
+    ROUTING_PATTERNS: Dict[str, List[str]] = Field(default_factory=dict, description="Extra router keywords per query type, e.g. {\"technical\": [\"kubernetes\"]}")
     INCLUDE_CITATIONS: bool = Field(default=True, description="Include source citations in responses")
     
     # ===== MEMORY & PERSISTENCE =====
@@ -112,7 +151,7 @@ class Settings(BaseSettings):
     # ===== LOGGING & MONITORING =====
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
     ENABLE_AUDIT_LOG: bool = Field(default=True, description="Enable audit logging")
-    METRICS_ENABLED: bool = Field(default=False, description="Enable metrics collection")
+    METRICS_ENABLED: bool = Field(default=False, description="Record HTTP metrics and serve them at /metrics")
     
     model_config = ConfigDict(
         env_file=".env",
@@ -10,6 +10,8 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from ..timestamps import normalize_timestamp
+
 logger = logging.getLogger(__name__)
 
 
@@ -121,6 +123,7 @@ class TextChunker:
             'chunk_size': len(content),
             'processed_at': datetime.now().isoformat()
         })
+        normalize_timestamp(chunk_metadata)
         
         return {
             'id': f"{base_metadata.get('source_id', 'unknown')}_chunk_{chunk_index}",
@@ -14,6 +14,7 @@ import logging
 from datetime import datetime
 import time
 
+from ..timestamps import TIMESTAMP_FIELD, to_epoch_seconds
 from .pii_redactor import pii_redactor
 from .chunker import text_chunker
 
@@ -296,6 +297,7 @@ class WebsiteIngestor:
             'source_type': 'website',
             'content_type': 'html',
             'fetched_at': page_data['fetched_at'],
+            TIMESTAMP_FIELD: to_epoch_seconds(page_data['fetched_at']),
             'title': page_data['title'],
             'status_code': page_data['status_code'],
             'content_type': page_data['content_type'],
@@ -0,0 +1,568 @@
+"""
+Low-overhead metrics with Prometheus text exposition.
+
+Counters and histograms keep one value array per writing thread; a thread only
+ever updates its own array, so recording takes no lock and never contends with
+other threads. Reads sum the per-thread arrays, which makes scrapes slightly
+more expensive in exchange for a near-free hot path. When a thread exits its
+array is folded into a shared base array, so short-lived threads do not
+accumulate. Values a component already
+tracks (cache hits, index size, sessions) are read at scrape time through
+``CallbackMetric`` instead of being mirrored on every update.
+
+Tail latency is reported from ``QuantileSketch``, a log-bucketed sketch with a
+bounded relative error. Sketches serialize to plain dicts and merge exactly,
+so quantiles can be computed across uvicorn workers.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the embedding batch size buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Quantiles reported by quantile sketches, with their snapshot keys
+SKETCH_QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shard:
+    """Holder of one thread's cells; only its thread-local slot references it."""
+
+    __slots__ = ("cells", "__weakref__")
+
+    def __init__(self, cells: List[float]):
+        self.cells = cells
+
+
+class ShardedCells:
+    """Fixed-size value array sharded per thread and combined on read.
+
+    Cells are summed across threads, except those listed in ``maxima``, which
+    combine by taking the largest value. A thread's shard is folded into the
+    base array once the thread exits and its thread-local slot is released.
+    """
+
+    __slots__ = ("size", "maxima", "_local", "_base", "_shards", "_lock")
+
+    def __init__(self, size: int, maxima: Sequence[int] = ()):
+        self.size = size
+        self.maxima = frozenset(index % size for index in maxima)
+        self._local = threading.local()
+        self._base: List[float] = [0] * size
+        self._shards: Dict[int, List[float]] = {}
+        # Reentrant, since a shard may be retired by a collection on a thread holding the lock
+        self._lock = threading.RLock()
+
+    def local(self) -> List[float]:
+        """The calling thread's array; only this thread may write to it."""
+        try:
+            return self._local.shard.cells
+        except AttributeError:
+            shard = self._local.shard = _Shard([0] * self.size)
+            with self._lock:
+                self._shards[id(shard)] = shard.cells
+            weakref.finalize(shard, self._retire, id(shard)).atexit = False
+            return shard.cells
+
+    def _retire(self, key: int) -> None:
+        with self._lock:
+            cells = self._shards.pop(key, None)
+            if cells is not None:
+                self._combine(self._base, cells)
+
+    def _combine(self, into: List[float], cells: List[float]) -> None:
+        for index, value in enumerate(cells):
+            if index in self.maxima:
+                if value > into[index]:
+                    into[index] = value
+            else:
+                into[index] += value
+
+    def shards(self) -> List[List[float]]:
+        """Arrays of the threads still alive."""
+        with self._lock:
+            return list(self._shards.values())
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            totals = list(self._base)
+            shards = list(self._shards.values())
+        for cells in shards:
+            self._combine(totals, cells)
+        return totals
+
+
+class CounterValue:
+    """A monotonically increasing value."""
+
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = ShardedCells(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._cells.local()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; cells hold per-bucket counts, then the sum and max."""
+
+    __slots__ = ("buckets", "_cells")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._cells = ShardedCells(len(self.buckets) + 3, maxima=(-1,))
+
+    def observe(self, value: float) -> None:
+        cells = self._cells.local()
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        if value > cells[-1]:
+            cells[-1] = value
+
+    def _read(self) -> Tuple[List[float], float, float]:
+        totals = self._cells.totals()
+        return totals[:-2], totals[-2], totals[-1]
+
+    @property
+    def count(self) -> int:
+        return int(sum(self._read()[0]))
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        counts, _, largest = self._read()
+        return self._quantile(counts, largest, q)
+
+    def _quantile(self, counts: List[float], largest: float, q: float) -> float:
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else largest
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, largest)
+            seen += bucket_count
+        return largest
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, sum, mean, max, estimated quantiles and cumulative buckets."""
+        counts, total_sum, largest = self._read()
+        total = int(sum(counts))
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative.append((bound, int(running)))
+        return {
+            "count": total,
+            "sum": total_sum,
+            "mean": total_sum / total if total else 0.0,
+            "max": largest,
+            "p50": self._quantile(counts, largest, 0.5),
+            "p95": self._quantile(counts, largest, 0.95),
+            "p99": self._quantile(counts, largest, 0.99),
+            "buckets": cumulative,
+        }
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins whose bounds grow by a factor
+    ``gamma``, so any reported quantile is within ``relative_accuracy`` of a
+    value actually observed. Values are clamped to ``[min_value, max_value]``,
+    which caps the number of bins (about 1100 for the defaults) and therefore
+    memory; inserts are O(1). Sketches with the same parameters merge exactly.
+    """
+
+    __slots__ = ("relative_accuracy", "min_value", "max_value", "_log_gamma",
+                 "_lock", "_bins", "_count", "_sum", "_min", "_max")
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6, max_value: float = 3600.0):
+        """Initialize the sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+            min_value: Smallest distinguishable value; smaller values count here
+            max_value: Largest distinguishable value; larger values count here
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        if not 0 < min_value < max_value:
+            raise ValueError("min_value must be positive and below max_value")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._bins: Dict[int, int] = {}
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = 0.0
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._clear()
+
+    def observe(self, value: float) -> None:
+        key = math.ceil(math.log(min(max(value, self.min_value), self.max_value)) / self._log_gamma)
+        with self._lock:
+            self._bins[key] = self._bins.get(key, 0) + 1
+            self._count += 1
+            self._sum += value
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile (0 when nothing was recorded)."""
+        with self._lock:
+            return self._quantile(sorted(self._bins.items()), q)
+
+    def _quantile(self, bins: List[Tuple[int, int]], q: float) -> float:
+        if not self._count:
+            return 0.0
+        rank = q * (self._count - 1)
+        seen = 0
+        for key, bin_count in bins:
+            seen += bin_count
+            if seen > rank:
+                # Midpoint of the bin in relative terms: gamma**key * 2 / (gamma + 1)
+                estimate = 2 * math.exp(key * self._log_gamma) / (1 + math.exp(self._log_gamma))
+                return min(max(estimate, self._min), self._max)
+        return self._max
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Any]:
+        """Count, sum, mean, min, max and p50/p90/p99/p999.
+
+        Args:
+            reset: Clear the sketch in the same step, so consecutive snapshots
+                cover disjoint intervals without losing values in between
+        """
+        with self._lock:
+            bins = sorted(self._bins.items())
+            snapshot = {
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "min": self._min if self._count else 0.0,
+                "max": self._max,
+                **{name: self._quantile(bins, q) for name, q in SKETCH_QUANTILES},
+            }
+            if reset:
+                self._clear()
+        return snapshot
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add ``other``'s values to this sketch and return it."""
+        return self.merge_dict(other.to_dict())
+
+    def merge_dict(self, data: Dict[str, Any]) -> "QuantileSketch":
+        """Add the values of a serialized sketch (see ``to_dict``) and return this sketch."""
+        params = (data["relative_accuracy"], data["min_value"], data["max_value"])
+        if params != (self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError(f"Cannot merge sketches with different parameters: {params}")
+        if not data["count"]:
+            return self
+        with self._lock:
+            for key, bin_count in data["bins"].items():
+                key = int(key)
+                self._bins[key] = self._bins.get(key, 0) + bin_count
+            self._count += data["count"]
+            self._sum += data["sum"]
+            self._min = min(self._min, data["min"])
+            self._max = max(self._max, data["max"])
+        return self
+
+    def to_dict(self, reset: bool = False) -> Dict[str, Any]:
+        """JSON-serializable state, restorable with ``from_dict``.
+
+        Args:
+            reset: Clear the sketch in the same step, as for ``snapshot``
+        """
+        with self._lock:
+            data = {
+                "relative_accuracy": self.relative_accuracy,
+                "min_value": self.min_value,
+                "max_value": self.max_value,
+                "count": self._count,
+                "sum": self._sum,
+                "min": self._min if self._count else 0.0,
+                "max": self._max,
+                "bins": {str(key): bin_count for key, bin_count in sorted(self._bins.items())},
+            }
+            if reset:
+                self._clear()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"], data["min_value"], data["max_value"])
+        return sketch.merge_dict(data)
+
+
+def merge_sketches(sketches: Iterable[Dict[str, Any]]) -> Optional[QuantileSketch]:
+    """Merge serialized sketches, e.g. one per worker; None when there are none."""
+    merged = None
+    for data in sketches:
+        merged = QuantileSketch.from_dict(data) if merged is None else merged.merge_dict(data)
+    return merged
+
+
+class _Family:
+    """A named metric with zero or more labels; children are created on first use."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any) -> Any:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self):
+        for key, child in self.children():
+            yield self.name, dict(zip(self.labelnames, key)), child.value
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> LatencyHistogram:
+        return LatencyHistogram(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self):
+        for key, child in self.children():
+            labels = dict(zip(self.labelnames, key))
+            snapshot = child.snapshot()
+            for bound, running in snapshot["buckets"]:
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, running
+            yield f"{self.name}_sum", labels, snapshot["sum"]
+            yield f"{self.name}_count", labels, snapshot["count"]
+
+
+class Summary(_Family):
+    """Quantile sketches per label set, rendered as a Prometheus summary."""
+
+    kind = "summary"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        relative_accuracy: float = 0.01,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.relative_accuracy = relative_accuracy
+
+    def _new_child(self) -> QuantileSketch:
+        return QuantileSketch(self.relative_accuracy)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Sketch snapshot per label set, keyed by the space-joined label values."""
+        return {" ".join(key): child.snapshot(reset) for key, child in sorted(self.children())}
+
+    def to_dict(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Serialized sketch per label set, keyed like ``snapshot``."""
+        return {" ".join(key): child.to_dict(reset) for key, child in sorted(self.children())}
+
+    def samples(self):
+        for key, child in self.children():
+            labels = dict(zip(self.labelnames, key))
+            snapshot = child.snapshot()
+            for name, q in SKETCH_QUANTILES:
+                yield self.name, {**labels, "quantile": _format_value(q)}, snapshot[name]
+            yield f"{self.name}_sum", labels, snapshot["sum"]
+            yield f"{self.name}_count", labels, snapshot["count"]
+
+
+class CallbackMetric(_Family):
+    """A gauge or counter whose values are read from ``fn`` at scrape time.
+
+    ``fn`` returns either a single number (no labels) or a mapping of label
+    value tuples to numbers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        fn: Callable[[], Any],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        values = self.fn()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield self.name, dict(zip(self.labelnames, (str(part) for part in key))), value
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format."""
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def register(self, family: _Family) -> _Family:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"Metric {family.name} is already registered")
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def families(self) -> List[_Family]:
+        with self._lock:
+            return list(self._families.values())
+
+    def render(self, extra: Iterable[_Family] = ()) -> str:
+        """Prometheus text exposition of this registry plus ``extra`` families."""
+        return render(list(self.families()) + list(extra))
+
+
+def render(families: Iterable[_Family]) -> str:
+    """Render metric families in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for family in families:
+        try:
+            samples = list(family.samples())
+        except Exception as e:
+            lines.append(f"# {family.name} unavailable: {_escape(str(e))}")
+            continue
+        lines.append(f"# HELP {family.name} {_escape(family.documentation)}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for name, labels, value in samples:
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(value_)}"' for key, value_ in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# Process-wide registry and hot-path metrics recorded by the runtime
+REGISTRY = MetricsRegistry()
+
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "portfolio_agent_embedding_batch_size",
+    "Texts per embedder call",
+    ("kind",),
+    buckets=BATCH_SIZE_BUCKETS,
+)
+VECTOR_SEARCH_SECONDS = REGISTRY.histogram(
+    "portfolio_agent_vector_search_duration_seconds",
+    "FAISS and BM25 search latency",
+    ("operation",),
+)
@@ -5,11 +5,18 @@ This module provides a LangGraph-based orchestration pipeline that coordinates
 all agents to provide intelligent, contextual responses.
 """
 
+import asyncio
+import contextvars
 import logging
-from typing import Dict, Any, List, Optional, TypedDict
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Callable, Dict, Any, Iterator, List, Optional, TypedDict
 from dataclasses import dataclass
 
 try:
+    from langgraph.config import get_stream_writer
     from langgraph.graph import StateGraph, END
     from langgraph.graph.message import add_messages
     LANGGRAPH_AVAILABLE = True
@@ -18,14 +25,22 @@ except ImportError:
     StateGraph = None
     END = None
     add_messages = None
+    get_stream_writer = None
 
 from .agents import (
     RouterAgent, RetrieverAgent, RerankerAgent, PersonaAgent, MemoryManager,
     QueryType, PersonaType, RerankingStrategy
 )
+from . import tracing
+from .tracing import Tracer
 
 logger = logging.getLogger(__name__)
 
+# Receives a streamed run's events; set in the thread running ``stream_query``
+_event_sink: contextvars.ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = contextvars.ContextVar(
+    "portfolio_agent_event_sink", default=None
+)
+
 class RAGState(TypedDict):
     """State for the RAG pipeline."""
     query: str
@@ -41,6 +56,41 @@ class RAGState(TypedDict):
     max_documents: int
     persona_type: str
     include_sources: bool
+    reranking_strategy: str
+    time_budget: float
+    deadline: float
+    degradations: List[str]
+    index_generation: Optional[int]
+    query_vector: Optional[List[float]]
+
+class SlotState:
+    """RAGState fields on a ``__slots__`` object for the fast-path executor.
+    
+    Supports the mapping operations the pipeline nodes use (``state[key]``,
+    ``state[key] = value`` and ``state.get``), so the same node functions run
+    on either executor without LangGraph's per-step state copies.
+    """
+    
+    __slots__ = tuple(RAGState.__annotations__)
+    
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
 
 @dataclass
 class RAGRequest:
@@ -52,6 +102,8 @@ class RAGRequest:
     reranking_strategy: RerankingStrategy = RerankingStrategy.HYBRID
     include_sources: bool = True
     context: Optional[Dict[str, Any]] = None
+    time_budget: Optional[float] = None
+    trace: bool = False  # return the span tree in ``metadata["trace"]``
 
 @dataclass
 class RAGResponse:
@@ -65,6 +117,13 @@ class RAGResponse:
 class RAGPipeline:
     """RAG pipeline orchestrating all agents."""
     
+    # Fraction of the query budget held back from retrieval for rerank + persona
+    RETRIEVAL_RESERVE = 0.25
+    # Below this fraction of the budget remaining, retrieval asks for fewer candidates
+    SHRINK_K_BELOW = 0.5
+    # Below this fraction of the budget remaining, reranking falls back to score order
+    SCORE_ONLY_BELOW = 0.15
+    
     def __init__(
         self,
         router_agent: RouterAgent,
@@ -73,6 +132,11 @@ class RAGPipeline:
         persona_agent: PersonaAgent,
         memory_manager: MemoryManager,
         checkpointer=None,
+        time_budget: float = 10.0,
+        diversity: Optional[float] = None,
+        max_workers: int = 8,
+        fast_path: bool = True,
+        tracer: Optional[Tracer] = None,
     ):
         """Initialize RAG pipeline.
         
@@ -82,6 +146,13 @@ class RAGPipeline:
             reranker_agent: Reranker agent for result ranking
             persona_agent: Persona agent for response generation
             memory_manager: Memory manager for conversation context
+            time_budget: Default end-to-end deadline in seconds for a query
+            diversity: MMR lambda applied when reranking (None disables MMR)
+            max_workers: Size of the executor running graph nodes for
+                ``aprocess_query``; bounds concurrent CPU-bound stages
+            fast_path: Run queries with the plain-Python executor instead of
+                the LangGraph graph; ignored when a checkpointer is given
+            tracer: Tracer receiving per-stage spans (default: histograms only)
         """
         if not LANGGRAPH_AVAILABLE:
             raise ImportError(
@@ -93,27 +164,49 @@ class RAGPipeline:
         self.reranker_agent = reranker_agent
         self.persona_agent = persona_agent
         self.memory_manager = memory_manager
+        self.time_budget = time_budget
+        self.diversity = diversity
+        self.tracer = tracer or Tracer()
+        
+        # Node functions wrapped in their stage span, shared by every executor
+        self._stages = {
+            "router": self._traced("router", self._router_node),
+            "retriever": self._traced("retriever", self._retriever_node),
+            "reranker": self._traced("reranker", self._reranker_node),
+            "persona": self._traced("persona", self._persona_node),
+            "memory": self._traced("memory", self._memory_node),
+        }
         
-        # Build the graph
+        # Async runs hop each node onto this pool so the event loop never runs
+        # embedding, FAISS search or scoring itself
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-pipeline")
+        
+        # Build the graph, plus an async twin whose nodes run on the executor
         self.graph = self._build_graph(checkpointer=checkpointer)
+        self.async_graph = self._build_graph(checkpointer=checkpointer, asynchronous=True)
+        # Checkpointed runs need LangGraph to persist state between steps
+        self.checkpointed = checkpointer is not None
+        self.fast_path = fast_path and not self.checkpointed
         
         logger.info("RAG pipeline initialized")
     
-    def _build_graph(self, checkpointer=None) -> StateGraph:
+    def _build_graph(self, checkpointer=None, asynchronous: bool = False) -> StateGraph:
         """Build the LangGraph state graph.
         
+        Args:
+            checkpointer: Optional LangGraph checkpointer
+            asynchronous: Build async nodes that run on the pipeline executor
+        
         Returns:
             Configured StateGraph
         """
         # Create the graph
         graph = StateGraph(RAGState)
+        node = self._offloaded if asynchronous else (lambda fn: fn)
         
         # Add nodes
-        graph.add_node("router", self._router_node)
-        graph.add_node("retriever", self._retriever_node)
-        graph.add_node("reranker", self._reranker_node)
-        graph.add_node("persona", self._persona_node)
-        graph.add_node("memory", self._memory_node)
+        for name, stage in self._stages.items():
+            graph.add_node(name, node(stage))
         
         # Define the flow
         graph.set_entry_point("router")
@@ -142,6 +235,57 @@ class RAGPipeline:
         
         return graph.compile(checkpointer=checkpointer)
     
+    def _offloaded(self, node: Callable[[RAGState], RAGState]):
+        """Wrap a sync node as an async node that runs on the pipeline executor.
+        
+        The caller's context is copied into the worker thread so LangGraph's
+        config (and with it ``get_stream_writer``) stays available to the node.
+        """
+        async def run(state: RAGState) -> RAGState:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, node, state)
+        
+        run.__name__ = node.__name__
+        return run
+    
+    def _run_fast(
+        self,
+        state: SlotState,
+        emit: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> SlotState:
+        """Run the graph's flow as plain calls over a SlotState.
+        
+        Mirrors the edges in ``_build_graph``: router, then retriever and
+        reranker when retrieval is needed, then persona and memory.
+        
+        Args:
+            state: Initial state
+            emit: Receives the ``routing`` and ``sources`` events of a streamed run
+        """
+        stages = self._stages
+        state = stages["router"](state)
+        if emit:
+            emit(self._routing_event(state))
+        if self._should_retrieve(state) == "retrieve":
+            state = stages["reranker"](stages["retriever"](state))
+            if emit:
+                emit(self._sources_event(state))
+        return stages["memory"](stages["persona"](state))
+    
+    def _traced(self, name: str, node: Callable[[RAGState], RAGState]) -> Callable[[RAGState], RAGState]:
+        """Wrap a node so each call runs inside a span named after its stage."""
+        @wraps(node)
+        def run(state: RAGState) -> RAGState:
+            with tracing.span(name):
+                error = state.get("error")
+                state = node(state)
+                # Nodes catch their own failures and record them in the state
+                if state.get("error") and state.get("error") != error:
+                    tracing.mark_error(state["error"])
+                return state
+        return run
+    
     def _router_node(self, state: RAGState) -> RAGState:
         """Router node for query classification."""
         logger.info("Executing router node")
@@ -155,16 +299,7 @@ class RAGPipeline:
                 query=state["query"],
                 context=context.metadata if context else None
             )
-            
-            state["routing_decision"] = {
-                "query_type": routing_decision.query_type.value,
-                "confidence": routing_decision.confidence,
-                "reasoning": routing_decision.reasoning,
-                "suggested_agents": routing_decision.suggested_agents,
-                "metadata": routing_decision.metadata
-            }
-            
-            logger.info(f"Routing decision: {routing_decision.query_type.value}")
+            self._apply_routing(state, routing_decision)
             
         except Exception as e:
             logger.error(f"Error in router node: {e}")
@@ -172,6 +307,20 @@ class RAGPipeline:
         
         return state
     
+    def _apply_routing(self, state: RAGState, routing_decision) -> None:
+        state["routing_decision"] = {
+            "query_type": routing_decision.query_type.value,
+            "confidence": routing_decision.confidence,
+            "reasoning": routing_decision.reasoning,
+            "suggested_agents": routing_decision.suggested_agents,
+            "metadata": routing_decision.metadata
+        }
+        # Semantic routing already embedded the query; retrieval reuses it
+        query_vector = getattr(routing_decision, "query_vector", None)
+        state["query_vector"] = query_vector if isinstance(query_vector, list) else None
+        
+        logger.info(f"Routing decision: {routing_decision.query_type.value}")
+    
     def _should_retrieve(self, state: RAGState) -> str:
         """Determine if retrieval is needed."""
         routing_decision = state.get("routing_decision")
@@ -191,21 +340,9 @@ class RAGPipeline:
         logger.info("Executing retriever node")
         
         try:
-            from .agents import RetrievalRequest
-            
-            # Create retrieval request
-            request = RetrievalRequest(
-                query=state["query"],
-                k=state.get("max_documents", 5),
-                include_metadata=True
-            )
-            
             # Retrieve documents
-            result = self.retriever_agent.retrieve_documents(request)
-            
-            state["retrieved_documents"] = result.documents
-            
-            logger.info(f"Retrieved {len(result.documents)} documents")
+            result = self.retriever_agent.retrieve_documents(self._retrieval_request(state))
+            self._apply_retrieval(state, result)
             
         except Exception as e:
             logger.error(f"Error in retriever node: {e}")
@@ -214,6 +351,32 @@ class RAGPipeline:
         
         return state
     
+    def _retrieval_request(self, state: RAGState):
+        from .agents import RetrievalRequest
+        
+        remaining = self._remaining(state)
+        budget = state.get("time_budget") or self.time_budget
+        k = state.get("max_documents", 5)
+        if remaining < budget * self.SHRINK_K_BELOW and k > 1:
+            k = max(1, k // 2)
+            self._degrade(state, "retrieval_k_reduced")
+        
+        return RetrievalRequest(
+            query=state["query"],
+            k=k,
+            include_metadata=True,
+            time_budget=max(remaining - budget * self.RETRIEVAL_RESERVE, remaining / 2),
+            query_vector=state.get("query_vector")
+        )
+    
+    def _apply_retrieval(self, state: RAGState, result) -> None:
+        state["retrieved_documents"] = result.documents
+        state["index_generation"] = result.metadata.get("index_generation")
+        if result.metadata.get("partial"):
+            self._degrade(state, "retrieval_partial")
+        
+        logger.info(f"Retrieved {len(result.documents)} documents")
+    
     def _reranker_node(self, state: RAGState) -> RAGState:
         """Reranker node for result ranking."""
         logger.info("Executing reranker node")
@@ -227,18 +390,36 @@ class RAGPipeline:
                 state["reranked_documents"] = []
                 return state
             
+            max_results = state.get("max_documents", 5)
+            remaining = self._remaining(state)
+            if remaining <= 0:
+                # Out of time: keep retrieval order and go straight to the response
+                state["reranked_documents"] = documents[:max_results]
+                self._degrade(state, "rerank_skipped")
+                return state
+            
+            strategy = RerankingStrategy(state.get("reranking_strategy", RerankingStrategy.HYBRID.value))
+            budget = state.get("time_budget") or self.time_budget
+            if remaining < budget * self.SCORE_ONLY_BELOW:
+                strategy = RerankingStrategy.SCORE_ONLY
+                self._degrade(state, "rerank_score_only")
+            
             # Create reranking request
             request = RerankingRequest(
                 documents=documents,
                 query=state["query"],
-                strategy=RerankingStrategy.HYBRID,
-                max_results=state.get("max_documents", 5)
+                strategy=strategy,
+                max_results=max_results,
+                time_budget=remaining,
+                diversity=self.diversity
             )
             
             # Rerank documents
             result = self.reranker_agent.rerank_documents(request)
             
             state["reranked_documents"] = result.documents
+            if result.metadata.get("timed_out"):
+                self._degrade(state, "rerank_timeout")
             
             logger.info(f"Reranked {len(result.documents)} documents")
             
@@ -259,8 +440,9 @@ class RAGPipeline:
             # Get documents (reranked if available, otherwise retrieved)
             documents = state.get("reranked_documents", state.get("retrieved_documents", []))
             
-            # Create persona request
+            # Create persona request; streamed runs receive the text as it is produced
             persona_type = PersonaType(state.get("persona_type", PersonaType.PROFESSIONAL.value))
+            writer = self._stream_writer()
             request = PersonaRequest(
                 query=state["query"],
                 documents=documents,
@@ -268,6 +450,10 @@ class RAGPipeline:
                 max_response_length=500,
                 include_sources=state.get("include_sources", True),
                 context=state.get("metadata"),
+                time_budget=self._remaining(state),
+                on_text=(lambda text: writer({"event": "token", "data": {"text": text}})) if writer else None,
+                on_reset=(lambda reason: writer({"event": "reset", "data": {"reason": reason}})) if writer else None,
+                index_generation=state.get("index_generation"),
             )
             
             # Generate response
@@ -276,6 +462,8 @@ class RAGPipeline:
             state["response"] = result.response
             state["sources"] = result.sources
             state["response_metadata"] = result.metadata
+            if result.metadata.get("evidence_truncated"):
+                self._degrade(state, "persona_evidence_truncated")
             
             logger.info("Generated persona response")
             
@@ -327,63 +515,370 @@ class RAGPipeline:
         Returns:
             RAGResponse with generated response
         """
-        import time
         start_time = time.time()
         
         logger.info(f"Processing query: {request.query[:100]}...")
         
         try:
-            # Initialize state
-            initial_state = RAGState(
-                query=request.query,
-                session_id=request.session_id,
-                routing_decision=None,
-                retrieved_documents=[],
-                reranked_documents=[],
-                response="",
-                sources=[],
-                response_metadata={},
-                metadata=request.context or {},
-                error=None,
-                max_documents=request.max_documents,
-                persona_type=request.persona_type.value,
-                include_sources=request.include_sources,
-            )
+            with self._query_trace(request) as root:
+                # Run the graph
+                if self.fast_path:
+                    final_state = self._run_fast(self._initial_state(request, SlotState))
+                else:
+                    final_state = self.graph.invoke(self._initial_state(request), self._graph_config(request))
             
-            # Run the graph
-            final_state = self.graph.invoke(initial_state)
+            response = self._build_response(request, final_state, start_time, root)
+            logger.info(f"Processed query in {response.processing_time:.3f}s")
+            return response
             
-            processing_time = time.time() - start_time
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            return self._error_response(request, start_time, e)
+    
+    async def aprocess_query(
+        self,
+        request: RAGRequest,
+        context: Optional[Dict[str, Any]] = None
+    ) -> RAGResponse:
+        """Process a query without blocking the event loop.
+        
+        Every stage executes on the pipeline's bounded executor (the whole
+        fast path in one hop, or the async graph node by node), so concurrent
+        queries overlap their CPU-bound stages up to ``max_workers`` while the
+        loop stays free for other requests.
+        
+        Args:
+            request: RAG request with query and parameters
+            context: Optional context information
             
-            # Create response
-            response = RAGResponse(
-                response=final_state["response"],
-                sources=final_state["sources"],
-                session_id=request.session_id,
-                processing_time=processing_time,
-                metadata={
-                    "routing_decision": final_state.get("routing_decision"),
-                    "documents_retrieved": len(final_state.get("retrieved_documents", [])),
-                    "documents_reranked": len(final_state.get("reranked_documents", [])),
-                    "retrieved_sources": self._source_labels(final_state.get("retrieved_documents", [])),
-                    "reranked_sources": self._source_labels(final_state.get("reranked_documents", [])),
-                    "response_metadata": final_state.get("response_metadata", {}),
-                    "error": final_state.get("error")
-                }
-            )
+        Returns:
+            RAGResponse with generated response
+        """
+        start_time = time.time()
+        
+        logger.info(f"Processing query asynchronously: {request.query[:100]}...")
+        
+        try:
+            with self._query_trace(request) as root:
+                if self.fast_path:
+                    # One executor hop for the whole flow instead of one per node
+                    loop = asyncio.get_running_loop()
+                    final_state = await loop.run_in_executor(
+                        self._executor,
+                        contextvars.copy_context().run,
+                        self._run_fast,
+                        self._initial_state(request, SlotState)
+                    )
+                else:
+                    final_state = await self.async_graph.ainvoke(self._initial_state(request), self._graph_config(request))
             
-            logger.info(f"Processed query in {processing_time:.3f}s")
+            response = self._build_response(request, final_state, start_time, root)
+            logger.info(f"Processed query in {response.processing_time:.3f}s")
             return response
             
         except Exception as e:
             logger.error(f"Error processing query: {e}")
-            return RAGResponse(
-                response="I apologize, but I encountered an error processing your request. Please try again.",
-                sources=[],
+            return self._error_response(request, start_time, e)
+    
+    def process_batch(self, requests: List[RAGRequest]) -> List[RAGResponse]:
+        """Process several queries with shared embedding and search.
+        
+        All queries are embedded with one embedder call, routed together, and
+        retrieved with one batched vector search; reranking, persona
+        generation and memory then run per query on the pipeline executor.
+        A failure in one query's later stages only affects that query.
+        
+        The batch is one trace: the shared ``route`` and ``retrieve`` spans sit
+        under the ``query_batch`` root next to a ``query`` span per item holding
+        that item's stages. A traced item's ``metadata["trace"]`` holds the
+        shared spans and its own ``query`` span only.
+        
+        Args:
+            requests: RAG requests to answer
+            
+        Returns:
+            RAGResponse per request, in input order
+        """
+        start_time = time.time()
+        if not requests:
+            return []
+        
+        logger.info(f"Processing batch of {len(requests)} queries")
+        states = [self._initial_state(request) for request in requests]
+        item_spans: List[Optional[tracing.Span]] = [None] * len(requests)
+        with self.tracer.trace("query_batch", force=any(r.trace for r in requests), size=len(requests)) as root:
+            outcomes = self._run_batch(states, item_spans)
+        
+        responses = []
+        for request, outcome, item_span in zip(requests, outcomes, item_spans):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error processing batch query: {outcome}")
+                responses.append(self._error_response(request, start_time, outcome))
+                continue
+            response = self._build_response(request, outcome, start_time)
+            if request.trace and root is not None:
+                response.metadata["trace"] = self._batch_item_trace(root, item_span, item_spans)
+            responses.append(response)
+        
+        logger.info(f"Processed batch of {len(requests)} queries in {time.time() - start_time:.3f}s")
+        return responses
+    
+    def _run_batch(self, states: List[RAGState], item_spans: List[Optional[tracing.Span]]) -> List[Any]:
+        """Run batch states through the pipeline; returns final states or per-query errors.
+        
+        Each query's own stages run under a ``query`` span, stored in ``item_spans``.
+        """
+        queries = [state["query"] for state in states]
+        
+        try:
+            query_vectors = self.retriever_agent.embed_queries(queries)
+        except Exception as e:
+            # Retrieval embeds per query instead
+            logger.error(f"Error embedding batch: {e}")
+            query_vectors = [None] * len(states)
+        
+        try:
+            with tracing.span("route"):
+                contexts = []
+                for state in states:
+                    context = self.memory_manager.get_conversation_context(state["session_id"])
+                    contexts.append(context.metadata if context else None)
+                decisions = self.router_agent.route_batch(
+                    queries,
+                    contexts=contexts,
+                    query_vectors=query_vectors if None not in query_vectors else None
+                )
+            for state, decision in zip(states, decisions):
+                self._apply_routing(state, decision)
+        except Exception as e:
+            logger.error(f"Error routing batch: {e}")
+            for state in states:
+                state["error"] = str(e)
+        for state, query_vector in zip(states, query_vectors):
+            state["query_vector"] = query_vector
+        
+        retrieving = [state for state in states if self._should_retrieve(state) == "retrieve"]
+        if retrieving:
+            try:
+                with tracing.span("retrieve", queries=len(retrieving)):
+                    results = self.retriever_agent.retrieve_batch(
+                        [self._retrieval_request(state) for state in retrieving]
+                    )
+                for state, result in zip(retrieving, results):
+                    self._apply_retrieval(state, result)
+            except Exception as e:
+                logger.error(f"Error retrieving batch: {e}")
+                for state in retrieving:
+                    state["error"] = str(e)
+                    state["retrieved_documents"] = []
+        
+        stages = self._stages
+        
+        def finish(index: int, state: RAGState, retrieved: bool) -> RAGState:
+            with tracing.span("query", index=index, session_id=state["session_id"]) as item_span:
+                item_spans[index] = item_span
+                if retrieved:
+                    state = stages["reranker"](state)
+                return stages["memory"](stages["persona"](state))
+        
+        retrieving_ids = {id(state) for state in retrieving}
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, finish, index, state, id(state) in retrieving_ids)
+            for index, state in enumerate(states)
+        ]
+        
+        outcomes: List[Any] = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    
+    def _batch_item_trace(
+        self,
+        root: tracing.Span,
+        item_span: Optional[tracing.Span],
+        item_spans: List[Optional[tracing.Span]]
+    ) -> Dict[str, Any]:
+        """The batch trace with the other items' ``query`` spans left out."""
+        others = {id(span) for span in item_spans if span is not None and span is not item_span}
+        trace = root.to_dict()
+        trace["children"] = [child.to_dict(root.start) for child in root.children if id(child) not in others]
+        return trace
+    
+    def stream_query(self, request: RAGRequest) -> Iterator[Dict[str, Any]]:
+        """Process a query, yielding events as each stage completes.
+        
+        Events are ``{"event": name, "data": payload}`` dicts, in order:
+        ``routing`` (the routing decision), ``sources`` (the reranked documents,
+        skipped when the router answers without retrieval), ``token`` (``{"text":
+        ...}`` pieces of the response as it is generated) and finally ``done``
+        whose data is the same RAGResponse ``process_query`` returns. A failure
+        yields an ``error`` event before ``done``. When generation fails after
+        some tokens were sent, a ``reset`` event (``{"reason": ...}``) tells the
+        consumer to discard them before the fallback answer's tokens follow.
+        
+        The run itself happens on the pipeline executor, under the same root
+        span and on the same fast path as ``process_query``, and hands its
+        events over as they occur; the generator only relays them, so it can
+        be resumed from any thread.
+        
+        Args:
+            request: RAG request with query and parameters
+            
+        Yields:
+            Pipeline events
+        """
+        start_time = time.time()
+        
+        logger.info(f"Streaming query: {request.query[:100]}...")
+        
+        events: "queue.Queue[Any]" = queue.Queue()
+        finished = object()
+        
+        def run():
+            _event_sink.set(events.put)
+            try:
+                with self._query_trace(request) as root:
+                    if self.fast_path:
+                        final_state = self._run_fast(self._initial_state(request, SlotState), emit=events.put)
+                    else:
+                        final_state = self._stream_graph(self._initial_state(request), events.put, self._graph_config(request))
+                return final_state, root
+            finally:
+                events.put(finished)
+        
+        try:
+            future = self._executor.submit(contextvars.copy_context().run, run)
+            yield from iter(events.get, finished)
+            final_state, root = future.result()
+            response = self._build_response(request, final_state, start_time, root)
+            logger.info(f"Streamed query in {response.processing_time:.3f}s")
+            
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            yield {"event": "error", "data": {"error": str(e)}}
+            response = self._error_response(request, start_time, e)
+        
+        yield {"event": "done", "data": response}
+    
+    def _stream_graph(
+        self,
+        initial_state: RAGState,
+        emit: Callable[[Dict[str, Any]], None],
+        config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run the LangGraph graph, emitting stage events; returns the final state."""
+        final_state = dict(initial_state)
+        steps = self.graph.stream(initial_state, config)
+        for node, update in (chunk for step in steps for chunk in step.items()):
+            final_state.update(update or {})
+            if node == "router":
+                emit(self._routing_event(final_state))
+            elif node == "reranker":
+                emit(self._sources_event(final_state))
+        return final_state
+    
+    def _routing_event(self, state: RAGState) -> Dict[str, Any]:
+        return {"event": "routing", "data": state.get("routing_decision")}
+    
+    def _sources_event(self, state: RAGState) -> Dict[str, Any]:
+        return {"event": "sources", "data": self._source_summaries(state.get("reranked_documents", []))}
+    
+    def _initial_state(self, request: RAGRequest, state_type: Callable[..., Any] = RAGState) -> RAGState:
+        time_budget = request.time_budget if request.time_budget is not None else self.time_budget
+        return state_type(
+            query=request.query,
+            session_id=request.session_id,
+            routing_decision=None,
+            retrieved_documents=[],
+            reranked_documents=[],
+            response="",
+            sources=[],
+            response_metadata={},
+            metadata=request.context or {},
+            error=None,
+            max_documents=request.max_documents,
+            persona_type=request.persona_type.value,
+            include_sources=request.include_sources,
+            reranking_strategy=request.reranking_strategy.value,
+            time_budget=time_budget,
+            deadline=time.monotonic() + time_budget,
+            degradations=[],
+            index_generation=None,
+            query_vector=None,
+        )
+    
+    def _graph_config(self, request: RAGRequest) -> Optional[Dict[str, Any]]:
+        """LangGraph run config; checkpointed runs are threaded by session."""
+        if not self.checkpointed:
+            return None
+        return {"configurable": {"thread_id": request.session_id}}
+    
+    def _query_trace(self, request: RAGRequest):
+        return self.tracer.trace("query", force=request.trace, session_id=request.session_id)
+    
+    def _build_response(
+        self,
+        request: RAGRequest,
+        final_state: Dict[str, Any],
+        start_time: float,
+        trace: Optional[tracing.Span] = None
+    ) -> RAGResponse:
+        response = RAGResponse(
+            response=final_state["response"],
+            sources=final_state["sources"],
+            session_id=request.session_id,
+            processing_time=time.time() - start_time,
+            metadata={
+                "routing_decision": final_state.get("routing_decision"),
+                "documents_retrieved": len(final_state.get("retrieved_documents", [])),
+                "documents_reranked": len(final_state.get("reranked_documents", [])),
+                "retrieved_sources": self._source_labels(final_state.get("retrieved_documents", [])),
+                "reranked_sources": self._source_labels(final_state.get("reranked_documents", [])),
+                "response_metadata": final_state.get("response_metadata", {}),
+                "time_budget": final_state.get("time_budget"),
+                "degradations": final_state.get("degradations", []),
+                "error": final_state.get("error")
+            }
+        )
+        if request.trace and trace is not None:
+            response.metadata["trace"] = trace.to_dict()
+        return response
+    
+    def _error_response(self, request: RAGRequest, start_time: float, error: Exception) -> RAGResponse:
+        return RAGResponse(
+            response="I apologize, but I encountered an error processing your request. Please try again.",
+            sources=[],
+            session_id=request.session_id,
+            processing_time=time.time() - start_time,
+            metadata={"error": str(error)}
+        )
+    
+    def record_turn(self, request: RAGRequest, response: RAGResponse) -> None:
+        """Record a conversation turn for a response produced outside this request's run.
+        
+        Used when one pipeline run answers several callers; the run's memory
+        node only records the turn of the caller that triggered it.
+        
+        Args:
+            request: The caller's request
+            response: The response the caller received
+        """
+        try:
+            self.memory_manager.add_turn(
                 session_id=request.session_id,
-                processing_time=time.time() - start_time,
-                metadata={"error": str(e)}
+                user_query=request.query,
+                agent_response=response.response,
+                metadata={
+                    "routing_decision": response.metadata.get("routing_decision"),
+                    "documents_used": response.metadata.get("documents_retrieved", 0),
+                    "sources": response.sources
+                }
             )
+        except Exception as e:
+            logger.error(f"Error recording turn: {e}")
     
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """Get pipeline statistics.
@@ -396,9 +891,50 @@ class RAGPipeline:
             "retriever_stats": self.retriever_agent.get_retrieval_stats(),
             "reranker_stats": self.reranker_agent.get_reranking_stats(),
             "persona_stats": self.persona_agent.get_persona_stats(),
-            "memory_stats": self.memory_manager.get_memory_stats()
+            "memory_stats": self.memory_manager.get_memory_stats(),
+            "stage_latency": self.tracer.get_stats()
         }
 
+    def _remaining(self, state: RAGState) -> float:
+        """Seconds left before the request deadline (negative once it has passed)."""
+        deadline = state.get("deadline")
+        if deadline is None:
+            return state.get("time_budget") or self.time_budget
+        return deadline - time.monotonic()
+
+    def _degrade(self, state: RAGState, reason: str) -> None:
+        logger.warning(f"Degrading query under deadline: {reason}")
+        degradations = state.get("degradations")
+        if degradations is None:
+            degradations = state["degradations"] = []
+        if reason not in degradations:
+            degradations.append(reason)
+
+    def _stream_writer(self):
+        """Where a streamed run sends its events: ``stream_query``'s sink, else
+        the LangGraph custom-stream writer of the running graph, if any."""
+        sink = _event_sink.get()
+        if sink is not None:
+            return sink
+        if get_stream_writer is None:
+            return None
+        try:
+            return get_stream_writer()
+        except RuntimeError:
+            # Node called outside a graph run
+            return None
+
+    def _source_summaries(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": document.get("id", ""),
+                "source": document.get("metadata", {}).get("source") or document.get("id", ""),
+                "score": float(document.get("score", 0.0)),
+                "rank": position,
+            }
+            for position, document in enumerate(documents, start=1)
+        ]
+
     def _source_labels(self, documents: List[Dict[str, Any]]) -> List[str]:
         labels: List[str] = []
         for document in documents:
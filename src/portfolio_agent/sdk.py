@@ -8,18 +8,33 @@ vector store and query it through the persona-grounded RAG pipeline.
 from __future__ import annotations
 
 import asyncio
+import dataclasses
 import inspect
+import json
 import logging
+import time
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
-from .agents import MemoryManager, PersonaAgent, PersonaType, RerankerAgent, RetrieverAgent, RouterAgent
+from .agents import (
+    MemoryManager,
+    PersonaAgent,
+    PersonaType,
+    RerankerAgent,
+    RetrieverAgent,
+    RouterAgent,
+    create_generation_backend,
+)
 from .config import settings
 from .ingestion import GenericIngestor, GitHubIngestor, ResumeIngestor, TextChunker, WebsiteIngestor, pii_redactor
 from .rag_pipeline import RAGPipeline, RAGRequest, RAGResponse
+from .metrics import EMBEDDING_BATCH_SIZE
+from .single_flight import SingleFlight
+from .tracing import create_tracer
+from .timestamps import normalize_timestamp
 from .vector_stores import FAISSVectorStore
 
 logger = logging.getLogger(__name__)
@@ -55,15 +70,28 @@ class PortfolioAgent:
             index_type=settings.FAISS_INDEX_TYPE,
             metric=settings.FAISS_METRIC,
         )
-        self.router_agent = router_agent or RouterAgent()
+        self.router_agent = router_agent or RouterAgent(
+            extra_patterns=settings.ROUTING_PATTERNS,
+            routing_mode=settings.ROUTING_MODE,
+            embedder=self.embedder,
+        )
         self.retriever_agent = RetrieverAgent(
             vector_store=self.vector_store,
             embedder=self.embedder,
             default_k=settings.TOP_K_RETRIEVAL,
             min_score_threshold=settings.SIMILARITY_THRESHOLD,
+            retrieval_mode=settings.RETRIEVAL_MODE,
+            rrf_k=settings.RRF_K,
+            cache_size=settings.RETRIEVAL_CACHE_SIZE,
+            cache_ttl=settings.RETRIEVAL_CACHE_TTL,
+        )
+        self.reranker_agent = reranker_agent or RerankerAgent(vector_store=self.vector_store)
+        self.persona_agent = persona_agent or PersonaAgent(
+            generation_backend=create_generation_backend(),
+            cache_size=settings.PERSONA_CACHE_SIZE,
+            cache_ttl=settings.PERSONA_CACHE_TTL,
+            vector_store=self.vector_store,
         )
-        self.reranker_agent = reranker_agent or RerankerAgent()
-        self.persona_agent = persona_agent or PersonaAgent()
         self.memory_manager = memory_manager or MemoryManager(
             max_turns=10,
             max_context_length=4000,
@@ -75,7 +103,22 @@ class PortfolioAgent:
             reranker_agent=self.reranker_agent,
             persona_agent=self.persona_agent,
             memory_manager=self.memory_manager,
+            time_budget=settings.QUERY_TIME_BUDGET,
+            diversity=settings.MMR_LAMBDA,
+            max_workers=settings.PIPELINE_MAX_WORKERS,
+            fast_path=settings.PIPELINE_FAST_PATH,
+            tracer=create_tracer(
+                sink=settings.TRACE_SINK,
+                enabled=settings.TRACING_ENABLED,
+                jsonl_path=settings.TRACE_JSONL_PATH,
+                otlp_endpoint=settings.TRACE_OTLP_ENDPOINT,
+                buffer_size=settings.TRACE_BUFFER_SIZE,
+            ),
         )
+        self.tracer = self.pipeline.tracer
+        # Identical queries arriving together share one pipeline run
+        self.coalesce_queries = settings.QUERY_COALESCING
+        self._flights = SingleFlight()
 
     @classmethod
     def from_settings(cls, *, index_path: Optional[str] = None) -> "PortfolioAgent":
@@ -250,18 +293,157 @@ class PortfolioAgent:
         max_documents: Optional[int] = None,
         include_sources: bool = True,
         context: Optional[Dict[str, Any]] = None,
+        time_budget: Optional[float] = None,
+        trace: bool = False,
     ) -> RAGResponse:
-        """Query the indexed corpus through the canonical pipeline."""
+        """Query the indexed corpus through the canonical pipeline.
 
-        request = RAGRequest(
-            query=query,
+        ``time_budget`` overrides ``QUERY_TIME_BUDGET`` for this request; stages
+        degrade rather than overrun it and report what they dropped in
+        ``metadata["degradations"]``.
+
+        Identical queries (against the same index generation, and from the
+        same session once it has history) that overlap in time run the pipeline
+        once; callers that shared another's run get
+        ``metadata["coalesced"] = True`` and still have their turn recorded.
+
+        With ``trace=True`` the query's span tree (per-stage timings) is
+        returned in ``metadata["trace"]``; traced queries are never coalesced.
+        """
+
+        request = self._rag_request(
+            query,
             session_id=session_id,
             persona_type=persona_type,
-            max_documents=max_documents or settings.TOP_K_RETRIEVAL,
+            max_documents=max_documents,
+            include_sources=include_sources,
+            context=context,
+            time_budget=time_budget,
+            trace=trace,
+        )
+        key = self._flight_key(request)
+        if key is None:
+            return self.pipeline.process_query(request)
+
+        started = time.time()
+        response, shared = self._flights.do(key, lambda: self.pipeline.process_query(request))
+        return self._flight_response(request, response, shared, started)
+
+    async def aquery(
+        self,
+        query: str,
+        *,
+        session_id: str = "default",
+        persona_type: PersonaType = PersonaType.PROFESSIONAL,
+        max_documents: Optional[int] = None,
+        include_sources: bool = True,
+        context: Optional[Dict[str, Any]] = None,
+        time_budget: Optional[float] = None,
+        trace: bool = False,
+    ) -> RAGResponse:
+        """Async variant of ``query`` for use inside an event loop.
+
+        Pipeline stages run on a bounded worker pool (``PIPELINE_MAX_WORKERS``)
+        instead of the calling loop, so concurrent queries do not stall it.
+        """
+
+        request = self._rag_request(
+            query,
+            session_id=session_id,
+            persona_type=persona_type,
+            max_documents=max_documents,
             include_sources=include_sources,
             context=context,
+            time_budget=time_budget,
+            trace=trace,
         )
-        return self.pipeline.process_query(request)
+        key = self._flight_key(request)
+        if key is None:
+            return await self.pipeline.aprocess_query(request)
+
+        started = time.time()
+        response, shared = await self._flights.ado(key, lambda: self.pipeline.aprocess_query(request))
+        return self._flight_response(request, response, shared, started)
+
+    def query_batch(
+        self,
+        queries: Sequence[Union[str, Dict[str, Any]]],
+        *,
+        session_id: str = "default",
+        persona_type: PersonaType = PersonaType.PROFESSIONAL,
+        max_documents: Optional[int] = None,
+        include_sources: bool = True,
+        time_budget: Optional[float] = None,
+    ) -> List[RAGResponse]:
+        """Answer several queries with one embedding call and one vector search.
+
+        Each item is a query string or a dict with ``query`` plus any of the
+        keyword arguments of ``query`` to override the batch defaults. Responses
+        come back in input order; an item that is invalid or fails gets an
+        error response in its slot (``metadata["error"]``) without affecting
+        the rest of the batch.
+        """
+
+        defaults = {
+            "session_id": session_id,
+            "persona_type": persona_type,
+            "max_documents": max_documents,
+            "include_sources": include_sources,
+            "context": None,
+            "time_budget": time_budget,
+            "trace": False,
+        }
+        started = time.time()
+        responses: List[Optional[RAGResponse]] = [None] * len(queries)
+        requests: List[RAGRequest] = []
+        positions: List[int] = []
+        for index, item in enumerate(queries):
+            try:
+                request = self._batch_request(item, defaults)
+            except (KeyError, TypeError, ValueError) as e:
+                responses[index] = RAGResponse(
+                    response=f"Invalid query: {e}",
+                    sources=[],
+                    session_id=item.get("session_id", session_id) if isinstance(item, dict) else session_id,
+                    processing_time=time.time() - started,
+                    metadata={"error": str(e)},
+                )
+                continue
+            requests.append(request)
+            positions.append(index)
+
+        for index, response in zip(positions, self.pipeline.process_batch(requests)):
+            responses[index] = response
+        return responses
+
+    def stream_query(
+        self,
+        query: str,
+        *,
+        session_id: str = "default",
+        persona_type: PersonaType = PersonaType.PROFESSIONAL,
+        max_documents: Optional[int] = None,
+        include_sources: bool = True,
+        context: Optional[Dict[str, Any]] = None,
+        time_budget: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Query like ``query`` but yield pipeline events as each stage completes.
+
+        Yields ``routing``, ``sources``, ``token`` and finally ``done`` events
+        (see ``RAGPipeline.stream_query``); the ``done`` event carries the
+        RAGResponse ``query`` would have returned.
+        """
+
+        request = self._rag_request(
+            query,
+            session_id=session_id,
+            persona_type=persona_type,
+            max_documents=max_documents,
+            include_sources=include_sources,
+            context=context,
+            time_budget=time_budget,
+        )
+        yield from self.pipeline.stream_query(request)
 
     def stats(self) -> Dict[str, Any]:
         """Return a small set of SDK/runtime stats."""
@@ -269,8 +451,86 @@ class PortfolioAgent:
         return {
             "vector_store": self.vector_store.get_stats(),
             "pipeline": self.pipeline.get_pipeline_stats(),
+            "coalescing": self._flights.get_stats(),
         }
 
+    def _flight_key(self, request: RAGRequest) -> Optional[Tuple[Any, ...]]:
+        """Identity of a query for coalescing, or None when coalescing is off.
+
+        Everything that shapes the answer is included. The session only counts
+        once it has conversation history, since that context feeds routing;
+        fresh sessions asking the same thing share a run.
+        """
+        if not self.coalesce_queries or request.trace:
+            return None
+        has_history = self.memory_manager.get_conversation_context(request.session_id) is not None
+        return (
+            request.session_id if has_history else None,
+            " ".join(request.query.lower().split()),
+            request.persona_type.value,
+            request.max_documents,
+            request.reranking_strategy.value,
+            request.include_sources,
+            json.dumps(request.context, sort_keys=True, default=str) if request.context else None,
+            request.time_budget,
+            getattr(self.vector_store, "generation", None),
+        )
+
+    def _flight_response(
+        self,
+        request: RAGRequest,
+        response: RAGResponse,
+        shared: bool,
+        started: float,
+    ) -> RAGResponse:
+        if not shared:
+            return response
+
+        # The run recorded the turn for its own caller only
+        self.pipeline.record_turn(request, response)
+        return dataclasses.replace(
+            response,
+            sources=[dict(source) for source in response.sources],
+            session_id=request.session_id,
+            processing_time=time.time() - started,
+            metadata={**response.metadata, "coalesced": True},
+        )
+
+    def _batch_request(self, item: Union[str, Dict[str, Any]], defaults: Dict[str, Any]) -> RAGRequest:
+        fields = {"query": item} if isinstance(item, str) else dict(item)
+        query = fields.pop("query", None)
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("query must be a non-empty string")
+        unknown = set(fields) - set(defaults)
+        if unknown:
+            raise ValueError(f"unknown query fields: {', '.join(sorted(unknown))}")
+        fields = {**defaults, **fields}
+        fields["persona_type"] = PersonaType(fields["persona_type"])
+        return self._rag_request(query, **fields)
+
+    def _rag_request(
+        self,
+        query: str,
+        *,
+        session_id: str,
+        persona_type: PersonaType,
+        max_documents: Optional[int],
+        include_sources: bool,
+        context: Optional[Dict[str, Any]],
+        time_budget: Optional[float],
+        trace: bool = False,
+    ) -> RAGRequest:
+        return RAGRequest(
+            query=query,
+            session_id=session_id,
+            persona_type=persona_type,
+            max_documents=max_documents or settings.TOP_K_RETRIEVAL,
+            include_sources=include_sources,
+            context=context,
+            time_budget=time_budget,
+            trace=trace,
+        )
+
     def _index_chunks(self, chunks: Iterable[Dict[str, Any]]) -> None:
         chunk_list = list(chunks)
         if not chunk_list:
@@ -283,6 +543,7 @@ class PortfolioAgent:
         self.vector_store.add_texts(texts=texts, vectors=vectors, metadatas=metadatas, ids=ids)
 
     def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        EMBEDDING_BATCH_SIZE.labels("document").observe(len(texts))
         if hasattr(self.embedder, "embed_texts_sync"):
             result = self.embedder.embed_texts_sync(texts)
         else:
@@ -320,6 +581,7 @@ class PortfolioAgent:
                 metadata["source"] = source_label
             if source_path:
                 metadata["file_path"] = source_path
+            normalize_timestamp(metadata)
             normalized.append(
                 {
                     "id": f"{document_id}_chunk_{idx}",
@@ -0,0 +1,107 @@
+"""
+Single-flight call coalescing.
+
+Concurrent callers asking for the same key share one execution: the first
+caller runs the work and every caller that arrives while it is in flight
+receives the same result (or exception). Nothing is remembered once the call
+finishes, so this complements ``ResultCache`` rather than replacing it.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls, for both threads and coroutines."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[Any, Hashable], "asyncio.Task[Any]"] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``fn`` once for all threads calling with ``key`` concurrently.
+
+        Args:
+            key: Identity of the call
+            fn: Work to run if no identical call is in flight
+
+        Returns:
+            Tuple of (result, shared) where ``shared`` is True for callers
+            that received another caller's result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await ``fn()`` once for all coroutines calling with ``key`` concurrently.
+
+        The work runs as its own task, so a caller that is cancelled (e.g. a
+        disconnected client) does not cancel it for the others.
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function to run if no identical call is in flight
+
+        Returns:
+            Tuple of (result, shared), as for ``do``
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = self._tasks.get(flight_key)
+        shared = task is not None
+        if shared:
+            self._coalesced += 1
+        else:
+            self._leaders += 1
+            task = loop.create_task(fn())
+            self._tasks[flight_key] = task
+            task.add_done_callback(lambda done: self._forget(flight_key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, flight_key: Tuple[Any, Hashable], task: "asyncio.Task[Any]") -> None:
+        if self._tasks.get(flight_key) is task:
+            del self._tasks[flight_key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executions, coalesced callers and calls currently in flight."""
+        return {
+            "executions": self._leaders,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._calls) + len(self._tasks),
+        }
@@ -9,7 +9,10 @@ ignore non-discriminative query terms.
 from __future__ import annotations
 
 import re
-from typing import Iterable, List, Set
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
 
 STOP_WORDS = {
     "a", "an", "and", "are", "about", "as", "at", "be", "by", "describe", "described", "did", "do", "does",
@@ -38,6 +41,12 @@ def extract_terms(text: str, *, ignored_terms: Set[str] | None = None) -> List[s
     return terms
 
 
+@lru_cache(maxsize=8192)
+def term_set(text: str) -> FrozenSet[str]:
+    """Distinct terms of ``text``; memoized since the same chunks recur across stages and queries."""
+    return frozenset(extract_terms(text))
+
+
 def normalize_term(term: str) -> str:
     token = term.lower().strip()
     if token.endswith("ies") and len(token) > 4:
@@ -61,18 +70,31 @@ def term_variants(term: str) -> Set[str]:
     return variants
 
 
+def query_variants(query: str, *, ignored_terms: Set[str] | None = None) -> List[Set[str]]:
+    """Variant sets for each query term, in query order (duplicates kept)."""
+    return [term_variants(term) for term in extract_terms(query, ignored_terms=ignored_terms)]
+
+
+def overlap_count(variants: List[Set[str]], content_terms: FrozenSet[str]) -> int:
+    """Count query terms (given as variant sets) with a variant in ``content_terms``."""
+    return sum(1 for variant_set in variants if not variant_set.isdisjoint(content_terms))
+
+
 def keyword_overlap(query: str, content: str, *, ignored_terms: Set[str] | None = None) -> int:
-    content_terms = set(extract_terms(content))
-    overlap = 0
-    for term in extract_terms(query, ignored_terms=ignored_terms):
-        if term_variants(term).intersection(content_terms):
-            overlap += 1
-    return overlap
+    return overlap_count(query_variants(query, ignored_terms=ignored_terms), term_set(content))
 
 
 def non_discriminative_terms(query: str, contents: Iterable[str], *, threshold: float = 0.8) -> Set[str]:
-    content_list = list(contents)
-    if not content_list:
+    return non_discriminative_terms_from_sets(
+        query, [term_set(content) for content in contents], threshold=threshold
+    )
+
+
+def non_discriminative_terms_from_sets(
+    query: str, content_term_sets: List[FrozenSet[str]], *, threshold: float = 0.8
+) -> Set[str]:
+    """Same as ``non_discriminative_terms`` for contents already reduced to term sets."""
+    if not content_term_sets:
         return set()
 
     query_terms = set(extract_terms(query))
@@ -80,10 +102,175 @@ def non_discriminative_terms(query: str, contents: Iterable[str], *, threshold:
         return set()
 
     ignored: Set[str] = set()
-    doc_count = len(content_list)
+    doc_count = len(content_term_sets)
     minimum_hits = max(2, int(doc_count * threshold + 0.999))
     for term in query_terms:
-        hits = sum(1 for content in content_list if keyword_overlap(term, content) > 0)
+        variants = query_variants(term)
+        hits = sum(1 for content_terms in content_term_sets if overlap_count(variants, content_terms) > 0)
         if hits >= minimum_hits:
             ignored.add(term)
     return ignored
+
+
+def word_tokens(text: str) -> List[str]:
+    """Lowercased word tokens used for positional (phrase and order) matching."""
+    return re.findall(r"\w+", text.lower())
+
+
+class TermPositions:
+    """Compact positional postings for one chunk: word -> every position it occurs at.
+
+    Positions for all words live in a single unsigned array grouped by word, with
+    a dict of (start, end) spans into it, so a chunk costs a few bytes per token.
+    """
+
+    __slots__ = ("spans", "positions", "length")
+
+    def __init__(self, text: str = ""):
+        grouped: Dict[str, List[int]] = {}
+        tokens = word_tokens(text)
+        for position, token in enumerate(tokens):
+            grouped.setdefault(token, []).append(position)
+
+        self.length = len(tokens)
+        self.positions = array("H" if self.length <= 0xFFFF else "I")
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        for token, token_positions in grouped.items():
+            start = len(self.positions)
+            self.positions.extend(token_positions)
+            self.spans[token] = (start, len(self.positions))
+
+    def __getstate__(self):
+        return self.spans, self.positions, self.length
+
+    def __setstate__(self, state):
+        self.spans, self.positions, self.length = state
+
+    def get(self, word: str) -> Sequence[int]:
+        """Ascending positions of ``word`` (empty if absent)."""
+        span = self.spans.get(word)
+        if span is None:
+            return ()
+        return self.positions[span[0]:span[1]]
+
+    def has_phrase(self, words: List[str]) -> bool:
+        """Whether ``words`` occur consecutively anywhere in the chunk."""
+        if not words:
+            return False
+        starts = set(self.get(words[0]))
+        for offset, word in enumerate(words[1:], start=1):
+            if not starts:
+                return False
+            starts.intersection_update(position - offset for position in self.get(word))
+        return bool(starts)
+
+    def order_score(self, words: List[str]) -> float:
+        """1.0 if the words occur in query order, 0.5 if all occur in another order, else 0.0."""
+        postings = [self.get(word) for word in words]
+        if not all(postings):
+            return 0.0
+
+        previous = -1
+        for positions in postings:
+            index = bisect_right(positions, previous)
+            if index == len(positions):
+                return 0.5
+            previous = positions[index]
+        return 1.0
+
+
+@lru_cache(maxsize=2048)
+def term_positions(text: str) -> TermPositions:
+    """Positional postings for text that was not indexed at ingest."""
+    return TermPositions(text)
+
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the non-empty, stripped sentences of ``text``."""
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    for boundary in [*SENTENCE_BOUNDARY.finditer(text), None]:
+        end = boundary.start() if boundary is not None else len(text)
+        segment = text[start:end]
+        stripped = segment.strip()
+        if stripped:
+            left = start + (len(segment) - len(segment.lstrip()))
+            spans.append((left, left + len(stripped)))
+        if boundary is not None:
+            start = boundary.end()
+    return spans
+
+
+class SentenceIndex:
+    """Sentence offsets and per-sentence term ids for one chunk.
+
+    ``terms`` interns the chunk's distinct terms; sentence ``i`` spans
+    ``offsets[2i]:offsets[2i + 1]`` of the content and owns the term ids
+    ``term_ids[bounds[i]:bounds[i + 1]]``. ``postings`` maps each term to the
+    sentences containing it, so matching a query only touches the query's
+    terms, with no re-tokenization.
+    """
+
+    __slots__ = ("terms", "offsets", "bounds", "term_ids", "postings")
+
+    def __init__(self, text: str = ""):
+        vocabulary: Dict[str, int] = {}
+        self.offsets = array("I")
+        self.bounds = array("I", [0])
+        self.term_ids = array("I")
+        for start, end in sentence_spans(text):
+            self.offsets.extend((start, end))
+            ids = {vocabulary.setdefault(term, len(vocabulary)) for term in extract_terms(text[start:end])}
+            self.term_ids.extend(sorted(ids))
+            self.bounds.append(len(self.term_ids))
+        self.terms: Tuple[str, ...] = tuple(vocabulary)
+        self.postings = self._build_postings()
+
+    def _build_postings(self) -> Dict[str, Tuple[int, ...]]:
+        sentences: List[List[int]] = [[] for _ in self.terms]
+        for index in range(len(self)):
+            for term_id in self.term_ids[self.bounds[index]:self.bounds[index + 1]]:
+                sentences[term_id].append(index)
+        return {term: tuple(indices) for term, indices in zip(self.terms, sentences)}
+
+    def __getstate__(self):
+        return self.terms, self.offsets, self.bounds, self.term_ids
+
+    def __setstate__(self, state):
+        self.terms, self.offsets, self.bounds, self.term_ids = state
+        self.postings = self._build_postings()
+
+    def __len__(self) -> int:
+        return len(self.bounds) - 1
+
+    def sentence(self, text: str, index: int) -> str:
+        """The ``index``-th sentence of ``text`` (the content this index was built from)."""
+        return text[self.offsets[2 * index]:self.offsets[2 * index + 1]]
+
+    def overlaps(self, variants: List[Set[str]]) -> List[int]:
+        """Per sentence, how many query terms (as variant sets) it contains.
+
+        Equivalent to ``overlap_count(variants, term_set(sentence))`` for every sentence.
+        """
+        counts = [0] * len(self)
+        postings = self.postings
+        for variant_set in variants:
+            matched = [postings[term] for term in variant_set if term in postings]
+            if len(matched) == 1:
+                sentences = matched[0]
+            elif matched:
+                sentences = set().union(*matched)
+            else:
+                continue
+            for index in sentences:
+                counts[index] += 1
+        return counts
+
+
+@lru_cache(maxsize=2048)
+def sentence_index(text: str) -> SentenceIndex:
+    """Sentence index for text that was not indexed at ingest."""
+    return SentenceIndex(text)
@@ -0,0 +1,61 @@
+"""
+Timestamp normalization shared by ingestion, the vector store and reranking.
+
+Ingestion records when content was created or fetched as ISO strings that may
+be naive (local time) or timezone-aware. Chunks also carry the same instant as
+epoch seconds under ``TIMESTAMP_FIELD`` so ranking and filtering compare plain
+floats instead of parsing datetimes per query.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+TIMESTAMP_FIELD = "timestamp_epoch"
+
+# Metadata fields that describe the content's age, in priority order
+SOURCE_FIELDS = ("created_at", "fetched_at")
+
+
+def to_epoch_seconds(value: Any) -> Optional[float]:
+    """Convert an ISO string, datetime, date or number to epoch seconds.
+
+    Naive values are interpreted as local time, matching ``datetime.now()``
+    which the ingestors use. Returns None for anything unparseable.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    return None
+
+
+def document_timestamp(metadata: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Epoch seconds for a chunk, from the normalized field or its source fields."""
+    if not metadata:
+        return None
+
+    normalized = metadata.get(TIMESTAMP_FIELD)
+    if normalized is not None:
+        return to_epoch_seconds(normalized)
+
+    value = next((metadata[field] for field in SOURCE_FIELDS if metadata.get(field)), None)
+    return to_epoch_seconds(value)
+
+
+def normalize_timestamp(metadata: Dict[str, Any]) -> Optional[float]:
+    """Store the chunk's epoch seconds under ``TIMESTAMP_FIELD`` (when known) and return it."""
+    timestamp = document_timestamp(metadata)
+    if timestamp is not None:
+        metadata[TIMESTAMP_FIELD] = timestamp
+    return timestamp
@@ -0,0 +1,400 @@
+"""
+Lightweight tracing for the canonical query path.
+
+A ``Tracer`` opens a root span per query; pipeline stages and the code they
+call open child spans with the module-level ``span`` helper, which is a no-op
+unless a trace is active in the current context. Spans use monotonic timings.
+When a root span ends, every span in its tree feeds the tracer's per-stage
+latency histograms and the finished trace goes to the tracer's sinks: an
+in-memory ring buffer, a JSONL file or an OTLP/HTTP exporter.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .metrics import Counter, Histogram, LatencyHistogram, Summary
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("portfolio_agent_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent: Optional["Span"] = field(default=None, repr=False)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.monotonic)
+    start_unix_nano: int = field(default_factory=time.time_ns)
+    end: Optional[float] = None
+    status: str = "ok"
+    children: List["Span"] = field(default_factory=list, repr=False)
+    tracer: Optional["Tracer"] = field(default=None, repr=False)
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.parent.span_id if self.parent is not None else None
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (to now while the span is open)."""
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    @property
+    def path(self) -> str:
+        """Dotted names from below the root down to this span, e.g. ``retriever.search``."""
+        names = []
+        span: Optional[Span] = self
+        while span is not None and span.parent is not None:
+            names.append(span.name)
+            span = span.parent
+        return ".".join(reversed(names)) or self.name
+
+    def walk(self) -> Iterator["Span"]:
+        """This span and all of its descendants, depth first."""
+        yield self
+        for child in list(self.children):
+            yield from child.walk()
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """The span tree as nested dicts with millisecond offsets from ``origin``."""
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start_ms": (self.start - origin) * 1000,
+            "duration_ms": self.duration * 1000,
+            "status": self.status,
+            "attributes": dict(self.attributes),
+            "children": [child.to_dict(origin) for child in list(self.children)],
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """Flat representation of this span alone, as written by ``JSONLSink``."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "path": self.path,
+            "start_unix_nano": self.start_unix_nano,
+            "duration_ms": self.duration * 1000,
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+
+class RingBufferSink:
+    """Keeps the most recent finished spans in memory."""
+
+    def __init__(self, capacity: int = 1024):
+        self._spans: Deque[Span] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def traces(self) -> List[Span]:
+        """Root spans still (at least partly) held in the buffer."""
+        return [span for span in self.spans() if span.parent is None]
+
+
+class JSONLSink:
+    """Appends one JSON record per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_record(), default=str) + "\n" for span in spans)
+        with self._lock, self.path.open("a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span], service_name: str = "portfolio-agent") -> Dict[str, Any]:
+    """Encode spans as an OTLP/HTTP JSON ``ExportTraceServiceRequest``."""
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.path,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_unix_nano),
+            "endTimeUnixNano": str(span.start_unix_nano + int(span.duration * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id is not None:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "portfolio_agent"}, "spans": encoded}],
+        }]
+    }
+
+
+class OTLPSink:
+    """Exports spans to an OTLP/HTTP collector (``/v1/traces``) in the background.
+
+    Spans are queued and posted in batches by a daemon thread so queries never
+    wait on the collector; when the queue is full new spans are dropped.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        service_name: str = "portfolio-agent",
+        timeout: float = 5.0,
+        max_queue: int = 2048,
+        batch_size: int = 256,
+        session: Any = None,
+    ):
+        """Initialize the exporter.
+
+        Args:
+            endpoint: Collector traces URL, e.g. ``http://localhost:4318/v1/traces``
+            headers: Extra HTTP headers, e.g. for authentication
+            service_name: ``service.name`` resource attribute
+            timeout: Seconds per export request
+            max_queue: Spans buffered before new ones are dropped
+            batch_size: Maximum spans per export request
+            session: Object with a ``requests``-style ``post``; defaults to a
+                ``requests.Session``
+        """
+        if session is None:
+            import requests
+
+            session = requests.Session()
+        self.endpoint = endpoint
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.service_name = service_name
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.session = session
+        self.dropped = 0
+        self.exported = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._worker = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._worker.start()
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every queued span has been sent (or the timeout passes)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(0.01)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.session.post(
+                    self.endpoint,
+                    data=json.dumps(to_otlp(batch, self.service_name)),
+                    headers=self.headers,
+                    timeout=self.timeout,
+                )
+                self.exported += len(batch)
+            except Exception as e:
+                logger.warning(f"OTLP export of {len(batch)} spans failed: {e}")
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class Tracer:
+    """Creates root spans, aggregates stage latencies and exports finished traces."""
+
+    def __init__(self, sinks: Optional[List[Any]] = None, enabled: bool = True):
+        """Initialize the tracer.
+
+        Args:
+            sinks: Objects with an ``export(spans)`` method receiving each
+                finished trace's spans
+            enabled: Trace every query; when False only forced traces
+                (``trace=True`` queries) are recorded
+        """
+        self.sinks = list(sinks or [])
+        self.enabled = enabled
+        self.stage_latency = Histogram(
+            "portfolio_agent_stage_duration_seconds", "Pipeline stage latency by span path", ("stage",)
+        )
+        self.stage_errors = Counter(
+            "portfolio_agent_stage_errors_total", "Pipeline stage spans that ended in error", ("stage",)
+        )
+        self.stage_quantiles = Summary(
+            "portfolio_agent_stage_latency_seconds", "Pipeline stage latency quantiles by span path", ("stage",)
+        )
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Open a root span; yields None when tracing is off and not forced."""
+        if not (self.enabled or force):
+            yield None
+            return
+        root = Span(name=name, trace_id=os.urandom(16).hex(), span_id=os.urandom(8).hex(),
+                    attributes=attributes, tracer=self)
+        try:
+            with _activate(root):
+                yield root
+        finally:
+            self._finish(root)
+
+    def histogram(self, path: str) -> LatencyHistogram:
+        return self.stage_latency.labels(path)
+
+    def get_stats(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Latency quantiles and error count per span path (the root under its own name).
+
+        Args:
+            reset: Clear the quantile sketches after reading them, for
+                periodic export of per-interval quantiles
+        """
+        errors = {key[0]: counter.value for key, counter in self.stage_errors.children()}
+        return {
+            path: {**snapshot, "errors": int(errors.get(path, 0))}
+            for path, snapshot in self.stage_quantiles.snapshot(reset).items()
+        }
+
+    def _finish(self, root: Span) -> None:
+        spans = list(root.walk())
+        for span in spans:
+            if span.end is not None:
+                self.histogram(span.path).observe(span.duration)
+                self.stage_quantiles.labels(span.path).observe(span.duration)
+            if span.status == "error":
+                self.stage_errors.labels(span.path).inc()
+        for sink in self.sinks:
+            try:
+                sink.export(spans)
+            except Exception as e:
+                logger.error(f"Span sink {type(sink).__name__} failed: {e}")
+
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes.setdefault("error", str(e))
+        raise
+    finally:
+        span.end = time.monotonic()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a child of the current span; a no-op (yielding None) outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name=name, trace_id=parent.trace_id, span_id=os.urandom(8).hex(),
+                 parent=parent, attributes=attributes, tracer=parent.tracer)
+    parent.children.append(child)
+    with _activate(child):
+        yield child
+
+
+def mark_error(message: str) -> None:
+    """Mark the current span, if any, as failed without raising."""
+    current = _current_span.get()
+    if current is not None:
+        current.status = "error"
+        current.attributes.setdefault("error", message)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def create_tracer(
+    sink: str = "memory",
+    enabled: bool = True,
+    jsonl_path: Optional[str] = None,
+    otlp_endpoint: Optional[str] = None,
+    buffer_size: int = 1024,
+) -> Tracer:
+    """Create a tracer with one of the built-in sinks.
+
+    Args:
+        sink: ``memory``, ``jsonl``, ``otlp`` or ``none``
+        enabled: See ``Tracer``
+        jsonl_path: File for the ``jsonl`` sink
+        otlp_endpoint: Collector traces URL for the ``otlp`` sink
+        buffer_size: Spans kept by the ``memory`` sink
+
+    Returns:
+        Configured Tracer
+    """
+    if sink == "memory":
+        sinks = [RingBufferSink(buffer_size)]
+    elif sink == "jsonl":
+        if not jsonl_path:
+            raise ValueError("The jsonl trace sink requires a file path")
+        sinks = [JSONLSink(jsonl_path)]
+    elif sink == "otlp":
+        if not otlp_endpoint:
+            raise ValueError("The otlp trace sink requires an endpoint")
+        sinks = [OTLPSink(otlp_endpoint)]
+    elif sink == "none":
+        sinks = []
+    else:
+        raise ValueError(f"Unknown trace sink: {sink}")
+    return Tracer(sinks=sinks, enabled=enabled)
@@ -2,14 +2,18 @@
 Vector Stores Module
 
 This module exposes the supported local FAISS vector store used by the
-canonical PortfolioAgent SDK path.
+canonical PortfolioAgent SDK path, along with its BM25 lexical index.
 """
 
 from .faiss_store import FAISSVectorStore, VectorDocument, SearchResult, create_faiss_store
+from .bm25_index import BM25Index
+from .mmr import mmr_select
 
 __all__ = [
     'FAISSVectorStore',
     'VectorDocument', 
     'SearchResult',
-    'create_faiss_store'
+    'create_faiss_store',
+    'BM25Index',
+    'mmr_select'
 ]
@@ -0,0 +1,207 @@
+"""
+BM25 Lexical Index
+
+This module provides an incremental BM25 inverted index that shares row ids
+with the FAISS vector store so lexical and dense rankings can be fused.
+Postings are stored delta + varint encoded to keep the persisted index small.
+"""
+
+import math
+import logging
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..text_matching import extract_terms
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    """Append an unsigned LEB128 varint to ``out``."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varints(buffer: bytes) -> np.ndarray:
+    """Decode a buffer of concatenated varints into an array of integers."""
+    data = np.frombuffer(bytes(buffer), dtype=np.uint8)
+    if data.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    group_sizes = ends - starts + 1
+    offsets = np.arange(data.size) - np.repeat(starts, group_sizes)
+    payload = (data & 0x7F).astype(np.int64) << (offsets * 7)
+    return np.add.reduceat(payload, starts)
+
+
+class BM25Index:
+    """Incremental BM25 index keyed by vector store row ids."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """Initialize BM25 index.
+
+        Args:
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self._reset()
+
+    def _reset(self) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        self._postings: List[bytearray] = []  # term_id -> varint (row delta, tf) pairs
+        self._last_row: List[int] = []  # term_id -> last row appended (delta base)
+        self._doc_freq: List[int] = []  # term_id -> number of live rows containing the term
+        self._doc_lengths = array("I")  # row -> term count (0 for deleted rows)
+        self._live = bytearray()  # row -> 1 if live, 0 if deleted
+        self._live_count = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows ever added, including deleted rows."""
+        return len(self._live)
+
+    def add(self, row: int, text: str) -> None:
+        """Index a document at the given row.
+
+        Rows must be added in increasing order, matching how the vector store
+        appends vectors to its FAISS index.
+        """
+        if row < len(self._live):
+            raise ValueError(f"Row {row} has already been indexed")
+
+        # Rows skipped by the vector store (e.g. wrong vector dimension) stay empty.
+        while len(self._live) < row:
+            self._doc_lengths.append(0)
+            self._live.append(0)
+
+        terms = extract_terms(text)
+        frequencies: Dict[str, int] = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        for term, frequency in frequencies.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = len(self._postings)
+                self.vocabulary[term] = term_id
+                self._postings.append(bytearray())
+                self._last_row.append(0)
+                self._doc_freq.append(0)
+
+            _encode_varint(row - self._last_row[term_id], self._postings[term_id])
+            _encode_varint(frequency, self._postings[term_id])
+            self._last_row[term_id] = row
+            self._doc_freq[term_id] += 1
+
+        self._doc_lengths.append(len(terms))
+        self._live.append(1)
+        self._live_count += 1
+        self._total_length += len(terms)
+
+    def remove(self, row: int, text: str) -> bool:
+        """Mark a row as deleted.
+
+        Postings keep the row until the index is rebuilt; deleted rows are
+        masked out at query time and excluded from the collection statistics.
+        """
+        if row >= len(self._live) or not self._live[row]:
+            return False
+
+        for term in set(extract_terms(text)):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None and self._doc_freq[term_id] > 0:
+                self._doc_freq[term_id] -= 1
+
+        self._total_length -= self._doc_lengths[row]
+        self._doc_lengths[row] = 0
+        self._live[row] = 0
+        self._live_count -= 1
+        return True
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        row_mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Score rows against the query with BM25.
+
+        Args:
+            query: Query text
+            k: Number of rows to return
+            row_mask: Optional boolean array restricting which rows may match
+
+        Returns:
+            List of (row, score) pairs sorted by descending score
+        """
+        if k <= 0 or self._live_count == 0:
+            return []
+
+        term_ids = {self.vocabulary[term] for term in extract_terms(query) if term in self.vocabulary}
+        if not term_ids:
+            return []
+
+        row_count = len(self._live)
+        lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float64)
+        average_length = self._total_length / self._live_count if self._live_count else 1.0
+        length_norm = self.k1 * (1.0 - self.b + self.b * lengths / max(average_length, 1e-9))
+
+        scores = np.zeros(row_count, dtype=np.float64)
+        for term_id in term_ids:
+            doc_freq = self._doc_freq[term_id]
+            if doc_freq <= 0:
+                continue
+            rows, frequencies = self._decode_postings(term_id)
+            idf = math.log(1.0 + (self._live_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            scores[rows] += idf * frequencies * (self.k1 + 1.0) / (frequencies + length_norm[rows])
+
+        live = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        if row_mask is not None:
+            live &= row_mask[:row_count]
+        scores[~live] = 0.0
+
+        candidates = np.flatnonzero(scores > 0.0)
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(row), float(scores[row])) for row in candidates[order]]
+
+    def rebuild(self, texts: List[Optional[str]]) -> None:
+        """Rebuild the index from scratch, one text per row (None for deleted rows)."""
+        self._reset()
+        for row, text in enumerate(texts):
+            if text is not None:
+                self.add(row, text)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get statistics about the lexical index."""
+        return {
+            "live_documents": self._live_count,
+            "rows": len(self._live),
+            "vocabulary_size": len(self.vocabulary),
+            "postings_bytes": sum(len(postings) for postings in self._postings),
+        }
+
+    def _decode_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        values = _decode_varints(self._postings[term_id])
+        rows = np.cumsum(values[0::2])
+        frequencies = values[1::2].astype(np.float64)
+        return rows, frequencies
@@ -10,6 +10,7 @@ import json
 import pickle
 import logging
 import inspect
+import time
 from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 from dataclasses import dataclass, asdict
@@ -22,7 +23,18 @@ except ImportError:
     FAISS_AVAILABLE = False
     faiss = None
 
+from .. import tracing
 from ..config import settings
+from ..metrics import EMBEDDING_BATCH_SIZE, VECTOR_SEARCH_SECONDS
+from ..text_matching import SentenceIndex, TermPositions
+from ..timestamps import document_timestamp
+from .bm25_index import BM25Index
+from .mmr import mmr_select, unit_rows
+
+_SEARCH_SECONDS = VECTOR_SEARCH_SECONDS.labels("search")
+_SEARCH_BATCH_SECONDS = VECTOR_SEARCH_SECONDS.labels("search_batch")
+_LEXICAL_SEARCH_SECONDS = VECTOR_SEARCH_SECONDS.labels("lexical")
+_QUERY_BATCH_SIZE = EMBEDDING_BATCH_SIZE.labels("query")
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +47,8 @@ class VectorDocument:
     metadata: Dict[str, Any]
     created_at: str
     updated_at: str
+    term_positions: Optional[TermPositions] = None  # built at ingest for phrase/order scoring
+    sentences: Optional[SentenceIndex] = None  # built at ingest for evidence snippets
 
 @dataclass
 class SearchResult:
@@ -51,7 +65,8 @@ class FAISSVectorStore:
         index_path: Optional[str] = None,
         dimension: int = 384,
         index_type: str = "flat",
-        metric: str = "cosine"
+        metric: str = "cosine",
+        lexical_index: bool = True
     ):
         """Initialize FAISS vector store.
         
@@ -60,6 +75,7 @@ class FAISSVectorStore:
             dimension: Dimension of the vectors
             index_type: Type of FAISS index ('flat', 'ivf', 'hnsw')
             metric: Distance metric ('cosine', 'l2', 'ip')
+            lexical_index: Whether to maintain a BM25 index alongside the vectors
         """
         if not FAISS_AVAILABLE:
             raise ImportError(
@@ -75,6 +91,11 @@ class FAISSVectorStore:
         self.index = self._create_index()
         self.documents: Dict[str, VectorDocument] = {}
         self.metadata_index: Dict[str, List[str]] = {}  # metadata_value -> document_ids
+        self.row_ids: List[Optional[str]] = []  # FAISS row -> document id (None once deleted)
+        self.id_to_row: Dict[str, int] = {}
+        self.lexical_index: Optional[BM25Index] = BM25Index() if lexical_index else None
+        self.generation = 0  # Bumped on every write so callers can key caches on index state
+        self._timestamps = np.empty(0, dtype=np.float64)  # FAISS row -> epoch seconds (NaN if unknown or deleted)
         
         # Load existing index if it exists
         if os.path.exists(self.index_path):
@@ -126,12 +147,21 @@ class FAISSVectorStore:
         
         added_ids = []
         vectors = []
+        timestamps = []
+        # An id repeated within the batch keeps only its last valid occurrence, so
+        # rows are only ever replaced from before this batch
+        last_seen = {
+            doc.id: position for position, doc in enumerate(documents)
+            if len(doc.vector) == self.dimension
+        }
         
-        for doc in documents:
+        for position, doc in enumerate(documents):
             # Validate vector dimension
             if len(doc.vector) != self.dimension:
                 logger.warning(f"Document {doc.id} has wrong dimension: {len(doc.vector)} != {self.dimension}")
                 continue
+            if last_seen[doc.id] != position:
+                continue
             
             # Normalize vector if needed
             vector = np.array(doc.vector, dtype=np.float32)
@@ -140,17 +170,34 @@ class FAISSVectorStore:
                 if norm > 0:
                     vector = vector / norm
             
+            if doc.term_positions is None:
+                doc.term_positions = TermPositions(doc.content)
+            if doc.sentences is None:
+                doc.sentences = SentenceIndex(doc.content)
+            
+            # Re-adding an existing id replaces the previous row
+            if doc.id in self.documents:
+                self._remove_row(self.documents[doc.id])
+            
+            row = len(self.row_ids)
             vectors.append(vector)
             self.documents[doc.id] = doc
+            self.row_ids.append(doc.id)
+            self.id_to_row[doc.id] = row
+            timestamps.append(self._document_timestamp(doc))
             added_ids.append(doc.id)
             
-            # Update metadata index
+            # Update metadata and lexical indexes
             self._update_metadata_index(doc)
+            if self.lexical_index is not None:
+                self.lexical_index.add(row, doc.content)
         
         if vectors:
             # Add vectors to FAISS index
             vectors_array = np.vstack(vectors)
             self.index.add(vectors_array)
+            self._timestamps = np.concatenate([self._timestamps, np.array(timestamps, dtype=np.float64)])
+            self.generation += 1
             
             logger.info(f"Added {len(added_ids)} documents to vector store")
         
@@ -217,7 +264,10 @@ class FAISSVectorStore:
         query_vector: List[float],
         k: int = 5,
         filter_metadata: Optional[Dict[str, Any]] = None,
-        normalize_vector: bool = True
+        normalize_vector: bool = True,
+        time_range: Optional[Tuple[Optional[float], Optional[float]]] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
     ) -> List[SearchResult]:
         """Search for similar documents.
         
@@ -226,12 +276,18 @@ class FAISSVectorStore:
             k: Number of results to return
             filter_metadata: Optional metadata filter
             normalize_vector: Whether to normalize the query vector
+            time_range: Optional (start, end) epoch seconds, inclusive; either
+                bound may be None. Applied inside the FAISS search.
+            mmr_lambda: When set, diversify the top ``k`` with maximal marginal
+                relevance (1.0 = pure relevance, 0.0 = pure diversity)
+            fetch_k: Candidates considered for MMR (default ``max(4 * k, 20)``)
             
         Returns:
             List of search results
         """
         if len(query_vector) != self.dimension:
             raise ValueError(f"Query vector has wrong dimension: {len(query_vector)} != {self.dimension}")
+        started = time.perf_counter()
         
         # Normalize query vector if needed
         query_array = np.array(query_vector, dtype=np.float32).reshape(1, -1)
@@ -240,17 +296,89 @@ class FAISSVectorStore:
             if norm > 0:
                 query_array = query_array / norm
         
-        # Search in FAISS index
-        scores, indices = self.index.search(query_array, min(k * 2, len(self.documents)))
+        # MMR picks k out of a larger candidate pool
+        limit = k if mmr_lambda is None else max(fetch_k or max(4 * k, 20), k)
+        
+        # Search in FAISS index (deleted rows still occupy slots until compaction)
+        deleted_rows = len(self.row_ids) - len(self.documents)
+        if time_range is not None:
+            scores, indices = self._search_rows(query_array, limit * 2, self.time_range_mask(*time_range))
+        else:
+            scores, indices = self.index.search(query_array, min(limit * 2 + deleted_rows, len(self.row_ids)))
+        
+        results = self._collect_results(scores[0], indices[0], limit, filter_metadata)
+        
+        if mmr_lambda is not None and len(results) > 1:
+            results = self._mmr_results(results, k, mmr_lambda)
+        
+        _SEARCH_SECONDS.observe(time.perf_counter() - started)
+        return results
+    
+    def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        normalize_vector: bool = True,
+        time_range: Optional[Tuple[Optional[float], Optional[float]]] = None
+    ) -> List[List[SearchResult]]:
+        """Search for several query vectors with a single FAISS call.
         
-        # Convert to search results
+        Args:
+            query_vectors: Query vectors, one per query
+            k: Number of results to return per query
+            filter_metadata: Optional metadata filter applied to every query
+            normalize_vector: Whether to normalize the query vectors
+            time_range: Optional (start, end) epoch seconds; searched per
+                query, since masked searches are not batched
+            
+        Returns:
+            Search results per query, in input order
+        """
+        if not query_vectors:
+            return []
+        if not self.row_ids:
+            return [[] for _ in query_vectors]
+        if time_range is not None:
+            return [
+                self.search(vector, k, filter_metadata, normalize_vector, time_range=time_range)
+                for vector in query_vectors
+            ]
+        
+        started = time.perf_counter()
+        query_array = np.array(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        if query_array.shape[1] != self.dimension:
+            raise ValueError(f"Query vector has wrong dimension: {query_array.shape[1]} != {self.dimension}")
+        if normalize_vector and self.metric == "cosine":
+            norms = np.linalg.norm(query_array, axis=1, keepdims=True)
+            query_array = query_array / np.where(norms > 0, norms, 1.0)
+        
+        deleted_rows = len(self.row_ids) - len(self.documents)
+        scores, indices = self.index.search(query_array, min(k * 2 + deleted_rows, len(self.row_ids)))
+        results = [
+            self._collect_results(row_scores, row_indices, k, filter_metadata)
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+        _SEARCH_BATCH_SECONDS.observe(time.perf_counter() - started)
+        return results
+    
+    def _collect_results(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        limit: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> List[SearchResult]:
+        """Turn one row of FAISS output into ranked, filtered search results."""
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
+        for score, idx in zip(scores, indices):
             if idx == -1:  # FAISS returns -1 for empty slots
                 continue
             
             # Get document ID from index
-            doc_id = list(self.documents.keys())[idx]
+            doc_id = self.row_ids[idx]
+            if doc_id is None:
+                continue
             document = self.documents[doc_id]
             
             # Apply metadata filter if provided
@@ -265,14 +393,13 @@ class FAISSVectorStore:
                 # For L2 distance, lower is better
                 final_score = 1.0 / (1.0 + float(score))
             
-            result = SearchResult(
+            results.append(SearchResult(
                 document=document,
                 score=final_score,
                 rank=len(results) + 1
-            )
-            results.append(result)
+            ))
             
-            if len(results) >= k:
+            if len(results) >= limit:
                 break
         
         return results
@@ -282,7 +409,9 @@ class FAISSVectorStore:
         text: str,
         embedder,
         k: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        time_range: Optional[Tuple[Optional[float], Optional[float]]] = None,
+        mmr_lambda: Optional[float] = None
     ) -> List[SearchResult]:
         """Search using text query (requires embedder).
         
@@ -291,25 +420,151 @@ class FAISSVectorStore:
             embedder: Embedding model to convert text to vector
             k: Number of results to return
             filter_metadata: Optional metadata filter
+            time_range: Optional (start, end) epoch seconds, inclusive
+            mmr_lambda: Optional MMR trade-off, see ``search``
             
         Returns:
             List of search results
         """
-        # Get embedding for the text
-        if hasattr(embedder, 'embed_single_sync'):
-            query_vector = embedder.embed_single_sync(text)
-        elif hasattr(embedder, 'embed_single'):
-            query_vector = embedder.embed_single(text)
-            if inspect.isawaitable(query_vector):
-                raise RuntimeError(
-                    "The configured embedder only exposes an async query API. "
-                    "Use an embedder with embed_single_sync for the supported runtime."
-                )
-        else:
+        query_vector = self.embed_query(text, embedder)
+        return self.search(query_vector, k, filter_metadata, time_range=time_range, mmr_lambda=mmr_lambda)
+
+    def embed_query(self, text: str, embedder) -> List[float]:
+        """Embed query text with the configured embedder.
+        
+        Args:
+            text: Query text
+            embedder: Embedding model to convert text to vector
+            
+        Returns:
+            Query vector
+        """
+        _QUERY_BATCH_SIZE.observe(1)
+        with tracing.span("embed"):
+            if hasattr(embedder, 'embed_single_sync'):
+                return embedder.embed_single_sync(text)
+            if hasattr(embedder, 'embed_single'):
+                query_vector = embedder.embed_single(text)
+                if inspect.isawaitable(query_vector):
+                    raise RuntimeError(
+                        "The configured embedder only exposes an async query API. "
+                        "Use an embedder with embed_single_sync for the supported runtime."
+                    )
+                return query_vector
             # Assume it's a function
-            query_vector = embedder(text)
+            return embedder(text)
+
+    def search_lexical(
+        self,
+        text: str,
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        time_range: Optional[Tuple[Optional[float], Optional[float]]] = None
+    ) -> List[SearchResult]:
+        """Search the BM25 lexical index.
+        
+        Args:
+            text: Query text
+            k: Number of results to return
+            filter_metadata: Optional metadata filter
+            time_range: Optional (start, end) epoch seconds, inclusive
+            
+        Returns:
+            List of search results scored by BM25
+        """
+        if self.lexical_index is None or not self.documents:
+            return []
+        started = time.perf_counter()
+        
+        row_mask = None
+        if filter_metadata:
+            row_mask = np.zeros(len(self.row_ids), dtype=bool)
+            for doc_id, row in self.id_to_row.items():
+                row_mask[row] = self._matches_filter(self.documents[doc_id], filter_metadata)
+        if time_range is not None:
+            time_mask = self.time_range_mask(*time_range)
+            row_mask = time_mask if row_mask is None else row_mask & time_mask
+        
+        results = []
+        for row, score in self.lexical_index.search(text, k=k, row_mask=row_mask):
+            doc_id = self.row_ids[row]
+            if doc_id is None:
+                continue
+            results.append(SearchResult(
+                document=self.documents[doc_id],
+                score=score,
+                rank=len(results) + 1
+            ))
+        _LEXICAL_SEARCH_SECONDS.observe(time.perf_counter() - started)
+        return results
+
+    def score_documents(
+        self,
+        query_vector: List[float],
+        doc_ids: List[str],
+        normalize_vector: bool = True
+    ) -> List[float]:
+        """Compute similarity scores between a query vector and stored documents.
+        
+        Scores use the same scale as ``search`` so they can be compared with
+        dense search results.
+        
+        Args:
+            query_vector: Query vector
+            doc_ids: IDs of the documents to score
+            normalize_vector: Whether to normalize the query vector
+            
+        Returns:
+            List of scores aligned with ``doc_ids`` (0.0 for unknown ids)
+        """
+        rows = [self.id_to_row.get(doc_id) for doc_id in doc_ids]
+        known = [i for i, row in enumerate(rows) if row is not None]
+        scores = [0.0] * len(doc_ids)
+        if not known:
+            return scores
+        
+        query_array = np.asarray(query_vector, dtype=np.float32)
+        if normalize_vector and self.metric == "cosine":
+            norm = np.linalg.norm(query_array)
+            if norm > 0:
+                query_array = query_array / norm
+        
+        vectors = self._row_vectors([rows[i] for i in known])
+        if self.metric == "l2":
+            values = 1.0 / (1.0 + np.sum((vectors - query_array) ** 2, axis=1))
+        else:
+            values = vectors @ query_array
+        for i, value in zip(known, values):
+            scores[i] = float(value)
+        return scores
+
+    def document_vectors(self, doc_ids: List[str]) -> np.ndarray:
+        """Return unit-length stored vectors aligned with ``doc_ids``.
+        
+        Unknown ids get a zero row, so they look unrelated to everything.
         
-        return self.search(query_vector, k, filter_metadata)
+        Args:
+            doc_ids: IDs of the documents
+            
+        Returns:
+            Array of shape (len(doc_ids), dimension)
+        """
+        vectors = np.zeros((len(doc_ids), self.dimension), dtype=np.float32)
+        rows = [self.id_to_row.get(doc_id) for doc_id in doc_ids]
+        known = [i for i, row in enumerate(rows) if row is not None]
+        if known:
+            vectors[known] = self._row_vectors([rows[i] for i in known])
+        return unit_rows(vectors)
+
+    def _mmr_results(self, results: List[SearchResult], k: int, mmr_lambda: float) -> List[SearchResult]:
+        """Re-select ``k`` of the candidate results with maximal marginal relevance."""
+        vectors = unit_rows(self._row_vectors([self.id_to_row[r.document.id] for r in results]))
+        relevance = np.fromiter((r.score for r in results), dtype=np.float64, count=len(results))
+        order = mmr_select(relevance, vectors, k, mmr_lambda)
+        return [
+            SearchResult(document=results[i].document, score=results[i].score, rank=rank)
+            for rank, i in enumerate(order, start=1)
+        ]
 
     def is_initialized(self) -> bool:
         """Return whether the vector store is ready for reads/writes."""
@@ -326,6 +581,40 @@ class FAISSVectorStore:
         """
         return self.documents.get(doc_id)
     
+    def term_positions(self, doc_id: str, content: Optional[str] = None) -> Optional[TermPositions]:
+        """Positional postings built at ingest for a stored document.
+        
+        Args:
+            doc_id: Document ID
+            content: Content the caller holds; postings are only returned
+                while the stored document still has this content
+            
+        Returns:
+            The document's TermPositions, or None if unknown or changed
+        """
+        document = self._current_document(doc_id, content)
+        return document.term_positions if document is not None else None
+    
+    def sentence_index(self, doc_id: str, content: Optional[str] = None) -> Optional[SentenceIndex]:
+        """Sentence index built at ingest for a stored document.
+        
+        Args:
+            doc_id: Document ID
+            content: Content the caller holds; the index is only returned
+                while the stored document still has this content
+            
+        Returns:
+            The document's SentenceIndex, or None if unknown or changed
+        """
+        document = self._current_document(doc_id, content)
+        return document.sentences if document is not None else None
+    
+    def _current_document(self, doc_id: str, content: Optional[str]) -> Optional[VectorDocument]:
+        document = self.documents.get(doc_id)
+        if document is None or (content is not None and document.content != content):
+            return None
+        return document
+    
     def delete_document(self, doc_id: str) -> bool:
         """Delete a document from the store.
         
@@ -341,14 +630,38 @@ class FAISSVectorStore:
         # Remove from documents
         document = self.documents.pop(doc_id)
         
-        # Remove from metadata index
-        self._remove_from_metadata_index(document)
-        
-        # Note: FAISS doesn't support deletion, so we need to rebuild the index
-        # For now, we'll just mark it as deleted in our documents dict
-        logger.warning("FAISS doesn't support deletion. Consider rebuilding the index.")
+        # FAISS doesn't support deletion, so the row becomes a tombstone that
+        # search skips until the index is compacted.
+        self._remove_row(document)
+        self.generation += 1
         
         return True
+
+    def compact(self) -> int:
+        """Rebuild the FAISS and lexical indexes without deleted rows.
+        
+        Returns:
+            Number of deleted rows that were dropped
+        """
+        dropped = len(self.row_ids) - len(self.documents)
+        if dropped == 0:
+            return 0
+        
+        live_ids = [doc_id for doc_id in self.row_ids if doc_id is not None]
+        vectors = self._row_vectors([self.id_to_row[doc_id] for doc_id in live_ids])
+        
+        self.index = self._create_index()
+        if len(live_ids):
+            self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        self.row_ids = list(live_ids)
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(live_ids)}
+        self._rebuild_timestamps()
+        if self.lexical_index is not None:
+            self.lexical_index.rebuild([self.documents[doc_id].content for doc_id in live_ids])
+        self.generation += 1
+        
+        logger.info(f"Compacted vector store, dropped {dropped} deleted rows")
+        return dropped
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store.
@@ -356,13 +669,18 @@ class FAISSVectorStore:
         Returns:
             Dictionary with statistics
         """
-        return {
+        stats = {
             'total_documents': len(self.documents),
             'index_type': self.index_type,
             'dimension': self.dimension,
             'metric': self.metric,
-            'index_size': self.index.ntotal if hasattr(self.index, 'ntotal') else len(self.documents)
+            'index_size': self.index.ntotal if hasattr(self.index, 'ntotal') else len(self.documents),
+            'deleted_rows': len(self.row_ids) - len(self.documents),
+            'generation': self.generation
         }
+        if self.lexical_index is not None:
+            stats['lexical_index'] = self.lexical_index.get_stats()
+        return stats
     
     def save(self, path: Optional[str] = None):
         """Save the vector store to disk.
@@ -385,6 +703,8 @@ class FAISSVectorStore:
             pickle.dump({
                 'documents': self.documents,
                 'metadata_index': self.metadata_index,
+                'row_ids': self.row_ids,
+                'lexical_index': self.lexical_index,
                 'dimension': self.dimension,
                 'index_type': self.index_type,
                 'metric': self.metric
@@ -417,6 +737,9 @@ class FAISSVectorStore:
                 data = pickle.load(f)
                 loaded_documents = data['documents']
                 loaded_metadata_index = data.get('metadata_index', {})
+                # Indexes saved before row ids were persisted map rows in insertion order
+                loaded_row_ids = data.get('row_ids') or list(loaded_documents.keys())
+                loaded_lexical_index = data.get('lexical_index')
                 stored_dimension = data.get('dimension', self.dimension)
                 stored_index_type = data.get('index_type', self.index_type)
                 stored_metric = data.get('metric', self.metric)
@@ -436,19 +759,38 @@ class FAISSVectorStore:
                     "Use a different FAISS_INDEX_PATH or remove the old index files."
                 )
 
-            if hasattr(loaded_index, 'ntotal') and loaded_index.ntotal != len(loaded_documents):
+            if hasattr(loaded_index, 'ntotal') and loaded_index.ntotal != len(loaded_row_ids):
                 raise ValueError(
                     "Stored FAISS index and document metadata are out of sync. "
-                    f"Index contains {loaded_index.ntotal} vectors but metadata has {len(loaded_documents)} documents. "
+                    f"Index contains {loaded_index.ntotal} vectors but metadata has {len(loaded_row_ids)} rows. "
                     "Use a different FAISS_INDEX_PATH or remove the old index files."
                 )
 
+            # Indexes saved before positional postings or sentence indexes existed get them on load
+            for document in loaded_documents.values():
+                if getattr(document, "term_positions", None) is None:
+                    document.term_positions = TermPositions(document.content)
+                if getattr(document, "sentences", None) is None:
+                    document.sentences = SentenceIndex(document.content)
+            
             self.index = loaded_index
             self.documents = loaded_documents
             self.metadata_index = loaded_metadata_index
+            self.row_ids = loaded_row_ids
+            self.id_to_row = {doc_id: row for row, doc_id in enumerate(loaded_row_ids) if doc_id is not None}
+            self._rebuild_timestamps()
+            if self.lexical_index is not None:
+                if loaded_lexical_index is None:
+                    loaded_lexical_index = BM25Index(k1=self.lexical_index.k1, b=self.lexical_index.b)
+                    loaded_lexical_index.rebuild([
+                        self.documents[doc_id].content if doc_id is not None else None
+                        for doc_id in loaded_row_ids
+                    ])
+                self.lexical_index = loaded_lexical_index
             self.dimension = stored_dimension
             self.index_type = stored_index_type
             self.metric = stored_metric
+            self.generation += 1
             
             logger.info(f"Loaded vector store from {load_path} with {len(self.documents)} documents")
             
@@ -456,6 +798,84 @@ class FAISSVectorStore:
             logger.error(f"Failed to load vector store: {e}")
             raise
     
+    @property
+    def row_timestamps(self) -> np.ndarray:
+        """Epoch seconds per FAISS row (NaN for unknown or deleted rows); read-only view."""
+        timestamps = self._timestamps.view()
+        timestamps.flags.writeable = False
+        return timestamps
+
+    def time_range_mask(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Boolean mask over FAISS rows whose timestamp lies in [start, end].
+        
+        Rows without a timestamp never match a time range.
+        """
+        timestamps = self.row_timestamps
+        mask = ~np.isnan(timestamps)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        return mask
+
+    def _search_rows(self, query_array: np.ndarray, n: int, row_mask: np.ndarray):
+        """Search only the rows allowed by ``row_mask`` using a FAISS ID selector."""
+        allowed = np.flatnonzero(row_mask).astype(np.int64)
+        n = min(n, allowed.size)
+        if n == 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        
+        selector = faiss.IDSelectorBatch(allowed)
+        if isinstance(self.index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(sel=selector)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        try:
+            return self.index.search(query_array, n, params=params)
+        except (RuntimeError, TypeError) as e:
+            # Index types without selector support: search everything and mask afterwards
+            logger.debug(f"FAISS ID selector unsupported for {type(self.index).__name__}: {e}")
+            scores, indices = self.index.search(query_array, len(self.row_ids))
+            keep = (indices[0] >= 0) & row_mask[np.clip(indices[0], 0, None)]
+            return scores[:, keep][:, :n], indices[:, keep][:, :n]
+
+    def _document_timestamp(self, document: VectorDocument) -> float:
+        timestamp = document_timestamp(document.metadata)
+        return float("nan") if timestamp is None else timestamp
+
+    def _rebuild_timestamps(self):
+        self._timestamps = np.array([
+            self._document_timestamp(self.documents[doc_id]) if doc_id is not None else np.nan
+            for doc_id in self.row_ids
+        ], dtype=np.float64)
+
+    def _remove_row(self, document: VectorDocument):
+        """Tombstone a document's FAISS row and drop it from secondary indexes."""
+        row = self.id_to_row.pop(document.id, None)
+        if row is not None:
+            self.row_ids[row] = None
+            self._timestamps[row] = np.nan
+            if self.lexical_index is not None:
+                self.lexical_index.remove(row, document.content)
+        self._remove_from_metadata_index(document)
+
+    def _row_vectors(self, rows: List[int]) -> np.ndarray:
+        """Return the indexed (normalized) vectors for the given rows."""
+        if not rows:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        try:
+            return self.index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+        except Exception:
+            # Some index types don't support reconstruction; fall back to the stored vectors.
+            vectors = np.asarray(
+                [self.documents[self.row_ids[row]].vector for row in rows],
+                dtype=np.float32
+            )
+            if self.metric == "cosine":
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors = vectors / np.where(norms > 0, norms, 1.0)
+            return vectors
+
     def _update_metadata_index(self, document: VectorDocument):
         """Update the metadata index for a document."""
         for key, value in document.metadata.items():
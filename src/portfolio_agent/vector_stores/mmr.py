@@ -0,0 +1,64 @@
+"""
+Maximal Marginal Relevance
+
+This module provides greedy MMR selection over candidate vectors, used to keep
+overlapping chunks from crowding out other sources in the top-k.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """Greedily pick ``k`` candidates trading relevance against redundancy.
+
+    Each step picks the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max_similarity_to_selected``.
+    Pairwise similarities come from one matrix multiply of the unit-normalized
+    candidate vectors.
+
+    Args:
+        relevance: Relevance score per candidate
+        vectors: Candidate vectors, one row per candidate
+        k: Number of candidates to select
+        lambda_mult: 1.0 is pure relevance, 0.0 is pure diversity
+
+    Returns:
+        Selected candidate indices in selection order
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    count = relevance.shape[0]
+    k = min(k, count)
+    if k <= 0:
+        return []
+
+    unit = unit_rows(vectors)
+    similarity = (unit @ unit.T).astype(np.float64)
+
+    selected: List[int] = []
+    available = np.ones(count, dtype=bool)
+    max_similarity = np.zeros(count, dtype=np.float64)
+    for _ in range(k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        choice = int(np.argmax(scores))
+        selected.append(choice)
+        available[choice] = False
+        if len(selected) == 1:
+            max_similarity = similarity[choice].copy()
+        else:
+            np.maximum(max_similarity, similarity[choice], out=max_similarity)
+    return selected
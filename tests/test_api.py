@@ -6,6 +6,8 @@ instead of failing during collection. CI still verifies FastAPI explicitly in
 the runtime import check before running pytest.
 """
 
+import json
+
 import pytest
 from unittest.mock import Mock
 
@@ -35,7 +37,7 @@ class FakeEmbedder:
 def build_client(tmp_path):
     vector_store = FAISSVectorStore(index_path=str(tmp_path / "api_index"), dimension=4)
     agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
-    app = create_app(agent=agent)
+    app = create_app(agent=agent, metrics_enabled=True)
     return TestClient(app)
 
 
@@ -75,6 +77,118 @@ def test_documents_and_query_round_trip(tmp_path):
     assert "Python" in payload["response"] or "FastAPI" in payload["response"]
 
 
+def test_query_stream_sends_server_sent_events(tmp_path):
+    with build_client(tmp_path) as client:
+        client.post(
+            "/api/v1/documents",
+            json={
+                "content": "Jane builds Python APIs with FastAPI and retrieval systems.",
+                "document_type": "txt",
+                "source": "inline.txt",
+            },
+        )
+        response = client.post(
+            "/api/v1/query/stream",
+            json={"query": "What Python and FastAPI work is indexed?", "session_id": "sse-test"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+
+    assert [name for name, _ in events][:2] == ["routing", "sources"]
+    name, payload = events[-1]
+    assert name == "done"
+    assert payload["session_id"] == "sse-test"
+    assert payload["sources"]
+    assert "".join(data["text"] for name, data in events if name == "token") == payload["response"]
+
+
+def test_query_batch_returns_results_in_request_order(tmp_path):
+    with build_client(tmp_path) as client:
+        client.post(
+            "/api/v1/documents",
+            json={"content": "Jane builds Python APIs with FastAPI.", "document_type": "txt", "source": "python.txt"},
+        )
+        client.post(
+            "/api/v1/documents",
+            json={"content": "Jane designs retrieval systems.", "document_type": "txt", "source": "retrieval.txt"},
+        )
+        response = client.post(
+            "/api/v1/query/batch",
+            json={
+                "queries": [
+                    {"query": "What Python and FastAPI work is indexed?", "session_id": "batch-a"},
+                    {"query": "What retrieval work is indexed?", "session_id": "batch-b", "max_results": 1},
+                ]
+            },
+        )
+        empty = client.post("/api/v1/query/batch", json={"queries": []})
+        limit = client.app.state.admission.limiters["query"].limits.max_concurrency
+        oversized = client.post(
+            "/api/v1/query/batch",
+            json={"queries": [{"query": "What Python work is indexed?"}] * (limit + 1)},
+        )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["index"] for item in results] == [0, 1]
+    assert all(item["error"] is None for item in results)
+    assert [item["response"]["session_id"] for item in results] == ["batch-a", "batch-b"]
+    assert results[0]["response"]["sources"][0]["source"] == "python.txt"
+    assert results[1]["response"]["sources"][0]["source"] == "retrieval.txt"
+    assert empty.status_code == 422
+    assert oversized.status_code == 422
+    assert "concurrency limit" in oversized.json()["detail"]
+
+
+def test_metrics_endpoint_exposes_runtime_series(tmp_path):
+    with build_client(tmp_path) as client:
+        client.post(
+            "/api/v1/documents",
+            json={"content": "Jane builds Python APIs with FastAPI.", "document_type": "txt", "source": "python.txt"},
+        )
+        client.post("/api/v1/query", json={"query": "What Python work is indexed?", "session_id": "metrics"})
+        client.get("/api/v1/no-such-endpoint")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE portfolio_agent_http_requests_total counter" in lines
+    assert any(
+        line.startswith('portfolio_agent_http_requests_total{method="POST",route="/api/v1/query",status="200"}')
+        for line in lines
+    )
+    assert any('route="unmatched",status="404"' in line for line in lines)
+    assert not any("no-such-endpoint" in line for line in lines)
+    assert any(line.startswith('portfolio_agent_stage_duration_seconds_count{stage="router"}') for line in lines)
+    assert any(line.startswith('portfolio_agent_vector_search_duration_seconds_bucket{operation="search"') for line in lines)
+    assert "portfolio_agent_index_documents 1" in lines
+    assert "portfolio_agent_active_sessions 1" in lines
+    assert 'portfolio_agent_cache_misses_total{cache="retrieval"} 1' in lines
+    assert 'portfolio_agent_admission_admitted_total{group="query"} 1' in lines
+    assert 'portfolio_agent_admission_in_flight{group="query"} 0' in lines
+
+
+def test_latency_endpoint_reports_quantiles_per_endpoint_and_stage(tmp_path):
+    with build_client(tmp_path) as client:
+        client.post("/api/v1/query", json={"query": "What Python work is indexed?", "session_id": "latency"})
+        report = client.get("/api/v1/latency", params={"sketches": "true", "reset": "true"}).json()
+        after_reset = client.get("/api/v1/latency").json()
+
+    query = report["endpoints"]["POST /api/v1/query"]
+    assert query["count"] >= 1
+    assert query["p50"] <= query["p90"] <= query["p99"] <= query["p999"] <= query["max"]
+    assert report["stages"]["router"]["count"] == 1
+    assert report["sketches"]["stages"]["router"]["count"] == 1
+    assert after_reset["stages"]["router"]["count"] == 0
+    assert after_reset["endpoints"]["POST /api/v1/query"]["count"] == 0
+
+
 def test_file_upload_and_query_round_trip(tmp_path):
     sample_file = tmp_path / "profile.txt"
     sample_file.write_text("Jane works on backend retrieval systems with Python and FastAPI.")
@@ -98,3 +212,89 @@ def test_file_upload_and_query_round_trip(tmp_path):
     assert query.status_code == 200
     payload = query.json()
     assert payload["sources"]
+
+
+def test_admission_control_sheds_excess_queries(tmp_path):
+    import asyncio
+    import httpx
+    from portfolio_agent.api.admission import AdmissionController, AdmissionLimits
+    from portfolio_agent.rag_pipeline import RAGResponse
+
+    async def slow_query(query, **kwargs):
+        await asyncio.sleep(0.3)
+        return RAGResponse(response="ok", sources=[], session_id=kwargs["session_id"], processing_time=0.3, metadata={})
+
+    agent = Mock()
+    agent.aquery = slow_query
+    admission = AdmissionController(
+        limits={"query": AdmissionLimits(max_concurrency=1, max_queue=1, max_wait=0.1)},
+        prefixes={"/api/v1/query": "query"},
+    )
+    app = create_app(agent=agent, admission=admission)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def post(delay):
+                await asyncio.sleep(delay)
+                return await client.post("/api/v1/query", json={"query": "hello", "session_id": "burst"})
+
+            responses = await asyncio.gather(post(0), post(0.02), post(0.04))
+            health = await client.get("/api/v1/health")
+            stats = (await client.get("/api/v1/admission")).json()
+        return responses, health, stats
+
+    responses, health, stats = asyncio.run(burst())
+
+    assert [response.status_code for response in responses] == [200, 503, 429]
+    assert all(int(response.headers["Retry-After"]) >= 1 for response in responses[1:])
+    assert health.status_code == 200
+    assert stats["query"]["rejected_timeout"] == 1
+    assert stats["query"]["rejected_queue_full"] == 1
+    assert stats["query"]["in_flight"] == 0 and stats["query"]["queue_depth"] == 0
+
+
+def test_admission_hands_released_slots_to_queued_requests():
+    import asyncio
+    from portfolio_agent.api.admission import AdmissionLimiter, AdmissionLimits
+
+    async def run():
+        limiter = AdmissionLimiter("query", AdmissionLimits(max_concurrency=1, max_queue=2, max_wait=1.0))
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.05)
+        assert limiter.queue_depth == 1
+        limiter.release(service_time=0.05)
+        waited = await queued
+        limiter.release(service_time=0.05)
+        return limiter, waited
+
+    limiter, waited = asyncio.run(run())
+
+    stats = limiter.get_stats()
+    assert waited >= 0.04
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2 and stats["admitted_from_queue"] == 1
+
+
+def test_rate_limit_rejects_clients_over_their_limit(tmp_path):
+    from portfolio_agent.api.rate_limit import InMemoryRateLimitStore, RateLimit, RateLimiter
+
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "api_index"), dimension=4)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    limiter = RateLimiter(
+        limits={"query": RateLimit(requests=2, window=60)},
+        prefixes={"/api/v1/query": "query"},
+        store=InMemoryRateLimitStore(),
+    )
+    with TestClient(create_app(agent=agent, rate_limiter=limiter)) as client:
+        statuses = [
+            client.post("/api/v1/query", json={"query": "What Python work is indexed?", "session_id": "rl"})
+            for _ in range(3)
+        ]
+        health = client.get("/api/v1/health")
+
+    assert [response.status_code for response in statuses] == [200, 200, 429]
+    assert int(statuses[-1].headers["Retry-After"]) == 30
+    assert statuses[-1].json()["error"] == "Rate Limit Exceeded"
+    assert health.status_code == 200
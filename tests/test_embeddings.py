@@ -90,3 +90,125 @@ class TestFAISSVectorStore:
             results = store.search_by_text("python", embedder=embedder, k=1)
             assert len(results) == 1
             assert results[0].document.id == "doc1"
+
+    def test_time_range_filters_inside_the_index(self):
+        pytest.importorskip("faiss", reason="FAISS is required for vector store tests")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=2)
+            store.add_texts(
+                texts=["Old Kafka work", "Recent Kafka work", "Undated Kafka work"],
+                vectors=[[1.0, 0.0], [0.9, 0.1], [1.0, 0.0]],
+                metadatas=[
+                    {"created_at": "2020-01-01T00:00:00+00:00"},
+                    {"timestamp_epoch": 1_700_000_000.0},
+                    {},
+                ],
+                ids=["old", "recent", "undated"],
+            )
+
+            assert [r.document.id for r in store.search([1.0, 0.0], k=3, time_range=(1_600_000_000.0, None))] == ["recent"]
+            assert [r.document.id for r in store.search([1.0, 0.0], k=3, time_range=(None, 1_600_000_000.0))] == ["old"]
+            assert [r.document.id for r in store.search_lexical("Kafka", k=3, time_range=(1_600_000_000.0, None))] == ["recent"]
+
+            store.delete_document("recent")
+            assert store.search([1.0, 0.0], k=3, time_range=(1_600_000_000.0, None)) == []
+            store.compact()
+            assert store.row_timestamps[0] == 1577836800.0
+            assert np.isnan(store.row_timestamps[1])
+
+    def test_mmr_search_skips_near_duplicates(self):
+        pytest.importorskip("faiss", reason="FAISS is required for vector store tests")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=2)
+            store.add_texts(
+                texts=["Kafka at Acme", "Kafka at Acme (overlap)", "Kafka side project"],
+                vectors=[[1.0, 0.0], [0.99, 0.01], [0.8, 0.6]],
+                ids=["acme", "acme-overlap", "side"],
+            )
+
+            assert [r.document.id for r in store.search([1.0, 0.0], k=2)] == ["acme", "acme-overlap"]
+            results = store.search([1.0, 0.0], k=2, mmr_lambda=0.5)
+            assert [r.document.id for r in results] == ["acme", "side"]
+            assert [r.rank for r in results] == [1, 2]
+            assert [r.document.id for r in store.search([1.0, 0.0], k=2, mmr_lambda=1.0)] == ["acme", "acme-overlap"]
+
+            vectors = store.document_vectors(["side", "missing"])
+            assert np.allclose(vectors, [[0.8, 0.6], [0.0, 0.0]])
+
+    def test_search_batch_matches_per_query_search(self):
+        pytest.importorskip("faiss", reason="FAISS is required for vector store tests")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=2)
+            store.add_texts(
+                texts=["Kafka at Acme", "React at Initech", "Kafka side project"],
+                vectors=[[1.0, 0.0], [0.0, 1.0], [0.8, 0.6]],
+                ids=["acme", "initech", "side"],
+                metadatas=[{"kind": "job"}, {"kind": "job"}, {"kind": "project"}],
+            )
+            queries = [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]]
+
+            batched = store.search_batch(queries, k=2)
+            assert [[r.document.id for r in results] for results in batched] == [
+                [r.document.id for r in store.search(query, k=2)] for query in queries
+            ]
+            assert [r.rank for r in batched[2]] == [1, 2]
+
+            filtered = store.search_batch(queries, k=2, filter_metadata={"kind": "job"})
+            assert [[r.document.id for r in results] for results in filtered] == [
+                ["acme", "initech"], ["initech", "acme"], ["initech", "acme"]
+            ]
+            assert store.search_batch([], k=2) == []
+
+    def test_duplicate_ids_within_a_batch_keep_the_last_occurrence(self):
+        pytest.importorskip("faiss", reason="FAISS is required for vector store tests")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=2)
+            store.add_texts(texts=["Kafka pipelines"], vectors=[[1.0, 0.0]], ids=["existing"])
+
+            added = store.add_texts(
+                texts=["First draft about Kafka", "Final copy about Python", "Replaced Kafka entry"],
+                vectors=[[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]],
+                ids=["dup", "dup", "existing"],
+            )
+
+            assert added == ["dup", "existing"]
+            assert store.get_document("dup").content == "Final copy about Python"
+            assert store.index.ntotal == len(store.row_ids) == len(store._timestamps) == 3
+            assert store.get_stats()["total_documents"] == 2
+            assert [r.document.id for r in store.search([0.0, 1.0], k=1)] == ["dup"]
+            assert [r.document.id for r in store.search_lexical("Kafka", k=5)] == ["existing"]
+
+    def test_lexical_search_tracks_adds_deletes_and_compaction(self):
+        pytest.importorskip("faiss", reason="FAISS is required for vector store tests")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=3)
+            store.add_texts(
+                texts=[
+                    "Built streaming pipelines on Kafka",
+                    "Python backend services",
+                    "Vector search with pgvector and Kafka consumers",
+                ],
+                vectors=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+                ids=["kafka", "python", "pgvector"],
+            )
+
+            results = store.search_lexical("Kafka", k=5)
+            assert {result.document.id for result in results} == {"kafka", "pgvector"}
+
+            assert store.delete_document("kafka")
+            assert [result.document.id for result in store.search_lexical("Kafka", k=5)] == ["pgvector"]
+            assert all(result.document.id != "kafka" for result in store.search([1.0, 0.0, 0.0], k=3))
+
+            assert store.compact() == 1
+            assert store.index.ntotal == 2
+            assert [result.document.id for result in store.search([0.0, 0.0, 1.0], k=1)] == ["pgvector"]
+
+            store.save()
+            reloaded = FAISSVectorStore(index_path=f"{temp_dir}/index", dimension=3)
+            reloaded.load()
+            assert [result.document.id for result in reloaded.search_lexical("pgvector", k=5)] == ["pgvector"]
+            positions = reloaded.get_document("pgvector").term_positions
+            assert list(positions.get("kafka")) == [5]
+            assert positions.has_phrase(["kafka", "consumers"])
+            sentences = reloaded.get_document("pgvector").sentences
+            assert sentences.sentence(reloaded.get_document("pgvector").content, 0) == "Vector search with pgvector and Kafka consumers"
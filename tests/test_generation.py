@@ -0,0 +1,269 @@
+"""Tests for the LLM generation backend against a local OpenAI-compatible stub."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx", reason="httpx is required for the generation backend")
+
+from portfolio_agent.agents import (
+    GenerationBackend, GenerationError, GenerationResult, OpenAICompatibleBackend, PersonaAgent,
+    PersonaRequest, PersonaType
+)
+
+
+class StubChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubChatHandler)
+        self.tokens = ["Jane ", "built ", "Kafka ", "pipelines."]
+        self.delay = 0.0
+        self.fail_after = None
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append((self.path, body))
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for sent, token in enumerate(server.tokens):
+                if sent == server.fail_after:
+                    # Drop the connection mid-stream, without ending the chunked body
+                    self.close_connection = True
+                    return
+                time.sleep(server.delay)
+                self._chunk({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            self._chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self._chunk({"choices": [], "usage": {"completion_tokens": len(server.tokens)}})
+            self._write(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _chunk(self, payload):
+        self._write(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _write(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate_streams_tokens_and_reuses_connections(stub_server):
+    backend = OpenAICompatibleBackend(base_url=stub_server.base_url, model="stub-model", api_key="test")
+    received = []
+
+    first = backend.generate([{"role": "user", "content": "Hi"}], max_tokens=32, on_text=received.append)
+    second = backend.generate([{"role": "user", "content": "Again"}], max_tokens=32)
+    backend.close()
+
+    assert received == stub_server.tokens
+    assert first.text == second.text == "Jane built Kafka pipelines."
+    assert first.completion_tokens == 4
+    assert first.tokens_per_second > 0
+    assert first.metadata == {"finish_reason": "stop", "usage_reported": True}
+    path, body = stub_server.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["stream"] is True and body["model"] == "stub-model" and body["max_tokens"] == 32
+    assert len(stub_server.connections) == 1
+    assert backend.get_stats()["requests"] == 2
+
+
+def test_generate_times_out_and_limits_concurrency(stub_server):
+    stub_server.delay = 0.1
+    backend = OpenAICompatibleBackend(base_url=stub_server.base_url, max_concurrency=1)
+
+    with pytest.raises(GenerationError):
+        backend.generate([{"role": "user", "content": "Hi"}], timeout=0.15)
+    while stub_server.in_flight:
+        time.sleep(0.01)
+    stub_server.max_in_flight = 0
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(backend.generate([{"role": "user", "content": "Hi"}])))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 3
+    assert stub_server.max_in_flight == 1
+    assert backend.get_stats()["failures"] == 1
+
+
+def test_agenerate_streams_over_the_async_client(stub_server):
+    backend = OpenAICompatibleBackend(base_url=stub_server.base_url, max_concurrency=2)
+    received = []
+
+    async def run():
+        try:
+            return await asyncio.gather(*(
+                backend.agenerate([{"role": "user", "content": "Hi"}], on_text=received.append)
+                for _ in range(3)
+            ))
+        finally:
+            await backend.aclose()
+
+    results = asyncio.run(run())
+
+    assert [result.text for result in results] == ["Jane built Kafka pipelines."] * 3
+    assert len(received) == 12
+    assert stub_server.max_in_flight <= 2
+
+
+def test_persona_agent_answers_with_the_llm_backend(stub_server):
+    backend = OpenAICompatibleBackend(base_url=stub_server.base_url)
+    agent = PersonaAgent(generation_backend=backend)
+    received = []
+    request = PersonaRequest(
+        query="What Kafka work has Jane done?",
+        documents=[{"id": "doc1", "content": "Jane built Kafka pipelines at Acme.", "score": 0.9,
+                    "metadata": {"source": "cv.pdf"}}],
+        persona_type=PersonaType.PROFESSIONAL,
+        on_text=received.append,
+    )
+
+    result = agent.generate_response(request)
+
+    assert result.response == "Jane built Kafka pipelines."
+    assert "".join(received) == result.response
+    assert result.metadata["generation"]["completion_tokens"] == 4
+    prompt = stub_server.requests[0][1]["messages"][1]["content"]
+    assert "(source: cv.pdf) Jane built Kafka pipelines at Acme." in prompt
+
+
+def test_persona_agent_falls_back_to_template_when_generation_fails():
+    backend = OpenAICompatibleBackend(base_url="http://127.0.0.1:9/v1", connect_timeout=0.2)
+    agent = PersonaAgent(generation_backend=backend)
+    request = PersonaRequest(
+        query="What Kafka work has Jane done?",
+        documents=[{"id": "doc1", "content": "Jane built Kafka pipelines at Acme.", "score": 0.9}],
+    )
+
+    result = agent.generate_response(request)
+
+    assert "Jane built Kafka pipelines at Acme." in result.response
+    assert result.metadata["generation"] is None
+    assert "failed" in result.metadata["generation_error"]
+
+
+def test_persona_agent_resets_the_stream_when_generation_fails_midway(stub_server):
+    stub_server.fail_after = 2
+    agent = PersonaAgent(generation_backend=OpenAICompatibleBackend(base_url=stub_server.base_url))
+    events = []
+    request = PersonaRequest(
+        query="What Kafka work has Jane done?",
+        documents=[{"id": "doc1", "content": "Jane built Kafka pipelines at Acme.", "score": 0.9}],
+        on_text=lambda text: events.append(("token", text)),
+        on_reset=lambda reason: events.append(("reset", reason)),
+    )
+
+    result = agent.generate_response(request)
+
+    reset_at = events.index(("reset", "generation_failed"))
+    assert [text for _, text in events[:reset_at]] == ["Jane ", "built "]
+    assert "".join(text for _, text in events[reset_at + 1:]) == result.response
+    assert "Jane built Kafka pipelines at Acme." in result.response
+    assert result.metadata["generation_error"]
+
+
+class FixedReplyBackend(GenerationBackend):
+    model = "fixed"
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def generate(self, messages, *, max_tokens=256, on_text=None, timeout=None):
+        for token in self.tokens:
+            if on_text:
+                on_text(token)
+        return GenerationResult("".join(self.tokens), self.model, 0.01, 0.001, len(self.tokens), 400.0)
+
+
+def test_generation_backend_subclass_must_implement_generate():
+    class NoGenerate(GenerationBackend):
+        model = "incomplete"
+
+    with pytest.raises(TypeError):
+        NoGenerate()
+
+
+def test_persona_agent_replaces_a_streamed_reply_that_gets_truncated():
+    tokens = ["Jane built Kafka pipelines at Acme ", "and ran the streaming platform ", "for three years."]
+    agent = PersonaAgent(generation_backend=FixedReplyBackend(tokens))
+    events = []
+    request = PersonaRequest(
+        query="What Kafka work has Jane done?",
+        documents=[{"id": "doc1", "content": "Jane built Kafka pipelines at Acme.", "score": 0.9}],
+        max_response_length=60,
+        on_text=lambda text: events.append(("token", text)),
+        on_reset=lambda reason: events.append(("reset", reason)),
+    )
+
+    result = agent.generate_response(request)
+
+    reset_at = events.index(("reset", "truncated"))
+    assert [text for _, text in events[:reset_at]] == tokens
+    assert "".join(text for _, text in events[reset_at + 1:]) == result.response
+    assert len(result.response) <= 60 and result.response.endswith("...")
+
+
+def test_persona_agent_streams_an_untruncated_reply_once():
+    tokens = ["Jane ", "built ", "Kafka ", "pipelines."]
+    agent = PersonaAgent(generation_backend=FixedReplyBackend(tokens))
+    events = []
+    request = PersonaRequest(
+        query="What Kafka work has Jane done?",
+        documents=[{"id": "doc1", "content": "Jane built Kafka pipelines at Acme.", "score": 0.9}],
+        on_text=lambda text: events.append(("token", text)),
+        on_reset=lambda reason: events.append(("reset", reason)),
+    )
+
+    result = agent.generate_response(request)
+
+    assert events == [("token", token) for token in tokens]
+    assert result.response == "Jane built Kafka pipelines."
@@ -132,6 +132,17 @@ class TestTextChunker:
         assert chunks[0]['metadata']['source'] == 'test.txt'
         assert chunks[0]['metadata']['chunk_index'] == 0
     
+    def test_chunk_timestamps_are_normalized_to_epoch_seconds(self):
+        """Test naive and timezone-aware source timestamps become comparable epoch seconds."""
+        aware = text_chunker.chunk_text("Aware.", {'source': 'a', 'fetched_at': '2024-01-01T00:00:00Z'})
+        naive_time = datetime(2024, 1, 1, 12, 30)
+        naive = text_chunker.chunk_text("Naive.", {'source': 'n', 'created_at': naive_time.isoformat()})
+        undated = text_chunker.chunk_text("Undated.", {'source': 'u'})
+
+        assert aware[0]['metadata']['timestamp_epoch'] == 1704067200.0
+        assert naive[0]['metadata']['timestamp_epoch'] == naive_time.timestamp()
+        assert 'timestamp_epoch' not in undated[0]['metadata']
+
     def test_large_text(self):
         """Test chunking large text."""
         # Create text longer than default chunk size
@@ -0,0 +1,143 @@
+import json
+import random
+import threading
+
+import pytest
+
+from portfolio_agent.metrics import (
+    CallbackMetric,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    QuantileSketch,
+    Summary,
+    merge_sketches,
+    render,
+)
+
+
+def test_counter_sums_increments_from_every_thread():
+    counter = Counter("requests_total", "Requests", ("route",))
+
+    def work():
+        for _ in range(1000):
+            counter.labels("/query").inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.labels("/query").value == 8000
+    with pytest.raises(ValueError):
+        counter.labels("/query", "extra")
+
+
+def test_exited_threads_fold_their_cells_into_the_base():
+    counter = Counter("requests_total", "Requests").labels()
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).labels()
+
+    def work(value):
+        counter.inc()
+        histogram.observe(value)
+
+    for value in (0.05, 3.0, 0.5):
+        thread = threading.Thread(target=work, args=(value,))
+        thread.start()
+        thread.join()
+
+    assert counter.value == 3
+    assert counter._cells.shards() == [] and histogram._cells.shards() == []
+    assert histogram.count == 3
+    assert histogram.quantile(1.0) == 3.0
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.labels("router").observe(value)
+
+    lines = render([histogram]).splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{stage="router",le="0.1"} 1',
+        'latency_seconds_bucket{stage="router",le="1"} 3',
+        'latency_seconds_bucket{stage="router",le="+Inf"} 4',
+        'latency_seconds_sum{stage="router"} 4.05',
+        'latency_seconds_count{stage="router"} 4',
+    ]
+
+
+def test_registry_renders_callbacks_and_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.counter("plain_total", "Unlabelled").inc(2)
+    with pytest.raises(ValueError):
+        registry.counter("plain_total", "Duplicate")
+
+    sessions = CallbackMetric("sessions", "Sessions", lambda: 3)
+    hits = CallbackMetric("hits_total", "Hits", lambda: {'a"b\\c': 5}, ("cache",), kind="counter")
+    broken = CallbackMetric("broken", "Broken", lambda: 1 / 0)
+
+    lines = registry.render([sessions, hits, broken]).splitlines()
+    assert "plain_total 2" in lines
+    assert "# TYPE sessions gauge" in lines and "sessions 3" in lines
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{cache="a\\"b\\\\c"} 5' in lines
+    assert any(line.startswith("# broken unavailable") for line in lines)
+
+
+def _exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantile_sketch_stays_within_its_relative_error():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-4, 1.5) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.observe(value)
+
+    snapshot = sketch.snapshot()
+    assert snapshot["count"] == len(values)
+    assert snapshot["max"] == max(values) and snapshot["min"] == min(values)
+    for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999)):
+        assert snapshot[name] == pytest.approx(_exact(values, q), rel=0.0101)
+    # Bins are bounded by the clamping range, whatever the input
+    assert len(sketch.to_dict()["bins"]) < 1200
+
+
+def test_serialized_sketches_merge_like_one_sketch():
+    rng = random.Random(3)
+    workers = [[rng.expovariate(20) for _ in range(5000)] for _ in range(3)]
+    combined = QuantileSketch()
+    payloads = []
+    for values in workers:
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.observe(value)
+            combined.observe(value)
+        payloads.append(json.loads(json.dumps(sketch.to_dict())))
+
+    merged = merge_sketches(payloads)
+    assert merged.snapshot() == pytest.approx(combined.snapshot())
+    assert merge_sketches([]) is None
+    with pytest.raises(ValueError):
+        QuantileSketch(relative_accuracy=0.02).merge(combined)
+
+
+def test_snapshot_reset_starts_a_new_interval():
+    summary = Summary("latency_seconds", "Latency", ("stage",))
+    for value in (0.1, 0.2, 0.3):
+        summary.labels("router").observe(value)
+
+    first = summary.snapshot(reset=True)["router"]
+    assert first["count"] == 3 and first["p50"] == pytest.approx(0.2, rel=0.01)
+    assert summary.snapshot()["router"]["count"] == 0
+
+    summary.labels("router").observe(1.0)
+    lines = render([summary]).splitlines()
+    assert "# TYPE latency_seconds summary" in lines
+    assert any(line.startswith('latency_seconds{stage="router",quantile="0.999"} 1') for line in lines)
+    assert 'latency_seconds_count{stage="router"} 1' in lines
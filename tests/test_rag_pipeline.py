@@ -5,6 +5,7 @@ Tests for RAG pipeline and agents.
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import time
+import pickle
 
 # Test imports
 try:
@@ -82,6 +83,116 @@ class TestRouterAgent:
         )
         assert not router_agent.validate_routing_decision(invalid_decision)
 
+    def test_keywords_match_whole_words_and_overlapping_phrases(self, router_agent):
+        """Keywords match on word boundaries, plurals and overlapping phrases."""
+        scores = router_agent.route_query("Is your email available?").metadata["all_scores"]
+        assert scores["technical"] == 0.0
+
+        matches = router_agent.matcher.match("Walk me through your work history and projects")
+        assert {"work", "project"} <= matches[QueryType.PROJECT]
+        assert "work history" in matches[QueryType.EXPERIENCE]
+        experience_keywords = len(router_agent.routing_patterns[QueryType.EXPERIENCE]["keywords"])
+        assert router_agent.route_query("my work history").metadata["all_scores"]["experience"] == pytest.approx(
+            1 / experience_keywords + 0.1
+        )
+
+    def test_extra_patterns_extend_query_types(self):
+        """User-supplied patterns are compiled into the matcher."""
+        router_agent = RouterAgent(extra_patterns={"technical": ["Kubernetes", "service mesh"]})
+        assert router_agent.route_query("Any kubernetes service mesh work?").metadata["all_scores"]["technical"] > 0.1
+
+        router_agent.add_patterns("education", ["bootcamp"])
+        assert router_agent.matcher.match("a coding bootcamp")[QueryType.EDUCATION] == {"bootcamp"}
+
+        with pytest.raises(ValueError):
+            RouterAgent(extra_patterns={"astrology": ["stars"]})
+
+
+class TestSemanticRouting:
+    """Test embedding-centroid routing."""
+
+    VOCABULARY = ["python", "backend", "degree", "university", "email", "contact", "hobbies", "projects"]
+
+    class BagOfWordsEmbedder:
+        def __init__(self, vocabulary):
+            self.vocabulary = vocabulary
+            self.batches = []
+
+        def embed_single_sync(self, text):
+            text = text.lower()
+            return [1.0 if word in text else 0.0 for word in self.vocabulary]
+
+        def embed_texts_sync(self, texts):
+            self.batches.append(len(texts))
+            return Mock(embeddings=[self.embed_single_sync(text) for text in texts])
+
+    @pytest.fixture
+    def embedder(self):
+        return self.BagOfWordsEmbedder(self.VOCABULARY)
+
+    def test_semantic_routing_scores_against_centroids(self, embedder):
+        """Queries go to the nearest centroid and carry their embedding."""
+        router_agent = RouterAgent(
+            confidence_threshold=0.5,
+            routing_mode="semantic",
+            embedder=embedder,
+            semantic_examples={
+                "education": ["Which university degree?", "University degree details"],
+                "contact": ["Contact email please", "What is your email contact?"],
+            },
+        )
+
+        decision = router_agent.route_query("Which university gave you a degree?")
+        assert decision.query_type == QueryType.EDUCATION
+        assert decision.confidence == pytest.approx(1.0, abs=1e-5)
+        assert decision.query_vector == embedder.embed_single_sync("Which university gave you a degree?")
+        assert decision.metadata["routing_mode"] == "semantic"
+
+        vector = embedder.embed_single_sync("email contact")
+        assert router_agent.route_query("anything", query_vector=vector).query_type == QueryType.CONTACT
+        assert embedder.batches == [sum(len(examples) for examples in router_agent.semantic_examples.values())]
+
+    def test_route_batch_embeds_missing_vectors_in_one_call(self, embedder):
+        """Batched semantic routing embeds once and matches per-query routing."""
+        router_agent = RouterAgent(
+            confidence_threshold=0.5,
+            routing_mode="semantic",
+            embedder=embedder,
+            semantic_examples={
+                "education": ["Which university degree?"],
+                "contact": ["What is your email contact?"],
+            },
+        )
+        queries = ["Which university gave you a degree?", "Send me your email", "zzz"]
+
+        decisions = router_agent.route_batch(queries)
+
+        assert embedder.batches[0] == len(queries) and len(embedder.batches) == 2
+        assert [d.query_type for d in decisions] == [router_agent.route_query(q).query_type for q in queries]
+        assert [d.query_type for d in decisions] == [QueryType.EDUCATION, QueryType.CONTACT, QueryType.UNKNOWN]
+        assert router_agent.route_batch([]) == []
+
+    def test_semantic_routing_requires_an_embedder(self):
+        """Semantic mode without an embedder is a configuration error."""
+        with pytest.raises(ValueError):
+            RouterAgent(routing_mode="semantic")
+
+    def test_retriever_reuses_a_precomputed_query_vector(self):
+        """A request carrying a vector searches without embedding again."""
+        from portfolio_agent.agents import RetrievalRequest
+
+        vector_store = Mock()
+        vector_store.generation = None
+        vector_store.search.return_value = []
+        embedder = Mock()
+        agent = RetrieverAgent(vector_store=vector_store, embedder=embedder)
+
+        agent.retrieve_documents(RetrievalRequest(query="python", query_vector=[0.1, 0.2]))
+
+        assert vector_store.search.call_args[0][0] == [0.1, 0.2]
+        vector_store.search_by_text.assert_not_called()
+        vector_store.embed_query.assert_not_called()
+
 
 class TestRetrieverAgent:
     """Test Retriever Agent."""
@@ -171,6 +282,151 @@ class TestRetrieverAgent:
         assert len(result.documents) == 1
         assert result.documents[0]["keyword_overlap"] > 0
 
+    def test_keyword_fallback_ranks_by_overlap_and_dedupes(self, retriever_agent, mock_vector_store):
+        """Test fallback ordering (overlap, then score) and duplicate removal."""
+        from portfolio_agent.agents import RetrievalRequest
+
+        def hit(doc_id, content, score):
+            return Mock(document=Mock(id=doc_id, content=content, metadata={"source": "cv.txt"}), score=score, rank=1)
+
+        mock_vector_store.search_by_text.return_value = [
+            hit("a", "Python services", 0.5),
+            hit("b", "Python FastAPI services", 0.3),
+            hit("b", "Python FastAPI services", 0.3),
+            hit("c", "Gardening notes", 0.6),
+            hit("d", "FastAPI", 0.4),
+        ]
+        retriever_agent.min_score_threshold = 0.9
+
+        result = retriever_agent.retrieve_documents(RetrievalRequest(query="Python FastAPI", k=3))
+
+        assert [doc["id"] for doc in result.documents] == ["b", "a"]
+        assert [doc["keyword_overlap"] for doc in result.documents] == [2, 1]
+        assert result.metadata["fallback_used"] is True
+
+    def test_hybrid_retrieval_surfaces_lexical_matches(self, tmp_path):
+        """Test hybrid mode fuses BM25 hits that dense search ranks poorly."""
+        pytest.importorskip("faiss", reason="FAISS is required for hybrid retrieval")
+        from portfolio_agent.agents import RetrievalRequest
+        from portfolio_agent.vector_stores import FAISSVectorStore
+
+        store = FAISSVectorStore(index_path=str(tmp_path / "hybrid_index"), dimension=2)
+        store.add_texts(
+            texts=["Python services and APIs", "Python tooling", "Operated Kafka clusters"],
+            vectors=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+            ids=["python_a", "python_b", "kafka"],
+        )
+        embedder = Mock()
+        embedder.embed_single_sync.return_value = [1.0, 0.0]
+
+        dense = RetrieverAgent(store, embedder, min_score_threshold=0.5)
+        hybrid = RetrieverAgent(store, embedder, min_score_threshold=0.5, retrieval_mode="hybrid")
+        request = RetrievalRequest(query="Kafka experience", k=2)
+
+        dense_ids = [doc["id"] for doc in dense.retrieve_documents(request).documents]
+        result = hybrid.retrieve_documents(request)
+        hybrid_ids = [doc["id"] for doc in result.documents]
+
+        assert "kafka" not in dense_ids
+        assert "kafka" in hybrid_ids
+        assert result.metadata["retrieval_mode"] == "hybrid"
+        kafka_doc = next(doc for doc in result.documents if doc["id"] == "kafka")
+        assert kafka_doc["lexical_score"] > 0
+        assert kafka_doc["score"] == pytest.approx(0.0, abs=1e-6)
+
+        # The executed mode is reported even when nothing matches
+        empty_store = FAISSVectorStore(index_path=str(tmp_path / "empty_index"), dimension=2)
+        empty = RetrieverAgent(empty_store, embedder, retrieval_mode="hybrid").retrieve_documents(request)
+        assert empty.documents == []
+        assert empty.metadata["retrieval_mode"] == "hybrid"
+
+    def test_hybrid_retrieval_returns_partial_results_at_deadline(self, mock_vector_store, mock_embedder):
+        """Test slow first-stage sources are abandoned at max_retrieval_time."""
+        from portfolio_agent.agents import RetrievalRequest
+
+        dense_hit = mock_vector_store.search_by_text.return_value[0]
+        mock_vector_store.embed_query.return_value = [0.1] * 384
+        mock_vector_store.search.return_value = [dense_hit]
+        mock_vector_store.search_lexical.side_effect = lambda *args, **kwargs: time.sleep(1.0) or []
+        retriever = RetrieverAgent(
+            mock_vector_store, mock_embedder, retrieval_mode="hybrid", max_retrieval_time=0.2
+        )
+
+        started = time.time()
+        result = retriever.retrieve_documents(RetrievalRequest(query="test document", k=3))
+
+        assert time.time() - started < 0.8
+        assert [doc["id"] for doc in result.documents] == ["doc1"]
+        assert result.metadata["sources_timed_out"] == ["lexical"]
+        assert result.metadata["partial"] is True
+        assert "dense" in result.metadata["source_timings"]
+
+    def test_retrieval_sources_never_queue_behind_other_queries(self, mock_vector_store, mock_embedder):
+        """Test a busy source pool leaves every search on the caller's thread without timing out."""
+        import threading
+        from portfolio_agent.agents import RetrievalRequest
+
+        dense_hit = mock_vector_store.search_by_text.return_value[0]
+        search_threads = []
+
+        def record(result):
+            def search(*args, **kwargs):
+                search_threads.append(threading.current_thread().name)
+                return result
+            return search
+
+        mock_vector_store.search_by_text.side_effect = record([dense_hit])
+        mock_vector_store.embed_query.return_value = [0.1] * 384
+        mock_vector_store.search.side_effect = record([dense_hit])
+        mock_vector_store.search_lexical.side_effect = record([])
+        request = RetrievalRequest(query="test document", k=3)
+
+        dense = RetrieverAgent(mock_vector_store, mock_embedder, max_workers=1)
+        assert [doc["id"] for doc in dense.retrieve_documents(request).documents] == ["doc1"]
+
+        hybrid = RetrieverAgent(
+            mock_vector_store, mock_embedder, retrieval_mode="hybrid", max_workers=1, max_retrieval_time=0.2
+        )
+        release = threading.Event()
+        hybrid._executor.submit(release.wait)  # another query holding the only worker
+        try:
+            result = hybrid.retrieve_documents(request)
+        finally:
+            release.set()
+
+        assert result.metadata["sources_timed_out"] == []
+        assert set(result.metadata["source_timings"]) == {"dense", "lexical"}
+        assert search_threads == [threading.current_thread().name] * 3
+
+    def test_retrieval_cache_hits_until_index_changes(self, tmp_path):
+        """Test repeated queries are served from cache until the store generation moves."""
+        pytest.importorskip("faiss", reason="FAISS is required for the vector store")
+        from portfolio_agent.agents import RetrievalRequest
+        from portfolio_agent.vector_stores import FAISSVectorStore
+
+        store = FAISSVectorStore(index_path=str(tmp_path / "cache_index"), dimension=2)
+        store.add_texts(texts=["Operated Kafka clusters"], vectors=[[1.0, 0.0]], ids=["kafka"])
+        embedder = Mock()
+        embedder.embed_single_sync.return_value = [1.0, 0.0]
+        retriever = RetrieverAgent(store, embedder)
+
+        first = retriever.retrieve_documents(RetrievalRequest(query="Kafka clusters", k=2))
+        second = retriever.retrieve_documents(RetrievalRequest(query="  kafka   CLUSTERS ", k=2))
+
+        assert second.metadata["cache_hit"] is True
+        assert second.documents == first.documents
+        assert second.documents[0] is not first.documents[0]
+        assert embedder.embed_single_sync.call_count == 1
+
+        store.add_texts(texts=["Scaled Kafka brokers"], vectors=[[0.9, 0.1]], ids=["kafka_2"])
+        third = retriever.retrieve_documents(RetrievalRequest(query="Kafka clusters", k=2))
+
+        assert third.metadata["cache_hit"] is False
+        assert {doc["id"] for doc in third.documents} == {"kafka", "kafka_2"}
+        cache_stats = retriever.get_retrieval_stats()["cache"]
+        assert cache_stats["hits"] == 1
+        assert cache_stats["misses"] == 2
+
 
 class TestRerankerAgent:
     """Test Reranker Agent."""
@@ -234,6 +490,225 @@ class TestRerankerAgent:
         assert "keyword_score" in result.documents[0]
         assert result.strategy_used == RerankingStrategy.KEYWORD_MATCH
 
+    def test_hybrid_rerank_scores_without_mutating_inputs(self, reranker_agent, sample_documents):
+        """Test hybrid reranking combines strategy scores and leaves input documents untouched."""
+        from portfolio_agent.agents import RerankingRequest
+
+        request = RerankingRequest(
+            documents=sample_documents,
+            query="data science",
+            strategy=RerankingStrategy.HYBRID,
+            max_results=2
+        )
+
+        result = reranker_agent.rerank_documents(request)
+
+        assert [doc["id"] for doc in result.documents] == ["doc2", "doc1"]
+        top = result.documents[0]
+        assert top["keyword_score"] == pytest.approx(0.7 * 0.7 + 0.3)
+        assert top["relevance_score"] == pytest.approx(0.7 * 0.5 + 0.3 + 0.1)
+        assert top["hybrid_score"] == pytest.approx(
+            0.7 * 0.4 + top["keyword_score"] * 0.3 + top["relevance_score"] * 0.3
+        )
+        assert all("hybrid_score" not in doc for doc in sample_documents)
+
+    def test_recency_rerank_mixes_naive_and_aware_timestamps(self, reranker_agent):
+        """Test recency scoring compares naive, aware and pre-normalized timestamps."""
+        from datetime import datetime, timedelta, timezone
+
+        now = datetime.now()
+        documents = [
+            {"id": "undated", "content": "a", "score": 0.9},
+            {"id": "aware", "content": "b", "score": 0.5,
+             "metadata": {"fetched_at": (datetime.now(timezone.utc) - timedelta(days=15)).isoformat()}},
+            {"id": "naive", "content": "c", "score": 0.5, "metadata": {"created_at": now.isoformat()}},
+            {"id": "epoch", "content": "d", "score": 0.5, "metadata": {"timestamp_epoch": now.timestamp() - 60 * 86400}},
+        ]
+
+        result = reranker_agent._recency_rerank(documents, "query", 4, 0.0)
+
+        assert [doc["id"] for doc in result] == ["naive", "undated", "aware", "epoch"]
+        assert result[0]["recency_score"] == pytest.approx(0.5 * 0.8 + 0.2, abs=1e-4)
+        assert result[2]["recency_score"] == pytest.approx(0.5 * 0.8 + 0.5 * 0.2, abs=1e-4)
+        assert result[3]["recency_score"] == pytest.approx(0.5 * 0.8)
+
+    def test_recency_rerank_keeps_the_score_for_unparseable_timestamps(self, reranker_agent):
+        """Test a present but unparseable timestamp falls back to the relevance score."""
+        documents = [
+            {"id": "garbled", "content": "a", "score": 0.7, "metadata": {"created_at": "last spring"}},
+            {"id": "undated", "content": "b", "score": 0.9, "metadata": {}},
+            {"id": "low", "content": "c", "score": 0.3, "metadata": {"fetched_at": "n/a"}},
+        ]
+
+        result = reranker_agent._recency_rerank(documents, "query", 3, 0.0)
+
+        assert [doc["id"] for doc in result] == ["garbled", "undated", "low"]
+        assert [doc["recency_score"] for doc in result] == pytest.approx([0.7, 0.5, 0.3])
+
+    def test_relevance_rerank_uses_every_term_occurrence(self, reranker_agent):
+        """Test phrase and order scoring match on positions beyond the first occurrence."""
+        documents = [
+            {"id": "later", "content": "Kafka basics. Then Python, Kafka streams.", "score": 0.5},
+            {"id": "never", "content": "Kafka only, before any Python.", "score": 0.5},
+        ]
+
+        result = reranker_agent._relevance_rerank(documents, "python kafka streams", 2, 0.0)
+
+        assert [doc["id"] for doc in result] == ["later", "never"]
+        assert result[0]["relevance_score"] == pytest.approx(0.5 * 0.5 + 0.3 + 0.1)
+        assert result[1]["relevance_score"] == pytest.approx(0.5 * 0.5)
+
+    def test_cross_encoder_rerank_scores_in_batches_within_budget(self):
+        """Test cross-encoder scoring is batched, cached, and keeps prior order past the budget."""
+        from portfolio_agent.agents import CrossEncoderScorer, RerankingRequest
+
+        class FakeCrossEncoder:
+            def __init__(self):
+                self.batches = []
+
+            def predict(self, pairs, batch_size, show_progress_bar):
+                self.batches.append(len(pairs))
+                if len(self.batches) > 1:
+                    time.sleep(0.5)
+                return [len(chunk.split()) for _, chunk in pairs]
+
+        model = FakeCrossEncoder()
+        scorer = CrossEncoderScorer(model=model, batch_size=2, max_workers=1, max_tokens=8)
+        reranker = RerankerAgent(cross_encoder=scorer)
+        documents = [
+            {"id": "short", "content": "Kafka", "score": 0.9},
+            {"id": "long", "content": "Operated Kafka clusters across " + "many " * 20 + "regions", "score": 0.8},
+            {"id": "third", "content": "Python services", "score": 0.7},
+            {"id": "fourth", "content": "Go tooling", "score": 0.6},
+        ]
+        request = RerankingRequest(
+            documents=documents,
+            query="Kafka clusters",
+            strategy=RerankingStrategy.CROSS_ENCODER,
+            max_results=4,
+            time_budget=0.2
+        )
+
+        result = reranker.rerank_documents(request)
+
+        assert [doc["id"] for doc in result.documents] == ["long", "short", "third", "fourth"]
+        assert result.documents[0]["cross_encoder_score"] == 8 - 2 - 3
+        assert "cross_encoder_score" not in result.documents[2]
+        assert result.metadata["timed_out"] is False
+
+        model.batches.clear()
+        request.time_budget = 5.0
+        reranker.rerank_documents(request)
+        assert model.batches == [2]
+        assert reranker.get_reranking_stats()["cross_encoder"]["cache"]["hits"] == 2
+
+    def test_diversity_reranks_with_mmr_over_stored_vectors(self):
+        """Test diversity keeps the top document and skips near-duplicates of it."""
+        import numpy as np
+        from portfolio_agent.agents import RerankingRequest
+
+        vectors = {"a": [1.0, 0.0], "a2": [0.99, 0.14], "b": [0.0, 1.0]}
+        store = Mock()
+        store.document_vectors.side_effect = lambda ids: np.array([vectors[i] for i in ids])
+        reranker = RerankerAgent(vector_store=store)
+        documents = [
+            {"id": "a", "content": "Kafka", "score": 0.9},
+            {"id": "a2", "content": "Kafka", "score": 0.85},
+            {"id": "b", "content": "Kafka", "score": 0.6},
+        ]
+        request = RerankingRequest(
+            documents=documents,
+            query="Kafka",
+            strategy=RerankingStrategy.SCORE_ONLY,
+            max_results=2,
+            diversity=0.5
+        )
+
+        result = reranker.rerank_documents(request)
+
+        assert [doc["id"] for doc in result.documents] == ["a", "b"]
+        assert result.metadata["diversity"] == 0.5
+
+        request.diversity = None
+        assert [doc["id"] for doc in reranker.rerank_documents(request).documents] == ["a", "a2"]
+
+    def test_pure_relevance_diversity_keeps_hybrid_order(self):
+        """Test widening the MMR candidates leaves the hybrid top-k lookups at max_results."""
+        import numpy as np
+        from portfolio_agent.agents import RerankingRequest
+
+        store = Mock()
+        store.document_vectors.side_effect = lambda ids: np.eye(len(ids))
+        store.term_positions.return_value = None
+        reranker = RerankerAgent(vector_store=store)
+        documents = [
+            {"id": "a", "content": "Kafka streaming pipelines", "score": 0.9},
+            {"id": "b", "content": "Kafka", "score": 0.8},
+            {"id": "c", "content": "Kafka streaming pipelines with Kafka Connect", "score": 0.55},
+            {"id": "d", "content": "streaming pipelines", "score": 0.5},
+            {"id": "e", "content": "unrelated", "score": 0.7},
+        ]
+        request = RerankingRequest(
+            documents=documents,
+            query="Kafka streaming pipelines",
+            strategy=RerankingStrategy.HYBRID,
+            max_results=2
+        )
+
+        expected = [(doc["id"], doc["hybrid_score"]) for doc in reranker.rerank_documents(request).documents]
+        request.diversity = 1.0
+        result = reranker.rerank_documents(request)
+
+        assert result.metadata["diversity"] == 1.0
+        assert [(doc["id"], doc["hybrid_score"]) for doc in result.documents] == expected
+        assert [doc_id for doc_id, _ in expected] == ["a", "c"]
+
+    def test_rerank_falls_back_to_score_order_when_budget_exceeded(self, reranker_agent):
+        """A strategy that overruns its budget stops between documents and keeps score order."""
+        import contextvars
+        from portfolio_agent.agents import RerankingRequest
+
+        seen_context = []
+        marker = contextvars.ContextVar("marker", default=None)
+
+        class SlowPositions:
+            def has_phrase(self, words):
+                seen_context.append(marker.get())
+                time.sleep(0.05)
+                return False
+
+            def order_score(self, words):
+                return 0.0
+
+        class Store:
+            def term_positions(self, doc_id, content):
+                return SlowPositions()
+
+        reranker_agent.vector_store = Store()
+        documents = [
+            {"id": f"doc{i}", "content": "data science work", "score": 1.0 - i / 10}
+            for i in range(10)
+        ]
+        request = RerankingRequest(
+            documents=documents,
+            query="data science",
+            strategy=RerankingStrategy.HYBRID,
+            max_results=2,
+            time_budget=0.12
+        )
+
+        marker.set("caller")
+        result = reranker_agent.rerank_documents(request)
+
+        assert result.metadata["timed_out"] is True
+        assert [doc["id"] for doc in result.documents] == ["doc0", "doc1"]
+        assert result.reranking_time < 0.3
+        # The strategy runs on the caller's thread, inside its context
+        assert seen_context and set(seen_context) == {"caller"}
+
+        request.time_budget = 0
+        assert reranker_agent.rerank_documents(request).metadata["timed_out"] is True
+
 
 class TestPersonaAgent:
     """Test Persona Agent."""
@@ -307,6 +782,73 @@ class TestPersonaAgent:
 
         assert "source-backed" in result.response or "indexed documents" in result.response
 
+    def test_response_cache_short_circuits_repeated_requests(self, sample_documents):
+        """Test identical requests over the same index generation reuse the answer."""
+        from portfolio_agent.agents import GenerationBackend, GenerationResult, PersonaRequest
+
+        class CountingBackend(GenerationBackend):
+            model = "counting"
+            calls = 0
+
+            def generate(self, messages, *, max_tokens=256, on_text=None, timeout=None):
+                self.calls += 1
+                if on_text:
+                    on_text("Python and machine learning.")
+                return GenerationResult("Python and machine learning.", self.model, 0.01, 0.001, 5, 500.0)
+
+        backend = CountingBackend()
+        agent = PersonaAgent(generation_backend=backend)
+
+        def ask(query="What programming do you know?", generation=3):
+            streamed = []
+            request = PersonaRequest(
+                query=query, documents=sample_documents, index_generation=generation, on_text=streamed.append
+            )
+            return agent.generate_response(request), streamed
+
+        first, _ = ask()
+        second, streamed = ask(query="  what PROGRAMMING do you know? ")
+
+        assert backend.calls == 1
+        assert first.metadata["cache_hit"] is False
+        assert second.metadata["cache_hit"] is True
+        assert second.response == first.response == "".join(streamed)
+        assert second.sources == first.sources
+
+        ask(generation=4)
+        ask(generation=None)
+        ask(generation=None)
+        assert backend.calls == 4
+        assert agent.get_persona_stats()["cache"]["hits"] == 1
+
+    def test_snippet_uses_precomputed_sentence_index(self, persona_agent):
+        """Test snippets come from the ingest-time sentence index."""
+        from portfolio_agent.text_matching import SentenceIndex
+
+        content = "Joined Acme in 2019.  Led the Kafka platform team!\n\nMentored three engineers."
+        sentences = SentenceIndex(content)
+        assert [sentences.sentence(content, i) for i in range(len(sentences))] == [
+            "Joined Acme in 2019.", "Led the Kafka platform team!", "Mentored three engineers."
+        ]
+        assert sentences.overlaps([{"kafka"}, {"led", "lead"}, {"missing"}]) == [0, 2, 0]
+        restored = pickle.loads(pickle.dumps(sentences))
+        assert restored.postings == sentences.postings
+
+        class Store:
+            lookups = []
+
+            def sentence_index(self, doc_id, stored_content):
+                self.lookups.append(doc_id)
+                return sentences if (doc_id, stored_content) == ("doc1", content) else None
+
+        persona_agent.vector_store = Store()
+        documents = [{"id": "doc1", "content": content, "score": 0.5}]
+        evidence, _ = persona_agent._extract_evidence(documents, "Who had leadership of Kafka?")
+
+        assert evidence[0]["snippet"] == "Led the Kafka platform team!"
+        assert evidence[0]["overlap"] == 2
+        assert persona_agent.vector_store.lookups == ["doc1"]
+
 
 class TestMemoryManager:
     """Test Memory Manager."""
@@ -466,6 +1008,181 @@ class TestRAGPipeline:
         assert len(response.sources) == 1
         assert response.processing_time > 0
     
+    def test_fast_path_matches_graph_execution(self, mock_agents):
+        """The plain-Python executor produces the same response as LangGraph."""
+        from langgraph.checkpoint.memory import MemorySaver
+
+        router, retriever, reranker, persona, memory = mock_agents
+        router.route_query.return_value = Mock(
+            query_type=Mock(value="technical"),
+            confidence=0.8,
+            reasoning="Test reasoning",
+            suggested_agents=["retriever", "persona"],
+            metadata={},
+            query_vector=None
+        )
+        retriever.retrieve_documents.return_value = Mock(
+            documents=[{"id": "doc1", "content": "Test content", "score": 0.9}],
+            metadata={"index_generation": 3}
+        )
+        reranker.rerank_documents.return_value = Mock(
+            documents=[{"id": "doc1", "content": "Test content", "score": 0.9}],
+            metadata={}
+        )
+        persona.generate_response.return_value = Mock(
+            response="Test response",
+            sources=[{"id": "doc1", "score": 0.9}],
+            metadata={"evidence_strength": "strong"}
+        )
+        memory.get_conversation_context.return_value = None
+        request = RAGRequest(query="What is machine learning?", session_id="test_session")
+
+        fast = RAGPipeline(router, retriever, reranker, persona, memory)
+        graph = RAGPipeline(router, retriever, reranker, persona, memory, fast_path=False)
+        assert fast.fast_path and not graph.fast_path
+        assert not RAGPipeline(router, retriever, reranker, persona, memory, checkpointer=MemorySaver()).fast_path
+
+        fast_response = fast.process_query(request)
+        graph_response = graph.process_query(request)
+        assert fast_response.response == graph_response.response == "Test response"
+        assert fast_response.sources == graph_response.sources
+        assert fast_response.metadata == graph_response.metadata
+        assert persona.generate_response.call_args_list[0].args[0].index_generation == 3
+        assert memory.add_turn.call_count == 2
+
+    def test_process_query_degrades_when_budget_runs_out(self, rag_pipeline, mock_agents):
+        """Stages shrink their work and report it once the deadline is near."""
+        router, retriever, reranker, persona, memory = mock_agents
+
+        def slow_route(**kwargs):
+            time.sleep(0.15)
+            return Mock(
+                query_type=Mock(value="technical"),
+                confidence=0.8,
+                reasoning="Test reasoning",
+                suggested_agents=["retriever", "persona"],
+                metadata={}
+            )
+
+        def slow_retrieve(request):
+            time.sleep(0.1)
+            return Mock(
+                documents=[{"id": f"doc{i}", "content": "Test content", "score": 0.9} for i in range(request.k)],
+                metadata={"partial": True}
+            )
+
+        router.route_query.side_effect = slow_route
+        retriever.retrieve_documents.side_effect = slow_retrieve
+        persona.generate_response.return_value = Mock(
+            response="Test response",
+            sources=[],
+            metadata={}
+        )
+        memory.get_conversation_context.return_value = None
+
+        response = rag_pipeline.process_query(
+            RAGRequest(query="What is machine learning?", session_id="s", max_documents=4, time_budget=0.2)
+        )
+
+        retrieval_request = retriever.retrieve_documents.call_args.args[0]
+        assert retrieval_request.k == 2
+        assert retrieval_request.time_budget < 0.2
+        reranker.rerank_documents.assert_not_called()
+        assert response.metadata["degradations"] == [
+            "retrieval_k_reduced", "retrieval_partial", "rerank_skipped"
+        ]
+        assert response.metadata["documents_reranked"] == 2
+        assert persona.generate_response.call_args.args[0].time_budget < 0
+
+    def test_aprocess_query_runs_nodes_off_the_event_loop(self, mock_agents):
+        """Async queries run stages on the bounded executor, concurrently."""
+        import asyncio
+        import threading
+
+        router, retriever, reranker, persona, memory = mock_agents
+        rag_pipeline = RAGPipeline(router, retriever, reranker, persona, memory, max_workers=4)
+        node_threads = set()
+
+        def slow_route(**kwargs):
+            node_threads.add(threading.current_thread().name)
+            time.sleep(0.1)
+            return Mock(
+                query_type=Mock(value="personal"),
+                confidence=0.8,
+                reasoning="Test reasoning",
+                suggested_agents=["persona"],
+                metadata={}
+            )
+
+        router.route_query.side_effect = slow_route
+        persona.generate_response.return_value = Mock(response="Test response", sources=[], metadata={})
+        memory.get_conversation_context.return_value = None
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            ticking = asyncio.create_task(ticker())
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                rag_pipeline.aprocess_query(RAGRequest(query="Tell me about yourself", session_id=f"s{i}"))
+                for i in range(4)
+            ))
+            elapsed = time.perf_counter() - started
+            ticking.cancel()
+            return responses, elapsed, ticks
+
+        responses, elapsed, ticks = asyncio.run(run())
+
+        assert [response.response for response in responses] == ["Test response"] * 4
+        assert all(name.startswith("rag-pipeline") for name in node_threads)
+        assert elapsed < 0.3  # four 0.1s routes overlapped rather than serialized
+        assert ticks >= 5  # the loop kept running while nodes slept
+        assert memory.add_turn.call_count == 4
+
+    @pytest.mark.parametrize("fast_path", [True, False])
+    def test_stream_query_yields_stage_events(self, mock_agents, fast_path):
+        """Streaming yields routing, sources and text before the final response, on either executor."""
+        router, retriever, reranker, persona, memory = mock_agents
+        rag_pipeline = RAGPipeline(router, retriever, reranker, persona, memory, fast_path=fast_path)
+
+        router.route_query.return_value = Mock(
+            query_type=Mock(value="technical"),
+            confidence=0.8,
+            reasoning="Test reasoning",
+            suggested_agents=["retriever", "persona"],
+            metadata={}
+        )
+        documents = [{"id": "doc1", "content": "Test content", "score": 0.9, "metadata": {"source": "cv.pdf"}}]
+        retriever.retrieve_documents.return_value = Mock(documents=documents, metadata={})
+        reranker.rerank_documents.return_value = Mock(documents=documents, metadata={})
+
+        def generate(request):
+            request.on_text("Test ")
+            request.on_text("response.")
+            return Mock(response="Test response.", sources=[{"id": "doc1"}], metadata={})
+
+        persona.generate_response.side_effect = generate
+        memory.get_conversation_context.return_value = None
+
+        events = list(rag_pipeline.stream_query(RAGRequest(query="What is machine learning?", session_id="s", trace=True)))
+
+        assert [event["event"] for event in events] == ["routing", "sources", "token", "token", "done"]
+        trace = events[-1]["data"].metadata["trace"]
+        assert trace["name"] == "query"
+        assert [child["name"] for child in trace["children"]] == ["router", "retriever", "reranker", "persona", "memory"]
+        assert events[0]["data"]["confidence"] == 0.8
+        assert events[1]["data"] == [{"id": "doc1", "source": "cv.pdf", "score": 0.9, "rank": 1}]
+        assert "".join(event["data"]["text"] for event in events[2:4]) == "Test response."
+        assert events[-1]["data"].response == "Test response."
+        assert events[-1]["data"].metadata["documents_reranked"] == 1
+        memory.add_turn.assert_called_once()
+
     def test_pipeline_stats(self, rag_pipeline, mock_agents):
         """Test getting pipeline statistics."""
         router, retriever, reranker, persona, memory = mock_agents
@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from portfolio_agent.api.rate_limit import (
+    GCRA_SCRIPT,
+    InMemoryRateLimitStore,
+    RateLimit,
+    RateLimiter,
+    RedisRateLimitStore,
+    gcra,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Runs GCRA_SCRIPT's contract in Python: one atomic call, server clock in microseconds, PX expiry."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+        self.calls = []
+        self.lock = threading.Lock()
+        self.down = False
+
+    def register_script(self, script):
+        assert script == GCRA_SCRIPT
+
+        def run(keys, args):
+            if self.down:
+                raise ConnectionError("connection refused")
+            key, (interval, tolerance) = keys[0], args
+            with self.lock:
+                self.calls.append((key, interval, tolerance))
+                now = round(self.clock() * 1e6)
+                stored = self.data.get(key)
+                if stored is not None and stored[1] <= now:
+                    stored = None
+                tat, decision = gcra(stored[0] if stored else None, now, interval, tolerance)
+                if tat is None:
+                    return [0, 0, int(decision.retry_after), int(decision.reset_after)]
+                self.data[key] = (tat, now + int(decision.reset_after))
+                return [1, decision.remaining, 0, int(decision.reset_after)]
+
+        return run
+
+
+def test_gcra_allows_a_burst_then_the_sustained_rate():
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(clock=clock)
+    limit = RateLimit(requests=3, window=3.0)
+
+    decisions = [store.check("client", limit) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[3].retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert store.check("client", limit).allowed
+    assert not store.check("client", limit).allowed
+    assert store.check("other", limit).allowed
+
+
+def test_memory_store_keeps_one_entry_per_key_and_evicts_idle_keys():
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(max_keys=3, clock=clock)
+    limit = RateLimit(requests=10, window=10.0)
+
+    for _ in range(50):
+        store.check("busy", limit)
+    assert len(store) == 1
+
+    for client in ("a", "b", "c"):
+        store.check(client, limit)
+    assert len(store) == 3
+
+    clock.now += 60
+    store.check("d", limit)
+    assert len(store) == 1
+
+
+def test_memory_store_is_exact_under_concurrency():
+    store = InMemoryRateLimitStore(clock=FakeClock())
+    limit = RateLimit(requests=100, window=60.0)
+    allowed = []
+
+    def hammer():
+        allowed.extend(store.check("client", limit).allowed for _ in range(50))
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(allowed) == 100
+
+
+def test_redis_store_shares_limits_across_workers():
+    clock = FakeClock()
+    client = FakeRedis(clock)
+    limit = RateLimit(requests=4, window=4.0)
+    workers = [RedisRateLimitStore(client), RedisRateLimitStore(client)]
+
+    decisions = [workers[i % 2].check("query:1.2.3.4", limit) for i in range(5)]
+    assert [d.allowed for d in decisions] == [True, True, True, True, False]
+    assert decisions[-1].retry_after == pytest.approx(1.0)
+    assert client.calls[0] == ("portfolio_agent:ratelimit:query:1.2.3.4", 1_000_000, 3_000_000)
+
+    clock.now += 10
+    assert workers[0].check("query:1.2.3.4", limit).remaining == 3
+
+
+def test_redis_store_allows_requests_when_redis_is_down():
+    client = FakeRedis(FakeClock())
+    client.down = True
+    assert RedisRateLimitStore(client).check("key", RateLimit(requests=1, window=60)).allowed
+
+
+def test_rate_limiter_keys_buckets_by_group_and_client():
+    limiter = RateLimiter(
+        limits={"query": RateLimit(requests=1, window=60)},
+        prefixes={"/api/v1/query": "query", "/api/v1/documents": "documents"},
+        store=InMemoryRateLimitStore(clock=FakeClock()),
+    )
+
+    assert limiter.check("a", "/api/v1/query").allowed
+    assert not limiter.check("a", "/api/v1/query/stream").allowed
+    assert limiter.check("b", "/api/v1/query").allowed
+    assert limiter.check("a", "/api/v1/documents") is None
+    assert limiter.check("a", "/api/v1/health") is None
+    assert limiter.get_stats() == {"allowed": 2, "rejected": 1, "backend": "InMemoryRateLimitStore"}
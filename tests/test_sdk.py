@@ -39,6 +39,34 @@ def test_sdk_ingest_and_query(tmp_path):
     assert response.sources
 
 
+def test_checkpointed_pipeline_keeps_graph_state_serializable(tmp_path):
+    from langgraph.checkpoint.memory import MemorySaver
+    from portfolio_agent.rag_pipeline import RAGPipeline, RAGRequest
+
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "checkpoint_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+    checkpointer = MemorySaver()
+    pipeline = RAGPipeline(
+        agent.router_agent,
+        agent.retriever_agent,
+        agent.reranker_agent,
+        agent.persona_agent,
+        agent.memory_manager,
+        checkpointer=checkpointer,
+    )
+
+    response = pipeline.process_query(RAGRequest(query="What Python work has Jane done?", session_id="saved"))
+    events = list(pipeline.stream_query(RAGRequest(query="What FastAPI work has Jane done?", session_id="saved")))
+
+    assert response.metadata["error"] is None
+    assert response.sources
+    assert "Jane builds Python APIs with FastAPI." in response.response
+    assert events[-1]["data"].metadata["error"] is None
+    saved = checkpointer.get({"configurable": {"thread_id": "saved"}})
+    assert saved["channel_values"]["reranked_documents"][0]["id"] in vector_store.documents
+
+
 def test_sdk_add_text_multiple_times_keeps_retrieval_stable(tmp_path):
     vector_store = FAISSVectorStore(index_path=str(tmp_path / "multi_index"), dimension=3)
     agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
@@ -50,6 +78,205 @@ def test_sdk_add_text_multiple_times_keeps_retrieval_stable(tmp_path):
     assert response.sources
 
 
+def test_sdk_stream_query_ends_with_the_query_response(tmp_path):
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "stream_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+
+    events = list(agent.stream_query("What Python and FastAPI work has Jane done?", session_id="stream"))
+
+    names = [event["event"] for event in events]
+    assert names[0] == "routing"
+    assert names[-1] == "done"
+    final = events[-1]["data"]
+    assert "".join(event["data"]["text"] for event in events if event["event"] == "token") == final.response
+    assert final.sources
+
+
+def test_sdk_aquery_matches_query(tmp_path):
+    import asyncio
+
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "async_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+
+    expected = agent.query("What Python and FastAPI work has Jane done?", session_id="sync")
+    response = asyncio.run(agent.aquery("What Python and FastAPI work has Jane done?", session_id="async"))
+
+    assert response.response == expected.response
+    assert response.sources == expected.sources
+
+
+def test_sdk_coalesces_identical_concurrent_queries(tmp_path):
+    import asyncio
+    import threading
+    import time
+
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "coalesce_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+    runs = []
+    process_query, aprocess_query = agent.pipeline.process_query, agent.pipeline.aprocess_query
+
+    def slow_process_query(request):
+        runs.append(request.session_id)
+        time.sleep(0.2)
+        return process_query(request)
+
+    async def slow_aprocess_query(request):
+        runs.append(request.session_id)
+        await asyncio.sleep(0.2)
+        return await aprocess_query(request)
+
+    agent.pipeline.process_query = slow_process_query
+    agent.pipeline.aprocess_query = slow_aprocess_query
+    query = "What Python and FastAPI work has Jane done?"
+
+    responses = []
+    threads = [
+        threading.Thread(target=lambda s=session: responses.append(agent.query(query, session_id=s)))
+        for session in ("a", "a", "c")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Sessions without history share one run
+    assert len(runs) == 1
+    assert sorted(r.session_id for r in responses) == ["a", "a", "c"]
+    assert sorted(r.metadata.get("coalesced", False) for r in responses) == [False, True, True]
+
+    async def gather():
+        return await asyncio.gather(*(agent.aquery(query, session_id=s) for s in ("a", "a", "b")))
+
+    async_responses = asyncio.run(gather())
+
+    # Once "a" has history it only shares runs with itself
+    assert sorted(runs[1:]) == ["a", "b"]
+    assert len({response.response for response in [*responses, *async_responses]}) == 1
+    coalesced = sorted((r.session_id, r.metadata.get("coalesced", False)) for r in async_responses)
+    assert coalesced == [("a", False), ("a", True), ("b", False)]
+    for session, turns in (("a", 3), ("b", 1), ("c", 1)):
+        assert len(agent.memory_manager.get_recent_turns(session)) == turns
+    assert agent.stats()["coalescing"] == {"executions": 3, "coalesced": 3, "in_flight": 0}
+
+
+def test_sdk_semantic_routing_embeds_the_query_once(tmp_path):
+    from portfolio_agent.agents import RouterAgent
+
+    class CountingEmbedder(FakeEmbedder):
+        query_embeddings = 0
+
+        def embed_texts_sync(self, texts):
+            return Mock(embeddings=[FakeEmbedder.embed_single_sync(self, text) for text in texts])
+
+        def embed_single_sync(self, text):
+            self.query_embeddings += 1
+            return super().embed_single_sync(text)
+
+    embedder = CountingEmbedder()
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "semantic_index"), dimension=3)
+    agent = PortfolioAgent(
+        embedder=embedder,
+        vector_store=vector_store,
+        router_agent=RouterAgent(routing_mode="semantic", embedder=embedder),
+    )
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+    embedder.query_embeddings = 0
+
+    response = agent.query("What Python and FastAPI work has Jane done?", session_id="semantic")
+
+    assert response.sources
+    assert response.metadata["routing_decision"]["metadata"]["routing_mode"] == "semantic"
+    assert embedder.query_embeddings == 1
+
+
+def test_sdk_query_batch_embeds_once_and_keeps_input_order(tmp_path):
+    class CountingEmbedder(FakeEmbedder):
+        batch_calls = 0
+        single_calls = 0
+
+        def embed_texts_sync(self, texts):
+            self.batch_calls += 1
+            return Mock(embeddings=[FakeEmbedder.embed_single_sync(self, text) for text in texts])
+
+        def embed_single_sync(self, text):
+            self.single_calls += 1
+            return super().embed_single_sync(text)
+
+    embedder = CountingEmbedder()
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "batch_index"), dimension=3)
+    agent = PortfolioAgent(embedder=embedder, vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs.", source="python.txt", document_type="txt")
+    agent.add_text("Jane trains machine learning models.", source="ml.txt", document_type="txt")
+    embedder.batch_calls = embedder.single_calls = 0
+
+    responses = agent.query_batch(
+        [
+            "What Python work has Jane done?",
+            {"query": "   "},
+            {"query": "What machine learning work has Jane done?", "session_id": "other", "max_documents": 1},
+        ],
+        session_id="batch",
+    )
+
+    assert embedder.batch_calls == 1
+    assert embedder.single_calls == 0
+    assert [response.session_id for response in responses] == ["batch", "batch", "other"]
+    assert responses[0].sources[0]["source"] == "python.txt"
+    assert "query must be a non-empty string" in responses[1].metadata["error"]
+    assert responses[2].metadata["documents_retrieved"] == 1
+    assert responses[2].sources[0]["source"] == "ml.txt"
+    assert agent.memory_manager.get_recent_turns("other")
+
+
+def test_sdk_query_batch_traces_each_item_under_the_batch(tmp_path):
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "batch_trace_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+
+    responses = agent.query_batch(
+        [
+            {"query": "What Python work has Jane done?", "trace": True},
+            "What FastAPI work has Jane done?",
+            {"query": "What APIs has Jane built?", "trace": True},
+        ],
+        session_id="batch-trace",
+    )
+
+    assert "trace" not in responses[1].metadata
+    for index in (0, 2):
+        tree = responses[index].metadata["trace"]
+        assert tree["name"] == "query_batch"
+        assert [child["name"] for child in tree["children"]] == ["embed", "route", "retrieve", "query"]
+        item = tree["children"][-1]
+        assert item["attributes"]["index"] == index
+        assert [child["name"] for child in item["children"]] == ["reranker", "persona", "memory"]
+
+
+def test_sdk_query_trace_returns_the_span_tree(tmp_path):
+    vector_store = FAISSVectorStore(index_path=str(tmp_path / "trace_index"), dimension=3)
+    agent = PortfolioAgent(embedder=FakeEmbedder(), vector_store=vector_store)
+    agent.add_text("Jane builds Python APIs with FastAPI.", source="profile.txt", document_type="txt")
+
+    untraced = agent.query("What Python work has Jane done?", session_id="trace")
+    traced = agent.query("What FastAPI work has Jane done?", session_id="trace", trace=True)
+
+    assert "trace" not in untraced.metadata
+    tree = traced.metadata["trace"]
+    assert tree["name"] == "query"
+    assert [child["name"] for child in tree["children"]] == ["router", "retriever", "reranker", "persona", "memory"]
+    retriever = tree["children"][1]
+    assert [child["name"] for child in retriever["children"]] == ["dense_search", "filter"]
+    assert retriever["children"][0]["children"][0]["name"] == "embed"
+    assert retriever["attributes"]["cache_hit"] is False
+
+    latency = agent.stats()["pipeline"]["stage_latency"]
+    assert latency["query"]["count"] == 2
+    assert latency["retriever.dense_search.embed"]["count"] == 2
+
+
 def test_create_app_uses_supplied_agent(tmp_path):
     pytest.importorskip("fastapi", reason="FastAPI is required for API wrapper tests")
     from portfolio_agent.api.server import create_app
@@ -0,0 +1,160 @@
+import json
+import threading
+
+import pytest
+
+from portfolio_agent import tracing
+from portfolio_agent.tracing import (
+    JSONLSink,
+    LatencyHistogram,
+    OTLPSink,
+    RingBufferSink,
+    Tracer,
+    create_tracer,
+    to_otlp,
+)
+
+
+def test_span_is_a_no_op_outside_a_trace():
+    with tracing.span("orphan") as span:
+        tracing.set_attributes(ignored=True)
+    assert span is None
+
+
+def test_trace_builds_a_span_tree_and_feeds_histograms():
+    sink = RingBufferSink()
+    tracer = Tracer(sinks=[sink])
+
+    with tracer.trace("query", session_id="s") as root:
+        with tracing.span("retriever"):
+            tracing.set_attributes(cache_hit=False)
+            with tracing.span("filter", candidates=3):
+                pass
+        with tracing.span("persona"):
+            pass
+
+    tree = root.to_dict()
+    assert [child["name"] for child in tree["children"]] == ["retriever", "persona"]
+    assert tree["children"][0]["attributes"] == {"cache_hit": False}
+    assert tree["children"][0]["children"][0]["attributes"] == {"candidates": 3}
+    assert all(child["start_ms"] >= 0 for child in tree["children"])
+
+    stats = tracer.get_stats()
+    assert set(stats) == {"query", "retriever", "retriever.filter", "persona"}
+    assert stats["retriever.filter"]["count"] == 1
+    assert [span.path for span in sink.spans()] == ["query", "retriever", "retriever.filter", "persona"]
+    assert len({span.trace_id for span in sink.spans()}) == 1
+    assert sink.traces() == [root]
+
+
+def test_spans_follow_context_into_worker_threads():
+    import contextvars
+
+    def search():
+        with tracing.span("search"):
+            pass
+
+    tracer = Tracer()
+    with tracer.trace("query") as root:
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(search,))
+        worker.start()
+        worker.join()
+    assert [child.name for child in root.children] == ["search"]
+
+
+def test_disabled_tracer_only_records_forced_traces():
+    tracer = Tracer(enabled=False)
+    with tracer.trace("query") as skipped:
+        with tracing.span("router") as child:
+            pass
+    assert skipped is None and child is None
+
+    with tracer.trace("query", force=True) as forced:
+        pass
+    assert forced is not None
+    assert tracer.get_stats()["query"]["count"] == 1
+
+
+def test_failed_span_is_marked_and_still_exported():
+    sink = RingBufferSink()
+    tracer = Tracer(sinks=[sink])
+    with pytest.raises(RuntimeError):
+        with tracer.trace("query"):
+            with tracing.span("persona"):
+                raise RuntimeError("backend down")
+
+    root, persona = sink.spans()
+    assert root.status == persona.status == "error"
+    assert persona.attributes["error"] == "backend down"
+
+
+def test_latency_histogram_estimates_quantiles():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 5:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["buckets"][-1] == (float("inf"), 100)
+    assert snapshot["p50"] <= 0.01
+    assert 0.01 < snapshot["p95"] <= 0.1
+    assert 0.1 < snapshot["p99"] <= 0.5
+
+
+def test_jsonl_sink_appends_one_record_per_span(tmp_path):
+    tracer = Tracer(sinks=[JSONLSink(str(tmp_path / "traces" / "spans.jsonl"))])
+    for _ in range(2):
+        with tracer.trace("query"):
+            with tracing.span("router"):
+                pass
+
+    records = [json.loads(line) for line in (tmp_path / "traces" / "spans.jsonl").read_text().splitlines()]
+    assert [record["path"] for record in records] == ["query", "router"] * 2
+    assert records[1]["parent_id"] == records[0]["span_id"]
+
+
+def test_otlp_export_encodes_spans_and_posts_in_the_background():
+    posted = []
+    done = threading.Event()
+
+    class FakeSession:
+        def post(self, url, data, headers, timeout):
+            posted.append((url, json.loads(data), headers))
+            done.set()
+
+    sink = OTLPSink("http://collector:4318/v1/traces", headers={"Authorization": "token"}, session=FakeSession())
+    tracer = Tracer(sinks=[sink])
+    with tracer.trace("query", session_id="s"):
+        with tracing.span("retriever", documents=2):
+            pass
+    sink.flush(timeout=5)
+
+    assert done.is_set()
+    url, payload, headers = posted[0]
+    assert url == "http://collector:4318/v1/traces"
+    assert headers["Authorization"] == "token"
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["query", "retriever"]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert len(spans[0]["traceId"]) == 32 and len(spans[0]["spanId"]) == 16
+    assert {"key": "documents", "value": {"intValue": "2"}} in spans[1]["attributes"]
+    assert int(spans[0]["endTimeUnixNano"]) >= int(spans[0]["startTimeUnixNano"])
+    assert sink.exported == 2
+
+
+def test_to_otlp_marks_error_status():
+    tracer = Tracer(sinks=[])
+    with pytest.raises(ValueError):
+        with tracer.trace("query") as root:
+            raise ValueError("bad")
+    assert to_otlp([root])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["status"] == {"code": 2}
+
+
+def test_create_tracer_validates_sink_settings(tmp_path):
+    assert isinstance(create_tracer("memory").sinks[0], RingBufferSink)
+    assert create_tracer("none").sinks == []
+    assert isinstance(create_tracer("jsonl", jsonl_path=str(tmp_path / "t.jsonl")).sinks[0], JSONLSink)
+    with pytest.raises(ValueError):
+        create_tracer("otlp")
+    with pytest.raises(ValueError):
+        create_tracer("zipkin")